@@ -0,0 +1,348 @@
+#! /usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+
+Banc d'essai
+============
+
+ Mesure les chemins critiques de la simulation sans affichage: choix de la
+ prochaine destination selon le nombre d'appels en attente, allumage des
+ boutons selon leur nombre, génération des appels, opérations sur les
+ groupes de passagers et dessin du bâtiment dans une image en mémoire.
+ Chaque mesure donne des opérations par seconde et la mémoire allouée, et
+ est comparée à une référence enregistrée sur la même machine. Au
+ préalable, le banc vérifie que les politiques de balayage gardent le sens
+ du dernier déplacement d'un ascenseur à l'arrêt.
+
+ Exemples:
+   python banc_essai.py --enregistrer           (mesure de référence)
+   python banc_essai.py                         (comparaison à la référence)
+   python banc_essai.py --scenarios people dessiner --tolerance 0.1
+
+"""
+
+import sys
+import json
+import tracemalloc
+from argparse import ArgumentParser
+from itertools import cycle
+from time import perf_counter
+from logging import StreamHandler, Formatter, getLogger, INFO
+import numpy as np
+from core.params import Params
+from core.moteur import Ordonnanceur, MoteurSimulation
+from core.structures import Batiment
+from core.activite import SENS, Appel
+from core.group import Population
+from core.trafic import ProfilTrafic
+
+# journalisation des résultats
+logger = getLogger()
+
+# fichier de référence par défaut
+REFERENCE = "banc_reference.json"
+# baisse relative des opérations par seconde signalée comme régression
+TOLERANCE = 0.2
+
+
+def batiment_sans_trafic(params, area = None):
+    """ Bâtiment sans affichage (sauf zone fournie) ni arrivée de passagers. """
+    return Batiment(area, params, Ordonnanceur(), generateur = [])
+
+
+def prochaine_destination(politique):
+    """
+    Choix d'une destination par un ascenseur à l'arrêt parmi <taille> appels
+    externes en attente; l'appel choisi est remis en attente.
+    """
+    def preparer(taille):
+        batiment = batiment_sans_trafic(Params(taille, 4, 2, politique))
+        automate = batiment.automate
+        alea = np.random.default_rng(0)
+        candidats = [(etage, SENS.HAUT) for etage in range(taille - 1)] \
+            + [(etage, SENS.BAS) for etage in range(1, taille)]
+        for idx in alea.permutation(len(candidats))[:taille]:
+            appel = Appel(*candidats[idx])
+            appel.date = 0.0
+            automate.appels.ajouter(appel)
+        ascenseur = automate.ascenseurs[0]
+
+        def operation():
+            appel = automate.prochaine_destination(ascenseur)
+            if appel:
+                automate.appels.ajouter(appel)
+        return operation
+    return preparer
+
+
+def allumage_bouton(taille):
+    """ Allumage puis extinction, à tour de rôle, des boutons d'un bâtiment de <taille> étages. """
+    batiment = batiment_sans_trafic(Params(taille, 4, 2))
+    automate = batiment.automate
+    ordres = cycle([(bouton.appel, flg) for bouton in batiment.boutons for flg in (True, False)])
+
+    def operation():
+        appel, flg = next(ordres)
+        automate.allumage_bouton(appel, flg)
+    return operation
+
+
+def sim_appels(taille):
+    """
+    Une heure simulée sans affichage, à une arrivée par seconde dans un
+    bâtiment de <taille> étages: une opération est une arrivée de passager,
+    de sa génération à son appel.
+    """
+    def operation():
+        moteur = MoteurSimulation(Params(taille, 4, 2), 0, ProfilTrafic.constant(taille, 1.0))
+        moteur.lancer(3600.0)
+        return moteur.batiment.automate.population.nb
+    return operation
+
+
+def people(taille):
+    """
+    Sélection des <taille> passagers en attente à un étage parmi dix fois
+    plus de passagers, retrait d'un sous-groupe, poids et destinations.
+    """
+    population = Population()
+    alea = np.random.default_rng(0)
+    for idx in range(10 * taille):
+        population.ajouter(0 if idx % 10 == 0 else int(alea.integers(1, 10)),
+                           int(alea.integers(1, 10)), 75.0, 30)
+    sous_groupe = population.en_attente(0)
+    sous_groupe.ids = sous_groupe.ids[::2]
+
+    def operation():
+        groupe = population.en_attente(0)
+        groupe.weight
+        groupe.get_exit_floor(5)
+        groupe.remove_sub_group(sous_groupe)
+    return operation
+
+
+class ZoneHorsEcran:
+    """
+    Zone de dessin sans fenêtre, aux dimensions du bâtiment: les demandes
+    de rafraîchissement et d'animation sont ignorées.
+    """
+
+    largeur = None
+    hauteur = None
+
+    def __init__(self, largeur, hauteur):
+        self.largeur = largeur
+        self.hauteur = hauteur
+
+    def get_allocated_width(self):
+        return self.largeur
+
+    def get_allocated_height(self):
+        return self.hauteur
+
+    def get_parent(self):
+        return None
+
+    def queue_draw_area(self, x, y, largeur, hauteur):
+        pass
+
+    def add_tick_callback(self, fn):
+        return 0
+
+    def remove_tick_callback(self, idx):
+        pass
+
+
+def dessiner(taille):
+    """ Dessin complet d'un bâtiment de <taille> étages et 4 ascenseurs dans une image en mémoire. """
+    import cairo
+    from gui.units import Disposition
+    params = Params(taille, 4, 2)
+    disposition = Disposition(params)
+    largeur, hauteur = int(disposition.largeur), int(disposition.hauteur)
+    area = ZoneHorsEcran(largeur, hauteur)
+    batiment = batiment_sans_trafic(params, area)
+    for bouton in batiment.boutons[::3]:
+        bouton.allumer(True)
+    surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, largeur, hauteur)
+
+    def operation():
+        batiment.dessiner(area, cairo.Context(surface))
+    return operation
+
+
+# scénarios par nom: (préparation selon la taille, tailles, unité de la taille)
+SCENARIOS = {
+    "destination_collective": (prochaine_destination("collective"), (10, 100, 1000), "appels"),
+    "destination_temps": (prochaine_destination("temps"), (10, 100, 1000), "appels"),
+    "allumage_bouton": (allumage_bouton, (10, 100, 1000), "étages"),
+    "sim_appels": (sim_appels, (10, 50), "étages"),
+    "people": (people, (10, 100, 1000), "passagers"),
+    "dessiner": (dessiner, (10, 100), "étages"),
+}
+
+
+def verifier_sens():
+    """
+    Un ascenseur à l'arrêt garde le sens de son dernier déplacement: monté
+    jusqu'au 5e étage avec des arrêts demandés aux 4e et 7e, il continue vers
+    le 7e, avant le demi-tour (SCAN, LOOK, temps estimé, collective).
+    @return: politiques qui font demi-tour, avec l'étage choisi
+    @rtype: liste de tuples (chaîne, nombre entier)
+    """
+    erreurs = []
+    for politique in ("collective", "scan", "look", "temps"):
+        automate = batiment_sans_trafic(Params(10, 1, 2, politique)).automate
+        ascenseur = automate.ascenseurs[0]
+        ascenseur.etage_courant = 5
+        ascenseur.mouvement = (5.0, 0.0, 0.0)
+        ascenseur.sens = SENS.HAUT
+        for etage in (4, 7):
+            appel = Appel(etage, SENS.AUCUN, num_asc = ascenseur.num_asc)
+            appel.date = 0.0
+            automate.appels.ajouter(appel)
+        appel = automate.politique.choisir(automate, ascenseur)
+        if appel is None or appel.etage != 7:
+            erreurs.append((politique, appel.etage if appel else None))
+    return erreurs
+
+
+def chronometrer(operation, duree_min, repetitions):
+    """
+    @return: meilleur débit en opérations par seconde sur les répétitions,
+             chacune durant au moins duree_min secondes
+    @rtype: nombre
+    """
+    operation()
+    meilleur = 0.0
+    for _ in range(repetitions):
+        nb = 0
+        debut = perf_counter()
+        while True:
+            valeur = operation()
+            # une opération peut compter plusieurs unités (ex: arrivées)
+            nb += valeur if isinstance(valeur, int) else 1
+            ecoule = perf_counter() - debut
+            if ecoule >= duree_min:
+                break
+        meilleur = max(meilleur, nb / ecoule)
+    return meilleur
+
+
+def mesurer_memoire(preparer, taille, nb_operations = 100):
+    """
+    @return: pic de mémoire allouée en Ko, préparation comprise, et mémoire
+             encore allouée après nb_operations opérations
+    @rtype: tuple de 2 nombres
+    """
+    tracemalloc.start()
+    operation = preparer(taille)
+    for _ in range(nb_operations):
+        operation()
+    actuelle, pic = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return pic / 1024, actuelle / 1024
+
+
+def lancer_banc(noms, duree_min = 0.2, repetitions = 3):
+    """
+    @type  noms: liste de chaînes
+    @param noms: scénarios à mesurer (voir SCENARIOS)
+    @return: résultats par clé "scénario[taille]": opérations par seconde,
+             pic et reste de mémoire en Ko
+    @rtype: dictionnaire
+    """
+    resultats = {}
+    for nom in noms:
+        preparer, tailles, unite = SCENARIOS[nom]
+        for taille in tailles:
+            cle = "%s[%d %s]" % (nom, taille, unite)
+            try:
+                operation = preparer(taille)
+            except ImportError as exc:
+                logger.warning("%s ignoré: %s", cle, exc)
+                break
+            ops = chronometrer(operation, duree_min, repetitions)
+            pic, reste = mesurer_memoire(preparer, taille, 1 if nom == "sim_appels" else 100)
+            resultats[cle] = {"ops_s": ops, "memoire_pic_ko": pic, "memoire_ko": reste}
+    return resultats
+
+
+def comparer(resultats, reference, tolerance):
+    """
+    @return: lignes du rapport, et nombre de régressions (débit inférieur à
+             la référence au-delà de la tolérance)
+    @rtype: tuple (liste de chaînes, nombre entier)
+    """
+    lignes = ["%-42s %14s %10s %12s %12s" % ("scénario", "ops/s", "écart", "pic Ko", "reste Ko")]
+    nb_regressions = 0
+    for cle, mesure in resultats.items():
+        ecart = ""
+        ref = reference.get(cle)
+        if ref:
+            variation = mesure["ops_s"] / ref["ops_s"] - 1
+            ecart = "%+.1f %%" % (100 * variation)
+            if variation < -tolerance:
+                ecart += " !"
+                nb_regressions += 1
+        lignes.append("%-42s %14.1f %10s %12.1f %12.1f" % (cle, mesure["ops_s"], ecart,
+                                                            mesure["memoire_pic_ko"], mesure["memoire_ko"]))
+    return lignes, nb_regressions
+
+
+def lire_arguments(argv):
+    """ Analyse de la ligne de commande """
+    parser = ArgumentParser(description = "Banc d'essai des chemins critiques de la simulation.")
+    parser.add_argument("--scenarios", nargs = "+", default = list(SCENARIOS),
+                        choices = list(SCENARIOS), help = "scénarios à mesurer")
+    parser.add_argument("--duree", type = float, default = 0.2,
+                        help = "durée minimale d'une répétition, en secondes")
+    parser.add_argument("--repetitions", type = int, default = 3,
+                        help = "nombre de répétitions, la meilleure est retenue")
+    parser.add_argument("--reference", default = REFERENCE,
+                        help = "fichier JSON des mesures de référence")
+    parser.add_argument("--enregistrer", action = "store_true",
+                        help = "enregistre les mesures comme nouvelle référence")
+    parser.add_argument("--tolerance", type = float, default = TOLERANCE,
+                        help = "baisse relative du débit signalée comme régression")
+    return parser.parse_args(argv)
+
+
+# -------------------------------------------------------------------
+#
+# Point d'entrée
+#
+# -------------------------------------------------------------------
+
+if __name__ == '__main__':
+
+    # journalisation dans la console
+    logger.setLevel(INFO)
+    sh = StreamHandler()
+    sh.setFormatter(Formatter("%(message)s"))
+    logger.addHandler(sh)
+    args = lire_arguments(sys.argv[1:])
+    erreurs = verifier_sens()
+    for politique, etage in erreurs:
+        logger.error("Politique %s: demi-tour vers l'étage %s au lieu du 7e.", politique, etage)
+    if erreurs:
+        sys.exit(1)
+    resultats = lancer_banc(args.scenarios, args.duree, args.repetitions)
+    reference = {}
+    if not args.enregistrer:
+        try:
+            with open(args.reference) as fichier:
+                reference = json.load(fichier)
+        except FileNotFoundError:
+            logger.info("Pas de référence %s: mesures seules.", args.reference)
+    lignes, nb_regressions = comparer(resultats, reference, args.tolerance)
+    for ligne in lignes:
+        logger.info(ligne)
+    if args.enregistrer:
+        with open(args.reference, "w") as fichier:
+            json.dump(resultats, fichier, indent = 1, sort_keys = True)
+        logger.info("Référence écrite dans %s.", args.reference)
+    elif nb_regressions:
+        logger.info("%d régression(s) au-delà de %.0f %%.", nb_regressions, 100 * args.tolerance)
+        sys.exit(1)
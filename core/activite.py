@@ -8,11 +8,13 @@
 # ===================================================================
 
 from core.log import Log
-from random import randint, random
-from threading import Thread
-from time import sleep
 from enum import Enum
-from .group import People
+from .group import People, ETAT_PASSAGER
+from .trafic import GenerateurTrafic, ProfilTrafic
+
+# capacité d'une cabine: charge maximale en kg et nombre de places
+CHARGE_MAX = 700.0
+NB_PLACES = 9
 
 class SENS(Enum):
     """ Demande en descente, en montée ou sans. """
@@ -30,19 +32,22 @@ class Appel:
      Une demande d'appel peut ainsi facilement être rattachée à un bouton d'appel.
     """
 
-    # étage demandé (appel interne) ou étage de la demande (appel externe)
-    etage = None
-    # sens
-    sens = None
-    # si zéro, appel externe, sinon n° de l'ascenseur concerné
-    num_asc = None
-    # group of people who called l'ascenseur.
-    people = None
-    # boolean, valid call or not
-    valid = True
-
-
-    def __init__(self, etage, sens, people, num_asc = 0):
+    __slots__ = (
+        # étage demandé (appel interne) ou étage de la demande (appel externe)
+        "etage",
+        # sens
+        "sens",
+        # si zéro, appel externe, sinon n° de l'ascenseur concerné
+        "num_asc",
+        # group of people who called l'ascenseur.
+        "people",
+        # boolean, valid call or not
+        "valid",
+        # date d'enregistrement par l'automate, sur l'horloge de l'ordonnanceur
+        "date",
+    )
+
+    def __init__(self, etage, sens, people = None, num_asc = 0):
         """
         @type  etage: nombre entier
         @param etage: étage demandé ou étage lié à un bouton d'appel
@@ -50,10 +55,12 @@ class Appel:
         @param sens: sens demandé (ex. appel externe haut ou bas)
         @type  num_asc: nombre entier
         @param num_asc: Numéro de l'ascenseur concerné (ex. appel interne)
-        @type  people: Enum People
+        @type  people: objet People
         @param people: Group of people who called l'ascenseur.
         """
         self.etage = etage
+        self.valid = True
+        self.date = None
         if isinstance(sens, SENS):
             self.sens = sens
         else:
@@ -70,13 +77,11 @@ class Appel:
                 self.valid = False
 
             # check age requirement.
-            if len(self.people) == 1:
-                person = self.people.people[0]
-                if person.age <= 10:
-                    self.valid = False
+            if len(self.people) == 1 and self.people.ages[0] <= 10:
+                self.valid = False
 
             # check weight requirement.
-            if self.people.weight > 700:
+            if self.people.weight > CHARGE_MAX:
                 self.valid = False
         else: 
             self.valid = False
@@ -96,85 +101,148 @@ class Appel:
         else:
             return False
 
+    def __hash__(self):
+        """ Cohérent avec la comparaison: (étage, sens, n° d'ascenseur) """
+        return hash((self.etage, self.sens, self.num_asc))
+
 
 class SimAppels(Log):
     """
     Génère des appels d'ascenseur.
-    Des appels externes sont régulièrement générés aléatoirement; et chaque
-    appel externe déclenche à l'arrivée d'un ascenseur une demande d'appel
-    interne.
+    Les arrivées de passagers sont lues dans un flux de trafic (origine,
+    destination, poids et âge) et ajoutées à la population de l'automate;
+    chaque arrivée déclenche un appel externe à son étage, et à l'arrivée
+    d'un ascenseur les passagers en attente à cet étage montent et
+    demandent leur étage par un appel interne. Ceux qui ne trouvent pas
+    de place dans la cabine rappellent l'ascenseur à son départ.
+    Avec la destination saisie au palier (type d'appel 3), l'automate
+    désigne un ascenseur à chaque passager dès son arrivée, et seuls les
+    passagers à qui il a été désigné montent dans une cabine.
     """
 
     batiment = None
-    # Arrêt du thread si True
-    flg_stop = None
+    # flux d'arrivées (date, origine, destination, poids, âge), par exemple un GenerateurTrafic
+    generateur = None
+    _arrivees = None
 
-    def __init__(self, batiment):
+    def __init__(self, batiment, generateur = None):
+        """
+        Chaque arrivée est planifiée sur l'ordonnanceur du bâtiment.
+        @type  batiment: objet Batiment
+        @param batiment: bâtiment recevant les appels
+        @type  generateur: itérable de quintuplets (date, origine, destination, poids, âge)
+        @param generateur: flux d'arrivées par dates croissantes; par défaut un
+                           trafic uniforme d'une arrivée toutes les 8,5 s en moyenne
+        """
         self.batiment = batiment
-        self.flg_stop = False
-        thrd = Thread(target = self.__generer_appels_externes,
-                           args = (8, batiment.automate.appel))
-        thrd.start()
+        if generateur is None:
+            generateur = GenerateurTrafic(ProfilTrafic.constant(batiment.params.nb_etages, 1 / 8.5))
+        self.generateur = generateur
+        self._arrivees = iter(generateur)
+        self.__planifier_arrivee()
+
+    def __planifier_arrivee(self):
+        """ Planifie la prochaine arrivée du flux, s'il n'est pas épuisé. """
+        arrivee = next(self._arrivees, None)
+        if arrivee is None:
+            self.logger.debug("Flux d'arrivées épuisé.")
+            return
+        date, origine, destination, poids, age = arrivee
+        ordonnanceur = self.batiment.ordonnanceur
+        ordonnanceur.planifier(max(0.0, date - ordonnanceur.maintenant),
+                               self.__arrivee_flux, origine, destination, poids, age)
+
+    def __arrivee_flux(self, origine, destination, poids, age):
+        """ Arrivée lue dans le flux, puis planification de la suivante. """
+        self.arrivee(origine, destination, poids, age)
+        self.__planifier_arrivee()
+
+    def arrivee(self, origine, destination, poids, age):
+        """
+        Un passager arrive à un étage et appelle l'ascenseur.
+        @return: n° du passager dans la population de l'automate
+        @rtype: nombre entier
+        """
+        automate = self.batiment.automate
+        idx = automate.population.ajouter(origine, destination, poids, age)
+        automate.mesures.arrivee(idx, self.batiment.ordonnanceur.maintenant)
+        if automate.enregistreur is not None:
+            automate.enregistreur.enregistrer(self.batiment.ordonnanceur.maintenant,
+                                              origine, destination, poids, age)
+        if self.batiment.params.type_appel == 3:
+            # destination saisie au palier: l'automate désigne un ascenseur
+            automate.appel_destination(idx)
+        else:
+            automate.appel(self.nouvel_appel_externe(origine, destination))
+        return idx
 
-    def __generer_appels_externes(self, delai, fn_appel):
+    def nouvel_appel_externe(self, origine, destination):
         """
-        @type  delai: nombre
-        @param delai: durée d'attente en secondes souhaitée
-        @type  fn_appel: fonction de retour
-        @param fn_appel: fonction appelée à la génération d'un appel
+        @type  origine: nombre entier
+        @param origine: étage où l'ascenseur est appelé
+        @type  destination: nombre entier
+        @param destination: étage où se rend le passager
+        @return: appel externe correspondant au bouton utilisé
+        @rtype: objet Appel
         """
-        self.logger.debug("Génération d'appels externes OK.")
-        idx_etage_max = self.batiment.params.nb_etages - 1
-        while not self.flg_stop:
-            # temps d'attente, avec une variation max de 1 seconde.
-            variation = random()
-            sleep(variation + (1 * delai))
-            # on liste les etages courant des ascenseurs pour éviter les doubles
-            # appels inutiles
-            _etages_exclus = []
-            for asc in self.batiment.automate.ascenseurs:
-                if asc.appel:
-                    _etages_exclus.append(asc.appel.etage)
-                _etages_exclus.append(asc.etage_courant)
-            # choix d'un étage
-            etage = _etages_exclus[0]
-            while etage in _etages_exclus:
-                etage = randint(0, idx_etage_max)
-            # choix du sens demandé
-            if self.batiment.params.type_appel == 1:
-                appel = Appel(etage, SENS.AUCUN)
-            else:
-                # si on est au dernier étage, on ne peut que descendre
-                if etage == idx_etage_max:
-                    sens = SENS.BAS
-                # si on est au RDC, on ne peut que monter
-                elif etage == 0:
-                    sens = SENS.HAUT
-                # sinon c'est aléatoire
-                else:
-                    sens = randint(1, 2)
-                    if sens == 1: sens = SENS.BAS
-                    if sens == 2: sens = SENS.HAUT
-                appel = Appel(etage, sens)
-            # self.logger.debug("Nouvel appel externe: %s" % appel)
-            fn_appel(appel)
-        self.logger.debug("Arrêt de la simulation d'appels.")
+        if self.batiment.params.type_appel == 1:
+            return Appel(origine, SENS.AUCUN)
+        # bouton haut ou bas selon la destination
+        if destination > origine:
+            return Appel(origine, SENS.HAUT)
+        return Appel(origine, SENS.BAS)
+
+    def rappeler(self, groupe, etage):
+        """
+        Les passagers laissés à un étage par un ascenseur complet rappellent
+        l'ascenseur à son départ, s'ils attendent encore.
+        @type  groupe: objet People
+        @param groupe: passagers laissés à l'étage
+        @type  etage: nombre entier
+        @param etage: étage quitté par l'ascenseur
+        """
+        automate = self.batiment.automate
+        population = automate.population
+        groupe = People(population, groupe.ids[population.etat[groupe.ids] == ETAT_PASSAGER.ATTENTE])
+        if self.batiment.params.type_appel == 3:
+            # un autre ascenseur leur est désigné
+            for idx in groupe:
+                automate.appel_destination(idx)
+        else:
+            for destination in dict.fromkeys(groupe.exit_floors.tolist()):
+                automate.appel(self.nouvel_appel_externe(etage, destination))
 
     def generer_appel_interne(self, ascenseur, appel):
         """
-        Après l'arrivée d'un ascenseur suite à un appel externe,
-        un appel interne est généré.
+        Après l'arrivée d'un ascenseur suite à un appel externe, les passagers
+        en attente à l'étage montent dans la limite de la capacité de la
+        cabine et chacun génère un appel interne; les autres rappellent
+        l'ascenseur à son départ (voir rappeler()).
         @type  ascenseur: objet Ascenseur
         @param ascenseur: ascenseur concerné
         @type  appel: objet Appel
         @param appel: données sur l'appel concerné
         """
-        # on s'attend à une demande d'étage différent de celui actuel
-        etage = appel.etage
-        while etage == appel.etage:
-            idx_etage_max = self.batiment.params.nb_etages - 1
-            etage = randint(0, idx_etage_max)
-        appel_interne = Appel(etage, SENS.AUCUN, ascenseur.num_asc)
-        # self.logger.debug("A l'étage <%d>, nouvel appel interne: %s" % \
-        #                  (appel.etage, appel_interne))
-        self.batiment.automate.appel(appel_interne)
+        automate = self.batiment.automate
+        destination_palier = self.batiment.params.type_appel == 3
+        if destination_palier:
+            # seuls montent les passagers à qui cet ascenseur a été désigné
+            groupe = automate.population.affectes(ascenseur.num_asc, appel.etage)
+        else:
+            groupe = automate.population.en_attente(appel.etage)
+        if not len(groupe):
+            return
+        montes = ascenseur.embarquer(groupe)
+        if len(montes) < len(groupe):
+            if __debug__:
+                self.logger.debug("Ascenseur <%d> complet, %d passagers restent à l'étage <%d>.",
+                                  ascenseur.num_asc, len(groupe) - len(montes), appel.etage)
+        elif destination_palier and not len(automate.population.en_attente(appel.etage)):
+            # plus personne n'attend: le clavier du palier s'éteint
+            automate.allumage_bouton(Appel(appel.etage, SENS.AUCUN), False)
+        # un appel par destination, dans l'ordre d'arrivée des passagers
+        for etage in dict.fromkeys(montes.exit_floors.tolist()):
+            appel_interne = Appel(etage, SENS.AUCUN, num_asc = ascenseur.num_asc)
+            # self.logger.debug("A l'étage <%d>, nouvel appel interne: %s" % \
+            #                  (appel.etage, appel_interne))
+            self.batiment.automate.appel(appel_interne)
@@ -0,0 +1,393 @@
+#!/usr/bin/python
+# -*- Encoding: utf-8 -*-
+
+# ===================================================================
+#
+# Module regroupant les bâtiments à plusieurs batteries d'ascenseurs
+# (zones basse et haute, express, navettes vers un étage de
+# correspondance): chaque batterie dessert ses propres étages avec son
+# automate, éventuellement dans un processus séparé, et les batteries
+# n'échangent que les passagers en correspondance.
+#
+# ===================================================================
+
+from collections import deque
+from multiprocessing import Process, Pipe
+from core.log import Log
+from core.params import Params
+from core.moteur import Ordonnanceur, PiloteSimule
+from core.structures import Batiment
+from core.group import ETAT_PASSAGER
+from core.mesures import HistogrammeDurees
+from core.trafic import GenerateurTrafic, ProfilTrafic
+
+# durée en secondes du changement de batterie à un étage de correspondance;
+# c'est aussi la fenêtre de synchronisation des batteries
+DELAI_CORRESPONDANCE = 30.0
+
+
+class Batterie:
+    """
+    Groupe d'ascenseurs identiques desservant un même ensemble d'étages.
+    """
+
+    nom = None
+    nb_asc = None
+    # n° des étages desservis, par ordre croissant
+    etages = None
+    # type de cabine (voir core.cinematique), None pour le choisir selon la hauteur
+    cabine = None
+
+    def __init__(self, nom, nb_asc, etages, cabine = None):
+        """
+        @type  nom: chaîne
+        @param nom: nom de la batterie (ex. "basse", "navette")
+        @type  nb_asc: nombre entier
+        @param nb_asc: nombre d'ascenseurs de la batterie
+        @type  etages: itérable de nombres entiers
+        @param etages: étages desservis, au moins deux
+        """
+        self.nom = nom
+        self.nb_asc = nb_asc
+        self.etages = sorted(set(etages))
+        self.cabine = cabine
+        if len(self.etages) < 2:
+            raise ValueError("La batterie <%s> doit desservir au moins deux étages." % nom)
+
+    def __repr__(self):
+        return "<%s|%d asc.|E=%d-%d (%d)>" % (self.nom, self.nb_asc, self.etages[0],
+                                               self.etages[-1], len(self.etages))
+
+    def params(self, params):
+        """
+        @type  params: objet Params
+        @param params: options du bâtiment (type d'appel, politique)
+        @return: options de la batterie, sur ses étages renumérotés à partir de 0
+        @rtype: objet Params
+        """
+        return Params(len(self.etages), self.nb_asc, params.type_appel, params.politique,
+                      self.cabine or params.cabine, self.etages)
+
+
+def batteries_par_zones(nb_etages, nb_zones, nb_asc):
+    """
+    Découpage classique d'une tour: chaque batterie dessert le hall (étage 0)
+    et une tranche d'étages consécutifs; on change de zone par le hall.
+    @type  nb_zones: nombre entier
+    @param nb_zones: nombre de batteries
+    @type  nb_asc: nombre entier
+    @param nb_asc: nombre d'ascenseurs par batterie
+    @rtype: liste d'objets Batterie
+    """
+    taille = -(-(nb_etages - 1) // nb_zones)
+    batteries = []
+    for zone in range(nb_zones):
+        etages = range(1 + zone * taille, min(nb_etages, 1 + (zone + 1) * taille))
+        batteries.append(Batterie("zone %d" % (zone + 1), nb_asc, [0] + list(etages)))
+    return batteries
+
+
+class Itineraires:
+    """
+    Itinéraires des passagers entre batteries: la batterie directe la plus
+    spécialisée (le moins d'étages desservis) si elle existe, sinon le
+    moins de correspondances possible, chacune à l'étage commun le plus
+    proche du trajet. Les itinéraires sont calculés à la demande puis
+    mémorisés par couple (origine, destination).
+    """
+
+    batteries = None
+    # étages desservis par batterie
+    _desservis = None
+    _cache = None
+
+    def __init__(self, batteries):
+        self.batteries = batteries
+        self._desservis = [set(batterie.etages) for batterie in batteries]
+        self._cache = {}
+
+    def __call__(self, origine, destination):
+        """
+        @return: étapes (n° de batterie, étage de départ, étage d'arrivée),
+                 None si aucune suite de batteries ne relie les deux étages
+        @rtype: tuple de triplets
+        """
+        cle = (origine, destination)
+        if cle not in self._cache:
+            self._cache[cle] = self.__calculer(origine, destination)
+        return self._cache[cle]
+
+    def __calculer(self, origine, destination):
+        """ Parcours en largeur du graphe des batteries reliées par un étage commun. """
+        par_taille = sorted(range(len(self.batteries)), key = lambda b: len(self._desservis[b]))
+        precedent = {b: None for b in par_taille if origine in self._desservis[b]}
+        file = deque(precedent)
+        while file:
+            b = file.popleft()
+            if destination in self._desservis[b]:
+                chemin = [b]
+                while precedent[chemin[-1]] is not None:
+                    chemin.append(precedent[chemin[-1]])
+                return self.__etapes(chemin[::-1], origine, destination)
+            for autre in par_taille:
+                if autre not in precedent and self._desservis[b] & self._desservis[autre]:
+                    precedent[autre] = b
+                    file.append(autre)
+        return None
+
+    def __etapes(self, chemin, origine, destination):
+        """ Etages de correspondance le long d'une suite de batteries. """
+        etapes = []
+        depart = origine
+        for b, suivante in zip(chemin, chemin[1:]):
+            communs = self._desservis[b] & self._desservis[suivante]
+            correspondance = min(communs, key = lambda e: abs(e - depart) + abs(e - destination))
+            etapes.append((b, depart, correspondance))
+            depart = correspondance
+        etapes.append((chemin[-1], depart, destination))
+        return tuple(etapes)
+
+
+class SimBatterie(Log):
+    """
+    Simulation sans affichage d'une batterie sur ses étages renumérotés:
+    son bâtiment a son propre automate, donc sa propre politique de
+    répartition. Les arrivées lui sont transmises par fenêtres de temps;
+    elle rend les passagers suivis (en correspondance) qui sont descendus.
+    """
+
+    batterie = None
+    ordonnanceur = None
+    batiment = None
+    # n° local de chaque étage desservi
+    _local = None
+    # n° global des passagers suivis, par n° dans la population locale
+    _suivis = None
+
+    def __init__(self, batterie, params):
+        """
+        @type  batterie: objet Batterie
+        @param batterie: ascenseurs et étages simulés
+        @type  params: objet Params
+        @param params: options du bâtiment
+        """
+        self.batterie = batterie
+        self.ordonnanceur = Ordonnanceur()
+        self.batiment = Batiment(None, batterie.params(params), self.ordonnanceur, ())
+        for asc in self.batiment.automate.ascenseurs:
+            asc.pilote = PiloteSimule(asc, self.ordonnanceur)
+        self._local = {etage: idx for idx, etage in enumerate(batterie.etages)}
+        self._suivis = {}
+
+    def avancer(self, arrivees, fin):
+        """
+        Simule la batterie jusqu'à une date.
+        @type  arrivees: liste de tuples
+        @param arrivees: (date, n° global, origine, destination, poids, âge,
+                         suivi) par dates croissantes, étages du bâtiment
+        @type  fin: nombre
+        @param fin: date simulée à atteindre
+        @return: (n° global, date de descente) des passagers suivis descendus
+        @rtype: liste de couples
+        """
+        for date, id_global, origine, destination, poids, age, suivi in arrivees:
+            self.ordonnanceur.planifier(max(0.0, date - self.ordonnanceur.maintenant), self.__arrivee,
+                                        id_global, self._local[origine], self._local[destination],
+                                        poids, age, suivi)
+        self.ordonnanceur.executer_jusqua(fin)
+        population = self.batiment.automate.population
+        date_descente = self.batiment.automate.mesures.date_descente
+        descendus = [idx for idx in self._suivis if population.etat[idx] == ETAT_PASSAGER.ARRIVE]
+        return [(self._suivis.pop(idx), float(date_descente[idx])) for idx in descendus]
+
+    def __arrivee(self, id_global, origine, destination, poids, age, suivi):
+        """ Un passager appelle l'ascenseur; il est suivi s'il est en correspondance. """
+        idx = self.batiment.sim_appels.arrivee(origine, destination, poids, age)
+        if suivi:
+            self._suivis[idx] = id_global
+
+    def resultats(self):
+        """
+        @return: nom de la batterie, nombre d'événements, histogrammes
+                 d'attente et de voyage de ses passagers (par étape)
+        @rtype: tuple
+        """
+        mesures = self.batiment.automate.mesures
+        return (self.batterie.nom, self.ordonnanceur.nb_evenements, mesures.attente, mesures.voyage)
+
+
+def _travailleur(connexion, batterie, params):
+    """
+    Boucle d'un processus simulant une batterie: ("avancer", arrivées, fin)
+    renvoie les passagers suivis descendus, ("resultats",) les résultats
+    puis termine le processus.
+    """
+    sim = SimBatterie(batterie, params)
+    while True:
+        message = connexion.recv()
+        if message[0] == "avancer":
+            connexion.send(sim.avancer(message[1], message[2]))
+        else:
+            connexion.send(sim.resultats())
+            connexion.close()
+            return
+
+
+class MoteurBatteries(Log):
+    """
+    Simulation sans affichage d'un bâtiment à plusieurs batteries.
+    Le trafic est généré sur tous les étages du bâtiment; chaque passager
+    suit un itinéraire d'une ou plusieurs étapes, une par batterie. Les
+    batteries avancent par fenêtres de DELAI_CORRESPONDANCE secondes: un
+    passager descendu à un étage de correspondance pendant une fenêtre
+    rappelle l'ascenseur de la batterie suivante au plus tôt à la fenêtre
+    d'après, si bien que les batteries peuvent être simulées en parallèle
+    sans perte d'exactitude.
+    """
+
+    params = None
+    batteries = None
+    itineraires = None
+    # une simulation par batterie dans ce processus, ou une connexion par
+    # processus de batterie
+    _sims = None
+    _connexions = None
+    _processus = None
+    # résultats des processus de batterie, une fois ceux-ci terminés
+    _resultats = None
+    # arrivées en attente de transmission, par batterie
+    _arrivees = None
+    # flux des arrivées générées et arrivée lue en avance
+    _flux = None
+    _prochaine = None
+    # étapes restantes (batterie, origine, destination), poids, âge et date
+    # d'appel des passagers en correspondance, par n° global
+    _suite = None
+    # nombre de passagers générés, et sans itinéraire possible
+    nb_passagers = None
+    nb_sans_itineraire = None
+    # date jusqu'à laquelle les batteries ont été simulées
+    maintenant = None
+    # voyages complets des passagers en correspondance, de l'appel à la
+    # descente finale
+    voyage_correspondances = None
+
+    def __init__(self, params, batteries, graine = None, profil = None, processus = False):
+        """
+        @type  params: objet Params
+        @param params: options du bâtiment (nombre d'étages, type d'appel, politique)
+        @type  batteries: liste d'objets Batterie
+        @param batteries: batteries d'ascenseurs du bâtiment
+        @type  profil: objet ProfilTrafic
+        @param profil: profil des arrivées, par défaut une arrivée toutes les 8,5 s
+        @type  processus: Boolean
+        @param processus: True pour simuler chaque batterie dans son propre processus
+        """
+        self.params = params
+        self.batteries = batteries
+        self.itineraires = Itineraires(batteries)
+        if profil is None:
+            profil = ProfilTrafic.constant(params.nb_etages, 1 / 8.5)
+        self._flux = iter(GenerateurTrafic(profil, graine))
+        self._prochaine = next(self._flux, None)
+        self._arrivees = [[] for _ in batteries]
+        self._suite = {}
+        self.nb_passagers = 0
+        self.nb_sans_itineraire = 0
+        self.maintenant = 0.0
+        self.voyage_correspondances = HistogrammeDurees()
+        if processus:
+            self._connexions = []
+            self._processus = []
+            for batterie in batteries:
+                connexion, distante = Pipe()
+                proc = Process(target = _travailleur, args = (distante, batterie, params), daemon = True)
+                proc.start()
+                self._connexions.append(connexion)
+                self._processus.append(proc)
+        else:
+            self._sims = [SimBatterie(batterie, params) for batterie in batteries]
+
+    def __generer(self, fin):
+        """ Répartit entre les batteries les arrivées générées avant une date. """
+        while self._prochaine is not None and self._prochaine[0] < fin:
+            date, origine, destination, poids, age = self._prochaine
+            self._prochaine = next(self._flux, None)
+            etapes = self.itineraires(origine, destination)
+            if etapes is None:
+                self.nb_sans_itineraire += 1
+                continue
+            id_global = self.nb_passagers
+            self.nb_passagers += 1
+            b, depart, arrivee = etapes[0]
+            suivi = len(etapes) > 1
+            if suivi:
+                self._suite[id_global] = (etapes[1:], poids, age, date)
+            self._arrivees[b].append((date, id_global, depart, arrivee, poids, age, suivi))
+
+    def __correspondances(self, descendus):
+        """ Les passagers suivis descendus passent à leur étape suivante, ou ont terminé. """
+        for id_global, date in descendus:
+            etapes, poids, age, date_appel = self._suite.pop(id_global)
+            if not etapes:
+                self.voyage_correspondances.ajouter(date - date_appel)
+                continue
+            b, depart, arrivee = etapes[0]
+            self._suite[id_global] = (etapes[1:], poids, age, date_appel)
+            # chaque passager suivi l'est jusqu'à sa descente finale
+            self._arrivees[b].append((date + DELAI_CORRESPONDANCE, id_global, depart, arrivee,
+                                      poids, age, True))
+
+    def __avancer(self, fin):
+        """ Simule toutes les batteries jusqu'à une date, en parallèle si possible. """
+        lots = []
+        for b, arrivees in enumerate(self._arrivees):
+            arrivees.sort()
+            lots.append(arrivees)
+            self._arrivees[b] = []
+        if self._connexions:
+            for connexion, arrivees in zip(self._connexions, lots):
+                connexion.send(("avancer", arrivees, fin))
+            resultats = [connexion.recv() for connexion in self._connexions]
+        else:
+            resultats = [sim.avancer(arrivees, fin) for sim, arrivees in zip(self._sims, lots)]
+        for descendus in resultats:
+            self.__correspondances(descendus)
+
+    def lancer(self, duree):
+        """
+        Simule le bâtiment pendant une durée donnée.
+        @type  duree: nombre
+        @param duree: durée simulée en secondes
+        @raise RuntimeError: les processus des batteries sont terminés (voir resultats())
+        """
+        if self._resultats is not None:
+            raise RuntimeError("Les processus des batteries sont terminés: la simulation ne peut plus avancer.")
+        self.logger.debug("Simulation de %d s sur %d batteries (%s).", duree, len(self.batteries), self.params)
+        fin = self.maintenant + duree
+        while self.maintenant < fin:
+            fenetre = min(fin, self.maintenant + DELAI_CORRESPONDANCE)
+            self.__generer(fenetre)
+            self.__avancer(fenetre)
+            self.maintenant = fenetre
+
+    def resultats(self):
+        """
+        Résultats des batteries. Les processus des batteries sont terminés
+        au premier appel: leurs résultats sont conservés, et la simulation
+        ne peut plus avancer; sans processus, elle peut continuer.
+        @return: par batterie, son nom, son nombre d'événements et les
+                 histogrammes d'attente et de voyage de ses passagers
+        @rtype: liste de tuples
+        """
+        if self._resultats is not None:
+            return self._resultats
+        if self._connexions:
+            for connexion in self._connexions:
+                connexion.send(("resultats",))
+            self._resultats = [connexion.recv() for connexion in self._connexions]
+            for proc in self._processus:
+                proc.join()
+            self._connexions = None
+            return self._resultats
+        return [sim.resultats() for sim in self._sims]
@@ -0,0 +1,120 @@
+#!/usr/bin/python
+# -*- Encoding: utf-8 -*-
+
+# ===================================================================
+#
+# Module regroupant la cinématique des cabines: durée d'un trajet
+# d'arrêt à arrêt selon la vitesse nominale, l'accélération et le jerk,
+# et table des durées d'étage à étage calculée une fois par type de
+# cabine et par hauteur de bâtiment.
+#
+# ===================================================================
+
+import numpy as np
+
+# hauteur d'un étage en mètres
+HAUTEUR_ETAGE = 3.5
+
+
+class Cinematique:
+    """
+    Profil de mouvement d'un type de cabine: le jerk limite la variation
+    de l'accélération, qui limite celle de la vitesse, elle-même bornée
+    par la vitesse nominale (profil en S à sept phases).
+    Les durées d'étage à étage sont tabulées à la première demande pour
+    un nombre d'étages donné, puis lues directement.
+    """
+
+    # en m/s, m/s² et m/s³
+    vitesse = None
+    acceleration = None
+    jerk = None
+    # tables des durées par nombre d'étages
+    _matrices = None
+
+    def __init__(self, vitesse, acceleration, jerk):
+        self.vitesse = vitesse
+        # une vitesse nominale faible est atteinte avant l'accélération maximale
+        self.acceleration = min(acceleration, np.sqrt(vitesse * jerk))
+        self.jerk = jerk
+        self._matrices = {}
+
+    def __repr__(self):
+        return "<%.1f m/s|%.1f m/s²|%.1f m/s³>" % (self.vitesse, self.acceleration, self.jerk)
+
+    def duree(self, distance):
+        """
+        Durée d'un trajet d'arrêt à arrêt.
+        @type  distance: nombre ou tableau NumPy
+        @param distance: longueur du trajet en mètres
+        @return: durée en secondes, nulle pour un trajet nul
+        @rtype: nombre ou tableau NumPy
+        """
+        v, a, j = self.vitesse, self.acceleration, self.jerk
+        distance = np.asarray(distance, dtype = float)
+        # vitesse nominale atteinte
+        croisiere = distance / v + v / a + a / j
+        # accélération maximale atteinte, mais pas la vitesse nominale
+        pointe = (-a * a / j + np.sqrt(a ** 4 / j ** 2 + 4 * a * distance)) / 2
+        sans_croisiere = 2 * (pointe / a + a / j)
+        # ni l'une ni l'autre: quatre phases à jerk constant
+        sans_palier = 4 * np.cbrt(distance / (2 * j))
+        return np.where(distance >= v * v / a + v * a / j, croisiere,
+                        np.where(distance >= 2 * a ** 3 / j ** 2, sans_croisiere, sans_palier))
+
+    def matrice(self, nb_etages, etages = None):
+        """
+        @type  nb_etages: nombre entier
+        @param nb_etages: nombre d'étages desservis
+        @type  etages: liste de nombres entiers
+        @param etages: n° dans le bâtiment des étages desservis, si la cabine
+                       ne dessert pas tous les étages (batterie express)
+        @return: durées des trajets (étage de départ x étage d'arrivée), en secondes
+        @rtype: tableau NumPy
+        """
+        cle = tuple(etages) if etages is not None else nb_etages
+        if cle not in self._matrices:
+            if etages is None:
+                niveaux = np.arange(nb_etages)
+                durees = self.duree(niveaux * HAUTEUR_ETAGE)
+                self._matrices[cle] = durees[np.abs(niveaux[:, None] - niveaux[None, :])]
+            else:
+                niveaux = np.asarray(etages)
+                self._matrices[cle] = self.duree(np.abs(niveaux[:, None] - niveaux[None, :]) * HAUTEUR_ETAGE)
+        return self._matrices[cle]
+
+
+# types de cabine, par nom
+TYPES_CABINE = {
+    "standard": Cinematique(1.0, 0.8, 1.2),
+    "rapide": Cinematique(2.5, 1.0, 1.5),
+    "express": Cinematique(6.0, 1.2, 1.8),
+}
+
+
+def cinematique(params):
+    """
+    @type  params: objet Params
+    @param params: options communes, dont le type de cabine
+    @return: cinématique du type de cabine; à défaut, selon la hauteur
+             desservie: standard sous 15 étages, rapide jusqu'à 30, express au-delà
+    @rtype: objet Cinematique
+    """
+    if params.cabine:
+        return TYPES_CABINE[params.cabine]
+    hauteur = params.etages[-1] + 1 if params.etages else params.nb_etages
+    if hauteur < 15:
+        return TYPES_CABINE["standard"]
+    if hauteur <= 30:
+        return TYPES_CABINE["rapide"]
+    return TYPES_CABINE["express"]
+
+
+def table_trajets(params):
+    """
+    @type  params: objet Params
+    @param params: options communes
+    @return: durées des trajets entre étages desservis (voir Cinematique.matrice)
+    @rtype: tableau NumPy
+    """
+    return cinematique(params).matrice(params.nb_etages, params.etages)
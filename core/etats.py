@@ -16,10 +16,13 @@ class IEtat(ABC):
     """
     Classe abstraite d'un état générique avec ses méthodes virtuelles
     représentant les transitions. Chaque classe dérivée sera un état
-    particulier.
+    particulier, instancié une seule fois par ascenseur (voir Ascenseur.etats)
+    et réutilisé à chaque transition.
     """
-    # ascenseur associé
-    ascenseur = None
+    __slots__ = (
+        # ascenseur associé
+        "ascenseur",
+    )
 
     def __init__(self, ascenseur):
         self.ascenseur = ascenseur
@@ -39,11 +42,12 @@ class IEtat(ABC):
 
 class EtatArretFerme(IEtat):
     """ En arrêt, porte fermée """
+    __slots__ = ()
 
     def appel(self, automate):
         appel = automate.prochaine_destination(self.ascenseur)
         if appel:
-            automate.changer_etat(EtatDeplacement(self.ascenseur))
+            automate.changer_etat(self.ascenseur.etats[EtatDeplacement])
             self.ascenseur.acceder_etage(appel)
 
     def etage_demande_atteint(self, automate):
@@ -55,6 +59,7 @@ class EtatArretFerme(IEtat):
 
 class EtatArretOuvert(IEtat):
     """ En arrêt, porte ouverte """
+    __slots__ = ()
 
     def appel(self, automate):
         pass
@@ -73,6 +78,7 @@ class EtatArretOuvert(IEtat):
 
 class EtatDeplacement(IEtat):
     """ En déplacement vers un étage """
+    __slots__ = ()
 
     def appel(self, automate):
         # traité par l'automate
@@ -80,7 +86,9 @@ class EtatDeplacement(IEtat):
 
     def etage_demande_atteint(self, automate, appel):
         # self.logger.debug("Etage demandé atteint.")
-        automate.changer_etat(EtatArretOuvert(self.ascenseur))
+        automate.changer_etat(self.ascenseur.etats[EtatArretOuvert])
+        # les passagers arrivés à destination descendent
+        self.ascenseur.debarquer()
         # demande d'extinction du bouton
         automate.allumage_bouton(appel, False)
         # purge les demandes pour cet étage
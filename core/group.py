@@ -1,106 +1,213 @@
-class Person:
-    
-    # étage demandé
-    etage_demande = None
-    # étage actuel
-    etage_actuel = None
-    # sens
-    sens = None
-    # si zéro, appel externe, sinon n° de l'ascenseur concerné
-    num_asc = None
-    # for capacity reasons.
-    weight = None
-    # for graphical reasons.
-    gender = None
-    # for graphical and permission reasons. for example, age below than 12 cannot enter alone.
-    age = None
-    
-    def __init__(self, etage_actuel, etage_demande, weight, gender, age):
-        
-        self.etage_actuel = etage_actuel
-        self.etage_demande = etage_demande
-
-        self.weight = weight
-        self.gender = gender
-        self.age = age
+#!/usr/bin/python
+# -*- Encoding: utf-8 -*-
+
+# ===================================================================
+#
+# Module regroupant la population de passagers: une colonne NumPy par
+# attribut (origine, destination, poids, âge, ascenseur, état) et des
+# groupes de passagers désignés par leurs n° dans ces colonnes.
+#
+# ===================================================================
+
+from enum import IntEnum
+import numpy as np
+
+
+class ETAT_PASSAGER(IntEnum):
+    """ Passager attendant à son étage, à bord d'une cabine ou arrivé. """
+    ATTENTE = 0
+    A_BORD = 1
+    ARRIVE = 2
+
+
+class Population:
+    """
+    Passagers d'une simulation, rangés par colonnes et indexés par n° de
+    passager dans l'ordre d'arrivée. La capacité double lorsqu'elle est
+    atteinte. Les sélections (en attente à un étage, à bord d'une cabine,
+    arrivés à destination) sont des masques calculés sur la fenêtre des
+    passagers encore actifs: les passagers arrivés en début de colonnes
+    ne sont plus parcourus.
+    """
+
+    __slots__ = (
+        # nombre de passagers enregistrés
+        "nb",
+        # n° du premier passager qui n'est pas encore arrivé
+        "_debut",
+        # colonnes indexées par n° de passager
+        "origine",
+        "destination",
+        # en kg
+        "poids",
+        # en années; un enfant ne voyage pas seul
+        "age",
+        # -1 tant que le passager n'est pas monté
+        "num_asc",
+        # n° de l'ascenseur désigné au palier (appels par destination), 0 sinon
+        "affectation",
+        # valeurs de ETAT_PASSAGER
+        "etat",
+    )
+
+    def __init__(self, capacite = 4096):
+        self.nb = 0
+        self._debut = 0
+        self.origine = np.zeros(capacite, dtype = np.int32)
+        self.destination = np.zeros(capacite, dtype = np.int32)
+        self.poids = np.zeros(capacite, dtype = np.float32)
+        self.age = np.zeros(capacite, dtype = np.int16)
+        self.num_asc = np.full(capacite, -1, dtype = np.int32)
+        self.affectation = np.zeros(capacite, dtype = np.int32)
+        self.etat = np.full(capacite, ETAT_PASSAGER.ARRIVE, dtype = np.int8)
 
-    def __str__(self):
-        return "[Enter: %d, Exit: %d]"%(self.etage_actuel, self.etage_demande)
+    def __len__(self):
+        return self.nb
+
+    def _agrandir(self):
+        """ Double la capacité des colonnes. """
+        capacite = len(self.origine)
+        for nom, defaut in (("origine", 0), ("destination", 0), ("poids", 0),
+                            ("age", 0), ("num_asc", -1), ("affectation", 0),
+                            ("etat", ETAT_PASSAGER.ARRIVE)):
+            colonne = getattr(self, nom)
+            setattr(self, nom, np.concatenate((colonne, np.full(capacite, defaut, dtype = colonne.dtype))))
+
+    def ajouter(self, origine, destination, poids, age):
+        """
+        Un passager arrive à son étage d'origine et attend.
+        @type  poids: nombre
+        @param poids: poids en kg
+        @type  age: nombre entier
+        @param age: âge en années
+        @return: n° du passager
+        @rtype: nombre entier
+        """
+        if self.nb == len(self.origine):
+            self._agrandir()
+        idx = self.nb
+        self.origine[idx] = origine
+        self.destination[idx] = destination
+        self.poids[idx] = poids
+        self.age[idx] = age
+        self.affectation[idx] = 0
+        self.etat[idx] = ETAT_PASSAGER.ATTENTE
+        self.nb += 1
+        return idx
+
+    def _actifs(self, etat):
+        """ Masque des passagers actifs dans un état, sur la fenêtre [_debut, nb[ """
+        return self.etat[self._debut:self.nb] == etat
+
+    def en_attente(self, etage):
+        """
+        @return: groupe des passagers qui attendent à un étage, par ordre d'arrivée
+        @rtype: objet People
+        """
+        masque = self._actifs(ETAT_PASSAGER.ATTENTE) & (self.origine[self._debut:self.nb] == etage)
+        return People(self, np.flatnonzero(masque) + self._debut)
+
+    def affectes(self, num_asc, etage = None):
+        """
+        @type  num_asc: nombre entier
+        @param num_asc: n° de l'ascenseur désigné au palier, 0 pour tous les
+                        passagers ayant un ascenseur désigné
+        @type  etage: nombre entier
+        @param etage: étage d'attente, None pour tous les étages
+        @return: groupe des passagers en attente de l'ascenseur qui leur a été
+                 désigné (appels par destination), par ordre d'arrivée
+        @rtype: objet People
+        """
+        fenetre = slice(self._debut, self.nb)
+        affectation = self.affectation[fenetre]
+        masque = self._actifs(ETAT_PASSAGER.ATTENTE) & (affectation == num_asc if num_asc else affectation > 0)
+        if etage is not None:
+            masque &= self.origine[fenetre] == etage
+        return People(self, np.flatnonzero(masque) + self._debut)
+
+    def a_descendre(self, num_asc, etage):
+        """
+        @return: groupe des passagers à bord d'un ascenseur dont c'est l'étage de destination
+        @rtype: objet People
+        """
+        fenetre = slice(self._debut, self.nb)
+        masque = self._actifs(ETAT_PASSAGER.A_BORD) & (self.num_asc[fenetre] == num_asc) \
+            & (self.destination[fenetre] == etage)
+        return People(self, np.flatnonzero(masque) + self._debut)
+
+    def embarquer(self, groupe, num_asc):
+        """ Les passagers d'un groupe montent dans la cabine d'un ascenseur. """
+        self.etat[groupe.ids] = ETAT_PASSAGER.A_BORD
+        self.num_asc[groupe.ids] = num_asc
+
+    def debarquer(self, groupe):
+        """ Les passagers d'un groupe descendent de la cabine à leur étage. """
+        self.etat[groupe.ids] = ETAT_PASSAGER.ARRIVE
+        # la fenêtre des actifs avance sur les passagers arrivés
+        actifs = np.flatnonzero(self.etat[self._debut:self.nb] != ETAT_PASSAGER.ARRIVE)
+        self._debut = self._debut + int(actifs[0]) if len(actifs) else self.nb
 
 
 class People:
+    """
+    Groupe de passagers d'une population, désigné par leurs n°; les
+    attributs du groupe sont lus dans les colonnes de la population.
+    """
 
-    people = None
-
-    weight = None
-    # étage actuel
-    etage_actuel = None
-
-    def __init__(self, people, etage_actuel):
-
-        self.people = people
-        self.etage_actuel = etage_actuel
+    __slots__ = (
+        "population",
+        # n° des passagers, tableau NumPy
+        "ids",
+    )
 
-        for person in people:
-            if not isinstance(person, Person):
-                self.people = None
-                break
-            if person.etage_actuel != self.etage_actuel:
-                self.people = None
-                break
-            # sum their weights.
-            self.weight = self.weight + person.weight
+    def __init__(self, population, ids = ()):
+        self.population = population
+        self.ids = np.asarray(ids, dtype = np.intp)
 
     def __iter__(self):
-        return self.people.__iter__()
+        return iter(self.ids.tolist())
 
     def __len__(self):
-        return len(self.people) 
+        return len(self.ids)
 
     def __str__(self):
-        st = ""
-        for p in self.people:
-            st = st + str(p) + "\n"
-        return st
+        return "\n".join("[Enter: %d, Exit: %d]" % (o, d)
+                         for o, d in zip(self.enter_floors.tolist(), self.exit_floors.tolist()))
+
+    @property
+    def weight(self):
+        """ Poids total du groupe en kg """
+        return float(self.population.poids[self.ids].sum())
+
+    @property
+    def ages(self):
+        return self.population.age[self.ids]
+
+    @property
+    def enter_floors(self):
+        return self.population.origine[self.ids]
+
+    @property
+    def exit_floors(self):
+        return self.population.destination[self.ids]
 
     def join(self, new):
-        self.people.extend(new.people)
-        # for p in new:
-        #     self.people.append(p)
+        self.ids = np.concatenate((self.ids, new.ids))
 
     def get_weight(self):
-        weight = 0
-        for p in self.people:
-            weight = weight + p.weight
-        return weight
-
-    def add_person(self, p):
-        self.people.append(p)
+        return self.weight
 
     def get_enter_floor(self, floor_nb):
-        new_group = People([])
-        for p in self.people:
-            if p.enter_floor == floor_nb:
-                new_group.add_person(p)
-        return new_group
+        return People(self.population, self.ids[self.enter_floors == floor_nb])
 
     def get_exit_floor(self, floor_nb):
-        new_group = People([])
-        for p in self.people:
-            # print("p: %d = floor: %d"% (p.exit_floor,floor_nb))
-            if p.exit_floor == floor_nb:
-                new_group.add_person(p)
-        return new_group
+        return People(self.population, self.ids[self.exit_floors == floor_nb])
 
     def remove_sub_group(self, sub_group):
-        lst = []
-        for p in self.people:
-            if p not in sub_group.people:
-                lst.append(p)
-        self.people = lst
+        self.ids = self.ids[~np.isin(self.ids, sub_group.ids)]
 
     def remove_all(self):
-        self.people = []
+        self.ids = self.ids[:0]
 
     def get_nb(self):
-        return len(self.people)
\ No newline at end of file
+        return len(self.ids)
@@ -11,12 +11,23 @@ from logging import getLogger
 
 
 class Log:
-    """Les classes dérivées auront leur nom dans le journal d'erreur"""
+    """
+    Les classes dérivées auront leur nom dans le journal d'erreur.
 
-    @property
-    def logger(self):
-        """ Remplace la méthode logging.logger() """
-        # récupération du nom de la classe dérivée pour l'afficher
-        name = self.__class__.__name__
-        logger = getLogger(name)
-        return logger
+    Le journal est obtenu une seule fois, à la création de chaque classe
+    dérivée, et lu ensuite comme un simple attribut de classe.
+    Les messages de débogage sont formatés par le journal (arguments
+    séparés du format), donc seulement s'ils sont émis; sur les chemins
+    critiques, ils sont de plus placés sous "if __debug__:" et disparaissent
+    du code compilé avec "python -O" (mode rapide des simulations par lot).
+    """
+
+    # pas d'attribut d'instance: les classes dérivées peuvent être compactes (__slots__)
+    __slots__ = ()
+    # journal au nom de la classe
+    logger = getLogger("Log")
+
+    def __init_subclass__(cls, **kwargs):
+        """ Journal de la classe dérivée, au nom de celle-ci """
+        super().__init_subclass__(**kwargs)
+        cls.logger = getLogger(cls.__name__)
@@ -0,0 +1,179 @@
+#!/usr/bin/python
+# -*- Encoding: utf-8 -*-
+
+# ===================================================================
+#
+# Module regroupant les indicateurs par passager: dates d'appel, de
+# montée et de descente, et centiles des temps d'attente et de trajet.
+#
+# ===================================================================
+
+import numpy as np
+
+
+class HistogrammeDurees:
+    """
+    Résumé en flux d'une durée: un histogramme donne les centiles en
+    mémoire constante, quel que soit le nombre de valeurs, et deux
+    histogrammes de mêmes classes s'additionnent.
+    Les classes ont un pas fixe jusqu'à pas / precision secondes, puis
+    s'élargissent géométriquement: l'erreur relative d'un centile reste
+    inférieure à precision jusqu'à duree_max, bien au-delà d'une journée.
+    """
+
+    # largeur en secondes des classes à pas fixe
+    pas = None
+    # largeur relative des classes au-delà, et durée où elles commencent
+    precision = None
+    seuil = None
+    # nombre de classes à pas fixe
+    nb_lineaires = None
+    # effectif par classe, la dernière regroupe les dépassements de duree_max
+    comptes = None
+    nb = None
+    somme = None
+    maximum = None
+
+    def __init__(self, pas = 0.5, precision = 0.01, duree_max = 1e7):
+        self.pas = pas
+        self.precision = precision
+        self.nb_lineaires = int(round(1.0 / precision))
+        self.seuil = self.nb_lineaires * pas
+        self.comptes = np.zeros(self._classes(np.array([duree_max]))[0] + 2, dtype = np.int64)
+        self.nb = 0
+        self.somme = 0.0
+        self.maximum = 0.0
+
+    def _classes(self, durees):
+        """ Classes de durées en secondes, sans limite haute. """
+        lineaires = (durees / self.pas).astype(np.int64)
+        relatives = np.log(np.maximum(durees, self.seuil) / self.seuil) / np.log1p(self.precision)
+        geometriques = self.nb_lineaires + relatives.astype(np.int64)
+        return np.where(durees < self.seuil, lineaires, geometriques)
+
+    def _borne_haute(self, idx):
+        """ Borne haute en secondes d'une classe. """
+        if idx < self.nb_lineaires:
+            return (idx + 1) * self.pas
+        return self.seuil * (1 + self.precision) ** (idx - self.nb_lineaires + 1)
+
+    def ajouter(self, duree):
+        """ Compte une durée en secondes. """
+        self.ajouter_lot(np.array([duree], dtype = float))
+
+    def ajouter_lot(self, durees):
+        """ Compte un tableau de durées en secondes. """
+        if not len(durees):
+            return
+        classes = np.minimum(self._classes(durees), len(self.comptes) - 1)
+        np.add.at(self.comptes, classes, 1)
+        self.nb += len(durees)
+        self.somme += float(durees.sum())
+        self.maximum = max(self.maximum, float(durees.max()))
+
+    def fusionner(self, autre):
+        """ Ajoute les valeurs d'un histogramme de mêmes classes. """
+        if (autre.pas, autre.precision, len(autre.comptes)) != (self.pas, self.precision, len(self.comptes)):
+            raise ValueError("Histogrammes de classes différentes.")
+        self.comptes += autre.comptes
+        self.nb += autre.nb
+        self.somme += autre.somme
+        self.maximum = max(self.maximum, autre.maximum)
+
+    def centile(self, q):
+        """
+        @type  q: nombre
+        @param q: rang du centile, entre 0 et 100
+        @return: borne haute de la classe contenant le centile (le maximum
+                 pour la classe des dépassements), None sans valeur
+        @rtype: nombre
+        """
+        if not self.nb:
+            return None
+        idx = int(np.searchsorted(np.cumsum(self.comptes), q / 100.0 * self.nb))
+        if idx >= len(self.comptes) - 1:
+            return self.maximum
+        return min(self._borne_haute(idx), self.maximum)
+
+    def resume(self):
+        """
+        @return: nombre de valeurs, moyenne, p50, p95, p99 et maximum
+        @rtype: dictionnaire
+        """
+        return {"nb": self.nb,
+                "moyenne": self.somme / self.nb if self.nb else None,
+                "p50": self.centile(50),
+                "p95": self.centile(95),
+                "p99": self.centile(99),
+                "max": self.maximum if self.nb else None}
+
+
+class Mesures:
+    """
+    Horodatage des passagers dans des tableaux préalloués, indexés par
+    n° de passager (voir Population): appel à l'étage, montée, puis
+    descente de la cabine.
+    La capacité double lorsqu'elle est atteinte. Les histogrammes
+    d'attente (appel -> montée), de trajet (montée -> descente) et de
+    voyage (appel -> descente) sont tenus à jour au fil de l'eau.
+    """
+
+    # nombre de passagers enregistrés
+    nb = None
+    # colonnes indexées par n° de passager (NaN tant que non renseigné)
+    date_appel = None
+    date_montee = None
+    date_descente = None
+    # résumés en flux
+    attente = None
+    trajet = None
+    voyage = None
+
+    def __init__(self, capacite = 4096):
+        self.nb = 0
+        self.date_appel = np.full(capacite, np.nan)
+        self.date_montee = np.full(capacite, np.nan)
+        self.date_descente = np.full(capacite, np.nan)
+        self.attente = HistogrammeDurees()
+        self.trajet = HistogrammeDurees()
+        self.voyage = HistogrammeDurees()
+
+    def __len__(self):
+        return self.nb
+
+    def _agrandir(self):
+        """ Double la capacité des colonnes. """
+        for nom in ("date_appel", "date_montee", "date_descente"):
+            colonne = getattr(self, nom)
+            setattr(self, nom, np.concatenate((colonne, np.full(len(colonne), np.nan))))
+
+    def arrivee(self, idx, date):
+        """
+        Un passager appelle l'ascenseur.
+        @type  idx: nombre entier
+        @param idx: n° du passager, attribué par la population
+        """
+        while idx >= len(self.date_appel):
+            self._agrandir()
+        self.date_appel[idx] = date
+        self.nb = max(self.nb, idx + 1)
+
+    def montee(self, ids, date):
+        """ Des passagers montent dans la cabine d'un ascenseur. """
+        self.date_montee[ids] = date
+        self.attente.ajouter_lot(date - self.date_appel[ids])
+
+    def descente(self, ids, date):
+        """ Des passagers descendent de la cabine à leur étage. """
+        self.date_descente[ids] = date
+        self.trajet.ajouter_lot(date - self.date_montee[ids])
+        self.voyage.ajouter_lot(date - self.date_appel[ids])
+
+    def resume(self):
+        """
+        @return: résumés de l'attente, du trajet et du voyage
+        @rtype: dictionnaire de dictionnaires
+        """
+        return {"attente": self.attente.resume(),
+                "trajet": self.trajet.resume(),
+                "voyage": self.voyage.resume()}
@@ -0,0 +1,313 @@
+#!/usr/bin/python
+# -*- Encoding: utf-8 -*-
+
+# ===================================================================
+#
+# Module regroupant le moteur de simulation à événements discrets:
+# une horloge simulée et une file de priorité d'événements remplacent
+# les threads et les temporisations réelles, sans dépendre de Gtk.
+#
+# ===================================================================
+
+from heapq import heappush, heappop
+from itertools import count
+from queue import SimpleQueue, Empty
+from time import monotonic
+from core.log import Log
+from core.structures import Batiment
+from core.trafic import GenerateurTrafic, ProfilTrafic
+from core.trace import EnregistreurTrace, RejeuTrace, verifier_trace
+
+
+class Evenement:
+    """
+    Action planifiée à une date de l'horloge simulée.
+    """
+
+    __slots__ = (
+        # date d'échéance en secondes simulées
+        "date",
+        # fonction appelée à l'échéance et ses arguments
+        "fn",
+        "args",
+    )
+
+    def __init__(self, date, fn, args):
+        self.date = date
+        self.fn = fn
+        self.args = args
+
+    def __repr__(self):
+        return "<T=%.2f|%s>" % (self.date, getattr(self.fn, "__name__", self.fn))
+
+
+class Ordonnanceur(Log):
+    """
+    File de priorité (tas) d'événements datés sur une horloge simulée.
+    L'horloge saute directement d'une échéance à la suivante: aucune
+    attente réelle n'est effectuée.
+
+    L'ordonnanceur est l'unique écrivain de l'automate: seul le thread qui
+    l'exécute modifie l'état de la simulation. Les autres threads passent
+    par soumettre(), dont les commandes sont exécutées dans l'ordre
+    d'arrivée, entre deux événements.
+    """
+
+    # date courante de l'horloge simulée, en secondes
+    maintenant = None
+    # tas de triplets (date, n° d'ordre, Evenement)
+    _file = None
+    # départage les événements de même date dans l'ordre de planification
+    _compteur = None
+    # nombre d'événements exécutés
+    nb_evenements = None
+    # commandes soumises par d'autres threads, en attente d'exécution
+    _commandes = None
+
+    def __init__(self):
+        self.maintenant = 0.0
+        self._file = []
+        self._compteur = count()
+        self.nb_evenements = 0
+        self._commandes = SimpleQueue()
+
+    def __len__(self):
+        return len(self._file)
+
+    def planifier(self, delai, fn, *args):
+        """
+        Planifie un appel de fonction après un délai simulé.
+        @type  delai: nombre
+        @param delai: délai en secondes à partir de la date courante
+        @type  fn: fonction
+        @param fn: fonction appelée à l'échéance avec les arguments <args>
+        @return: événement planifié
+        @rtype: objet Evenement
+        """
+        evt = Evenement(self.maintenant + delai, fn, args)
+        heappush(self._file, (evt.date, next(self._compteur), evt))
+        return evt
+
+    def soumettre(self, fn, *args):
+        """
+        Demande l'exécution d'une fonction par le thread de l'ordonnanceur,
+        à la date courante. Seule méthode utilisable depuis un autre thread.
+        @type  fn: fonction
+        @param fn: fonction appelée avec les arguments <args>
+        """
+        self._commandes.put((fn, args))
+
+    def _executer_commandes(self):
+        """ Exécute les commandes soumises, dans leur ordre d'arrivée. """
+        while True:
+            try:
+                fn, args = self._commandes.get_nowait()
+            except Empty:
+                return
+            fn(*args)
+
+    def arreter(self):
+        """ Abandonne tous les événements et commandes en attente. """
+        self._file = []
+        self._commandes = SimpleQueue()
+
+    def prochaine_echeance(self):
+        """
+        @return: date du prochain événement, None si la file est vide
+        @rtype: nombre
+        """
+        if self._file:
+            return self._file[0][0]
+        return None
+
+    def executer_jusqua(self, date):
+        """
+        Exécute dans l'ordre tous les événements échus à la date donnée,
+        puis avance l'horloge à cette date.
+        @type  date: nombre
+        @param date: date simulée à atteindre
+        """
+        self._executer_commandes()
+        while self._file and self._file[0][0] <= date:
+            if not self._commandes.empty():
+                self._executer_commandes()
+            _date, _ordre, evt = heappop(self._file)
+            self.maintenant = evt.date
+            self.nb_evenements += 1
+            evt.fn(*evt.args)
+        if date > self.maintenant:
+            self.maintenant = date
+
+
+class HorlogeSimulee:
+    """
+    Date simulée suivant le temps réel à un facteur de vitesse près, pour
+    l'affichage en direct: accélérée, ralentie, suspendue ou avancée pas à
+    pas. La correspondance entre temps réel et temps simulé est recalée à
+    chaque changement, si bien que la date simulée reste continue.
+    """
+
+    # secondes simulées par seconde réelle
+    vitesse = None
+    # True si la date simulée est figée
+    en_pause = None
+    # date réelle de recalage et date simulée correspondante
+    _reel = None
+    _simule = None
+
+    def __init__(self, vitesse = 1.0):
+        """
+        @type  vitesse: nombre
+        @param vitesse: facteur d'accélération (1 pour le temps réel)
+        """
+        self.vitesse = vitesse
+        self.en_pause = False
+        self._reel = monotonic()
+        self._simule = 0.0
+
+    def maintenant(self):
+        """
+        @return: date simulée courante, en secondes
+        @rtype: nombre
+        """
+        if self.en_pause:
+            return self._simule
+        return self._simule + (monotonic() - self._reel) * self.vitesse
+
+    def _recaler(self):
+        """ La date simulée courante devient la référence. """
+        self._simule = self.maintenant()
+        self._reel = monotonic()
+
+    def changer_vitesse(self, vitesse):
+        """ Nouveau facteur d'accélération, à partir de maintenant. """
+        self._recaler()
+        self.vitesse = vitesse
+
+    def suspendre(self):
+        """ Fige la date simulée. """
+        self._recaler()
+        self.en_pause = True
+
+    def reprendre(self):
+        """ La date simulée suit de nouveau le temps réel. """
+        self._recaler()
+        self.en_pause = False
+
+    def avancer(self, date):
+        """
+        Pas à pas: la date simulée saute à une date ultérieure.
+        @type  date: nombre
+        @param date: date simulée à atteindre, ignorée si elle est passée
+        """
+        self._recaler()
+        self._simule = max(self._simule, date)
+
+    def delai_reel(self, date):
+        """
+        @return: secondes réelles avant une date simulée, None en pause
+        @rtype: nombre
+        """
+        if self.en_pause:
+            return None
+        return max(0.0, date - self.maintenant()) / self.vitesse
+
+
+class PiloteSimule:
+    """
+    Exécutant des actions temporisées d'un ascenseur sur l'horloge simulée.
+    Il offre la même interface que AscenseurGui, sans animation.
+    """
+
+    ascenseur = None
+    ordonnanceur = None
+
+    def __init__(self, ascenseur, ordonnanceur):
+        """
+        @type  ascenseur: objet Ascenseur
+        @param ascenseur: ascenseur piloté
+        @type  ordonnanceur: objet Ordonnanceur
+        @param ordonnanceur: horloge simulée
+        """
+        self.ascenseur = ascenseur
+        self.ordonnanceur = ordonnanceur
+
+    def ouvrir_porte(self, delai, fn_retour):
+        """ Ouverture de la porte dans le délai en seconde(s). """
+        self.ordonnanceur.planifier(delai, fn_retour, self.ascenseur)
+
+    def fermer_porte(self, delai, fn_retour):
+        """ Fermeture de la porte dans le délai en seconde(s). """
+        self.ordonnanceur.planifier(delai, fn_retour, self.ascenseur)
+
+    def deplacement(self, duree, fn_arrivee):
+        """
+        Planifie la seule arrivée à destination: les étages intermédiaires
+        ne donnent lieu à aucun événement.
+        @type  duree: nombre
+        @param duree: durée du trajet en seconde(s)
+        @type  fn_arrivee: fonction
+        @param fn_arrivee: fonction appelée en fin de tâche
+        """
+        self.ordonnanceur.planifier(duree, fn_arrivee)
+
+
+class MoteurSimulation(Log):
+    """
+    Simulation sans affichage d'un bâtiment: l'automate, les ascenseurs et
+    leurs états sont pilotés directement par l'ordonnanceur, aussi vite que
+    le processeur le permet.
+    """
+
+    params = None
+    ordonnanceur = None
+    batiment = None
+
+    def __init__(self, params, graine = None, profil = None, trace = None):
+        """
+        @type  params: objet Params
+        @param params: regroupe les options communes
+        @type  graine: nombre entier
+        @param graine: graine du trafic, pour rejouer exactement une simulation
+        @type  profil: objet ProfilTrafic
+        @param profil: profil des arrivées, par défaut une arrivée toutes les 8,5 s
+        @type  trace: tableau NumPy de type TYPE_TRACE
+        @param trace: arrivées enregistrées à rejouer; le trafic n'est alors pas généré
+        """
+        self.params = params
+        self.ordonnanceur = Ordonnanceur()
+        if trace is not None:
+            verifier_trace(trace, params.nb_etages)
+            generateur = RejeuTrace(trace)
+        else:
+            if profil is None:
+                profil = ProfilTrafic.constant(params.nb_etages, 1 / 8.5)
+            generateur = GenerateurTrafic(profil, graine)
+        self.batiment = Batiment(None, params, self.ordonnanceur, generateur)
+        for asc in self.batiment.automate.ascenseurs:
+            asc.pilote = PiloteSimule(asc, self.ordonnanceur)
+
+    def enregistrer_trace(self):
+        """
+        Active l'enregistrement de toutes les arrivées de passagers.
+        @rtype: objet EnregistreurTrace
+        """
+        self.batiment.automate.enregistreur = EnregistreurTrace()
+        return self.batiment.automate.enregistreur
+
+    def lancer(self, duree):
+        """
+        Simule le fonctionnement du bâtiment pendant une durée donnée.
+        @type  duree: nombre
+        @param duree: durée simulée en secondes
+        @return: nombre d'événements exécutés
+        @rtype: nombre entier
+        """
+        self.logger.debug("Simulation de %d s (%s).", duree, self.params)
+        nb_evenements = self.ordonnanceur.nb_evenements
+        self.ordonnanceur.executer_jusqua(self.ordonnanceur.maintenant + duree)
+        return self.ordonnanceur.nb_evenements - nb_evenements
+
+    def arreter(self):
+        """ Arrêt de la simulation """
+        self.batiment.on_simu_stop()
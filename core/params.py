@@ -0,0 +1,41 @@
+#!/usr/bin/python
+# -*- Encoding: utf-8 -*-
+
+# ===================================================================
+#
+# Module regroupant les options de simulation, communes à l'interface
+# graphique et au moteur sans affichage.
+#
+# ===================================================================
+
+
+class Params:
+    """
+    Options communes échangées entre objets.
+    """
+
+    nb_etages = None
+    nb_asc = None
+    # 1 = un bouton d'appel par étage, 2 = deux boutons (haut et bas),
+    # 3 = destination saisie au palier
+    type_appel = None
+    # nom de la politique de répartition des appels (voir core.politiques)
+    politique = None
+    # type de cabine (voir core.cinematique), None pour le choisir selon la hauteur
+    cabine = None
+    # n° dans le bâtiment des étages desservis, par ordre croissant; None si
+    # les nb_etages étages sont tous desservis (voir core.batteries)
+    etages = None
+
+    def __init__(self, nb_etages, nb_asc, type_appel, politique = "collective", cabine = None,
+                 etages = None):
+        self.nb_etages = nb_etages
+        self.nb_asc = nb_asc
+        self.type_appel = type_appel
+        self.politique = politique
+        self.cabine = cabine
+        self.etages = etages
+
+    def __repr__(self):
+        return "Etages: %d - Asc.: %d - appels: %d - politique: %s - cabine: %s" % \
+            (self.nb_etages, self.nb_asc, self.type_appel, self.politique, self.cabine or "auto")
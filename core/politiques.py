@@ -0,0 +1,465 @@
+#!/usr/bin/python
+# -*- Encoding: utf-8 -*-
+
+# ===================================================================
+#
+# Module regroupant les politiques de répartition des appels entre les
+# ascenseurs, l'évaluateur vectorisé de leurs coûts, et l'affectation
+# des passagers saisissant leur destination au palier.
+#
+# ===================================================================
+
+from abc import ABC, abstractmethod
+import numpy as np
+from core.log import Log
+from core.activite import SENS, NB_PLACES, CHARGE_MAX
+from core.etats import EtatArretFerme
+from core.cinematique import table_trajets
+
+# correspondance entre le sens et sa valeur numérique
+VALEUR_SENS = {SENS.AUCUN: 0, SENS.HAUT: 1, SENS.BAS: -1}
+
+
+class EvaluateurCouts:
+    """
+    Evalue d'un seul bloc les coûts de tous les couples (ascenseur, appel)
+    à partir de tableaux NumPy décrivant les ascenseurs et les appels, au
+    lieu d'une boucle Python par couple.
+    """
+
+    nb_etages = None
+    # durées des trajets d'étage à étage en secondes (voir Cinematique.matrice)
+    temps_trajet = None
+    # temps d'un arrêt: ouverture, attente et fermeture de la porte
+    temps_arret = None
+
+    def __init__(self, nb_etages, temps_trajet = None, temps_arret = 6.0):
+        self.nb_etages = nb_etages
+        if temps_trajet is None:
+            # à défaut, 2 secondes par étage
+            etages = np.arange(nb_etages)
+            temps_trajet = 2.0 * np.abs(etages[:, None] - etages[None, :])
+        self.temps_trajet = temps_trajet
+        self.temps_arret = temps_arret
+
+    def etat_ascenseurs(self, automate):
+        """
+        Photographie des ascenseurs sous forme de tableaux indexés par
+        (n° d'ascenseur - 1).
+        @type  automate: objet Automate
+        @param automate: automate gérant les ascenseurs
+        @return: positions, étages visés, sens (-1, 0 ou 1), charges (nombre
+                 d'arrêts internes demandés), disponibilités (à l'arrêt,
+                 porte fermée), et la matrice booléenne (ascenseurs x étages)
+                 des arrêts internes
+        @rtype: tuple de tableaux NumPy
+        """
+        ascenseurs = automate.ascenseurs
+        nb_asc = len(ascenseurs)
+        positions = np.empty(nb_asc)
+        cibles = np.empty(nb_asc)
+        sens = np.zeros(nb_asc, dtype = np.int8)
+        libres = np.zeros(nb_asc, dtype = bool)
+        arrets = np.zeros((nb_asc, self.nb_etages), dtype = bool)
+        maintenant = automate.batiment.ordonnanceur.maintenant
+        for idx, asc in enumerate(ascenseurs):
+            positions[idx] = asc.etage_atteint(maintenant)
+            cibles[idx] = asc.appel.etage if asc.appel else asc.etage_courant
+            libres[idx] = isinstance(asc.etat, EtatArretFerme)
+            arrets[idx, automate.appels.etages_asc(asc.num_asc)] = True
+            # un ascenseur à l'arrêt garde le sens de son dernier déplacement
+            # tant qu'il lui reste des arrêts à desservir
+            if not libres[idx] or arrets[idx].any():
+                sens[idx] = VALEUR_SENS[asc.sens]
+        charges = arrets.sum(axis = 1)
+        return positions, cibles, sens, charges, libres, arrets
+
+    @staticmethod
+    def etat_appels(appels):
+        """
+        @type  appels: liste d'objets Appel
+        @param appels: appels à évaluer
+        @return: étages, sens (-1, 0 ou 1) et n° d'ascenseur des appels
+        @rtype: tuple de tableaux NumPy
+        """
+        nb = len(appels)
+        etages = np.fromiter((appel.etage for appel in appels), dtype = float, count = nb)
+        sens = np.fromiter((VALEUR_SENS[appel.sens] for appel in appels), dtype = np.int8, count = nb)
+        num_asc = np.fromiter((appel.num_asc for appel in appels), dtype = int, count = nb)
+        return etages, sens, num_asc
+
+    @staticmethod
+    def distances(positions, cibles, etages):
+        """
+        Etages à parcourir par chaque ascenseur pour atteindre chaque appel,
+        en terminant d'abord son déplacement en cours.
+        """
+        return np.abs(positions - cibles)[:, None] + np.abs(cibles[:, None] - etages[None, :])
+
+    @staticmethod
+    def au_passage(positions, sens, etages, sens_appels):
+        """
+        Appels desservis au passage: ascenseur à l'arrêt, ou appel situé
+        devant l'ascenseur et dans le même sens.
+        @return: matrice booléenne (ascenseurs x appels)
+        @rtype: tableau NumPy
+        """
+        devant = (etages[None, :] - positions[:, None]) * sens[:, None] >= 0
+        compatible = (sens_appels[None, :] == 0) | (sens_appels[None, :] == sens[:, None])
+        return (sens[:, None] == 0) | (devant & compatible)
+
+    @classmethod
+    def distances_directionnelles(cls, positions, sens, bornes, etages, sens_appels):
+        """
+        Etages à parcourir en continuant dans le sens courant: un appel situé
+        devant l'ascenseur et dans le même sens est desservi au passage, les
+        autres après le demi-tour à la borne.
+        @type  bornes: tableau NumPy
+        @param bornes: étage de demi-tour de chaque ascenseur
+        """
+        direct = np.abs(etages[None, :] - positions[:, None])
+        detour = np.abs(bornes - positions)[:, None] + np.abs(bornes[:, None] - etages[None, :])
+        return np.where(cls.au_passage(positions, sens, etages, sens_appels), direct, detour)
+
+    def temps_directionnels(self, positions, sens, bornes, etages, sens_appels):
+        """
+        Durées des parcours de distances_directionnelles(), lues dans la
+        table des trajets: directement jusqu'à l'appel, ou en deux trajets
+        par l'étage de demi-tour.
+        """
+        positions, bornes, idx_etages = positions.astype(int), bornes.astype(int), etages.astype(int)
+        direct = self.temps_trajet[positions[:, None], idx_etages[None, :]]
+        detour = self.temps_trajet[positions, bornes][:, None] + self.temps_trajet[bornes[:, None], idx_etages[None, :]]
+        return np.where(self.au_passage(positions, sens, etages, sens_appels), direct, detour)
+
+    def bornes_look(self, positions, cibles, sens, arrets):
+        """ Demi-tour au dernier arrêt demandé dans le sens courant (LOOK). """
+        indices = np.arange(self.nb_etages)
+        haut = np.where(arrets, indices, -1).max(axis = 1)
+        bas = np.where(arrets, indices, self.nb_etages).min(axis = 1)
+        bornes = cibles.copy()
+        bornes = np.where(sens > 0, np.maximum(np.maximum(bornes, haut), positions), bornes)
+        bornes = np.where(sens < 0, np.minimum(np.minimum(bornes, bas), positions), bornes)
+        return bornes
+
+    def bornes_scan(self, positions, sens):
+        """ Demi-tour aux extrémités du bâtiment (SCAN). """
+        return np.where(sens > 0, self.nb_etages - 1, np.where(sens < 0, 0, positions)).astype(float)
+
+    @staticmethod
+    def arrets_entre(arrets, debuts, fins):
+        """
+        Nombre d'arrêts demandés strictement entre deux étages, bornes exclues.
+        @type  arrets: tableau NumPy
+        @param arrets: matrice booléenne (ascenseurs x étages) des arrêts
+        @type  debuts: tableau NumPy
+        @param debuts: étages de départ, de forme (ascenseurs x appels) ou diffusable
+        @type  fins: tableau NumPy
+        @param fins: étages d'arrivée, de même forme
+        @rtype: tableau NumPy (ascenseurs x appels)
+        """
+        debuts, fins = np.broadcast_arrays(debuts.astype(int), fins.astype(int))
+        cumul = np.cumsum(arrets, axis = 1)
+        # arrêts jusqu'à l'étage bas inclus, et avant l'étage haut exclu
+        bas = np.take_along_axis(cumul, np.minimum(debuts, fins), axis = 1)
+        haut = np.take_along_axis(cumul - arrets, np.maximum(debuts, fins), axis = 1)
+        return np.maximum(haut - bas, 0)
+
+    @classmethod
+    def arrets_intermediaires(cls, arrets, positions, etages):
+        """ Nombre d'arrêts internes déjà demandés entre l'ascenseur et l'appel, bornes exclues. """
+        return cls.arrets_entre(arrets, positions[:, None], etages[None, :])
+
+
+class IPolitique(ABC):
+    """
+    Classe abstraite d'une politique de répartition des appels: elle choisit
+    l'appel en attente que doit traiter un ascenseur à l'arrêt.
+    """
+
+    @abstractmethod
+    def choisir(self, automate, ascenseur):
+        """
+        @type  automate: objet Automate
+        @param automate: automate gérant les appels en attente
+        @type  ascenseur: objet Ascenseur
+        @param ascenseur: ascenseur demandant une destination
+        @return: appel à traiter, None si aucun
+        @rtype: objet Appel
+        """
+        return
+
+
+class PolitiqueCollective(IPolitique, Log):
+    """
+    Algorithme collectif: l'ascenseur essaie de prendre les appels en montant
+    puis en descendant. En cours de montée, il ignore les appel pour descendre,
+    et inversement. S'il y a plusieurs ascenseurs, ils se partagent les appels;
+    ils ne se réservent pas une liste d'appels saus leurs appels internes.
+    Un ascenseur complet ne sert que ses appels internes.
+    """
+
+    def __init__(self, params):
+        self.nb_etages = params.nb_etages
+
+    def choisir(self, automate, ascenseur):
+        traitement_appel = None
+        externes = not ascenseur.complet
+        # si l'ascenseur n'était pas en train de descendre et qu'il peut monter,
+        # on retient parmi les appels internes à l'ascenseur et les appels externes
+        # celui de l'étage supérieur le plus proche
+        if ascenseur.sens != SENS.BAS and ascenseur.etage_courant < self.nb_etages - 1:
+            traitement_appel = automate.appels.prochain_au_dessus(ascenseur.num_asc,
+                                                                  ascenseur.etage_courant, externes)
+        # sinon si l'ascenseur était en train de descendre et qu'il peut encore le faire,
+        # on retient parmi les appels internes à l'ascenseur et les appels externes
+        # celui de l'étage inférieur le plus proche
+        elif ascenseur.sens != SENS.HAUT and ascenseur.etage_courant > 0:
+            traitement_appel = automate.appels.prochain_en_dessous(ascenseur.num_asc,
+                                                                   ascenseur.etage_courant, externes)
+        else:
+            self.logger.warning("Ascenseur <%d>: aucun choix valide !", ascenseur.num_asc)
+        # si on est dans aucun cas à optimiser et qu'il y a un appel, on le prend
+        if not traitement_appel:
+            traitement_appel = automate.appels.plus_ancien(ascenseur.num_asc, externes)
+        return traitement_appel
+
+
+class PolitiqueCouts(IPolitique):
+    """
+    Politique fondée sur une matrice de coûts (ascenseurs x appels): chaque
+    appel externe revient à l'ascenseur de moindre coût, et l'ascenseur
+    demandeur prend le moins coûteux des appels qui lui reviennent.
+    S'il n'en a aucun, les ascenseurs à l'arrêt mieux placés sont relancés.
+    Les ascenseurs complets sont écartés des appels externes.
+    """
+
+    evaluateur = None
+
+    def __init__(self, params):
+        self.evaluateur = EvaluateurCouts(params.nb_etages, table_trajets(params))
+
+    @abstractmethod
+    def couts(self, ascenseurs, appels):
+        """
+        @type  ascenseurs: tuple de tableaux NumPy
+        @param ascenseurs: résultat de EvaluateurCouts.etat_ascenseurs()
+        @type  appels: tuple de tableaux NumPy
+        @param appels: résultat de EvaluateurCouts.etat_appels()
+        @return: matrice des coûts (ascenseurs x appels)
+        @rtype: tableau NumPy
+        """
+        return
+
+    def choisir(self, automate, ascenseur):
+        appels = [appel for appel in automate.appels]
+        if not appels:
+            return None
+        etat_ascenseurs = self.evaluateur.etat_ascenseurs(automate)
+        etat_appels = self.evaluateur.etat_appels(appels)
+        couts = self.couts(etat_ascenseurs, etat_appels).astype(float)
+        # un appel interne ne peut être servi que par son ascenseur
+        num_asc = etat_appels[2]
+        internes = num_asc[None, :] != 0
+        autres = num_asc[None, :] != np.arange(1, len(automate.ascenseurs) + 1)[:, None]
+        couts[internes & autres] = np.inf
+        complets = np.fromiter((asc.complet for asc in automate.ascenseurs), dtype = bool,
+                               count = len(automate.ascenseurs))
+        couts[complets[:, None] & ~internes] = np.inf
+        idx = ascenseur.num_asc - 1
+        minimums = couts.min(axis = 0)
+        # à coût égal, l'ascenseur demandeur l'emporte
+        siens = (couts[idx] <= minimums) & np.isfinite(couts[idx])
+        if siens.any():
+            return appels[int(np.argmin(np.where(siens, couts[idx], np.inf)))]
+        # les appels reviennent à d'autres ascenseurs: ceux à l'arrêt sont relancés
+        libres = etat_ascenseurs[4]
+        atteignables = np.isfinite(minimums)
+        for idx_autre in np.unique(np.argmin(couts[:, atteignables], axis = 0)):
+            if libres[idx_autre] and idx_autre != idx:
+                automate.batiment.ordonnanceur.planifier(0, automate.relancer,
+                                                         automate.ascenseurs[idx_autre])
+        return None
+
+
+class PolitiquePlusProche(PolitiqueCouts):
+    """ L'appel revient à l'ascenseur le plus proche, une fois son trajet terminé. """
+
+    def couts(self, ascenseurs, appels):
+        positions, cibles = ascenseurs[0], ascenseurs[1]
+        return self.evaluateur.distances(positions, cibles, appels[0])
+
+
+class PolitiqueScan(PolitiqueCouts):
+    """ Balayage: un ascenseur en mouvement va jusqu'au bout du bâtiment avant de faire demi-tour. """
+
+    def couts(self, ascenseurs, appels):
+        positions, cibles, sens = ascenseurs[0], ascenseurs[1], ascenseurs[2]
+        bornes = self.evaluateur.bornes_scan(positions, sens)
+        return self.evaluateur.distances_directionnelles(positions, sens, bornes, appels[0], appels[1])
+
+
+class PolitiqueLook(PolitiqueCouts):
+    """ Balayage écourté: demi-tour au dernier arrêt demandé dans le sens courant. """
+
+    def couts(self, ascenseurs, appels):
+        positions, cibles, sens, _charges, _libres, arrets = ascenseurs
+        bornes = self.evaluateur.bornes_look(positions, cibles, sens, arrets)
+        return self.evaluateur.distances_directionnelles(positions, sens, bornes, appels[0], appels[1])
+
+
+class PolitiqueTempsEstime(PolitiqueCouts):
+    """
+    Temps estimé jusqu'à l'appel: parcours LOOK dont les trajets sont lus
+    dans la table de la cinématique, arrêts intermédiaires déjà demandés, et
+    pénalité selon la charge de l'ascenseur.
+    """
+
+    # pénalité en secondes par arrêt interne en attente
+    poids_charge = 1.0
+
+    def couts(self, ascenseurs, appels):
+        positions, cibles, sens, charges, libres, arrets = ascenseurs
+        evaluateur = self.evaluateur
+        bornes = evaluateur.bornes_look(positions, cibles, sens, arrets)
+        trajets = evaluateur.temps_directionnels(positions, sens, bornes, appels[0], appels[1])
+        nb_arrets = evaluateur.arrets_intermediaires(arrets, positions, appels[0])
+        # un ascenseur occupé à l'arrêt (porte ouverte) doit d'abord repartir;
+        # en déplacement, il n'a pas encore atteint l'étage visé
+        attente = np.where(~libres & (positions == cibles), evaluateur.temps_arret, 0.0)
+        return trajets + nb_arrets * evaluateur.temps_arret \
+               + (attente + self.poids_charge * charges)[:, None]
+
+
+class AffectationDestination:
+    """
+    Désignation d'un ascenseur aux passagers qui saisissent leur destination
+    au palier (type d'appel 3). Les passagers d'un même cycle sont regroupés
+    par (origine, destination); la matrice des coûts (ascenseurs x groupes)
+    somme le temps d'approche de l'étage d'origine (parcours LOOK et arrêts
+    intermédiaires), le trajet jusqu'à la destination avec les arrêts prévus
+    en chemin, le temps de chaque arrêt que l'ascenseur ne prévoit pas déjà,
+    multiplié par le nombre de passagers qui le subissent, et une pénalité
+    par passager prévu au-delà de la capacité de la cabine. Un ascenseur qui
+    s'arrête déjà à la destination, ou près d'elle, est ainsi préféré: les
+    passagers allant aux mêmes étages sont groupés dans la même cabine.
+    Une cabine sans place, ou dont la charge restante est inférieure au poids
+    du plus léger passager du groupe, est écartée; un groupe qu'aucune cabine
+    ne peut prendre attend le cycle suivant.
+    L'affectation est gloutonne: le couple de moindre coût est retenu, puis
+    les coûts de son ascenseur sont recalculés avec ses nouveaux arrêts,
+    jusqu'à ce que chaque groupe ait un ascenseur. Contrairement à une
+    affectation un à un, un ascenseur peut recevoir plusieurs groupes.
+    Les arrêts de chaque ascenseur restent ordonnés par la politique de
+    répartition choisie.
+    """
+
+    evaluateur = None
+    # pénalité en secondes par passager au-delà de la capacité de la cabine
+    penalite_complet = 60.0
+
+    def __init__(self, params):
+        self.evaluateur = EvaluateurCouts(params.nb_etages, table_trajets(params))
+
+    def arrets_prevus(self, automate, arrets):
+        """
+        @type  arrets: tableau NumPy
+        @param arrets: arrêts internes demandés (ascenseurs x étages), voir
+                       EvaluateurCouts.etat_ascenseurs()
+        @return: arrêts prévus (ascenseurs x étages), en comptant les
+                 destinations des passagers désignés qui attendent, et nombre
+                 de passagers à bord ou désignés par ascenseur
+        @rtype: tuple de tableaux NumPy
+        """
+        population = automate.population
+        designes = population.affectes(0)
+        num_asc = population.affectation[designes.ids] - 1
+        prevus = arrets.copy()
+        prevus[num_asc, population.destination[designes.ids]] = True
+        charges = np.bincount(num_asc, minlength = len(automate.ascenseurs)) \
+            + np.fromiter((asc.nb_passagers for asc in automate.ascenseurs), dtype = int,
+                          count = len(automate.ascenseurs))
+        return prevus, charges
+
+    def supplements(self, prevus, charges, origines, destinations, nombres):
+        """
+        @return: coûts (ascenseurs x groupes) du trajet du groupe avec les
+                 arrêts prévus en chemin, des arrêts ajoutés (subis aussi par
+                 les passagers à bord ou désignés) et du dépassement de capacité
+        @rtype: tableau NumPy
+        """
+        evaluateur = self.evaluateur
+        en_chemin = evaluateur.arrets_entre(prevus, origines[None, :], destinations[None, :])
+        trajets = evaluateur.temps_trajet[origines, destinations][None, :] + en_chemin * evaluateur.temps_arret
+        ajouts = ~prevus[:, origines] * 1.0 + ~prevus[:, destinations]
+        depassement = np.maximum(0, charges[:, None] + nombres[None, :] - NB_PLACES)
+        return trajets + ajouts * evaluateur.temps_arret * (1 + charges[:, None]) \
+            + depassement * self.penalite_complet
+
+    def affecter(self, automate, origines, destinations, nombres, poids):
+        """
+        @type  automate: objet Automate
+        @param automate: automate gérant les ascenseurs
+        @type  origines: tableau NumPy
+        @param origines: étage d'origine de chaque groupe
+        @type  destinations: tableau NumPy
+        @param destinations: étage de destination de chaque groupe
+        @type  nombres: tableau NumPy
+        @param nombres: nombre de passagers de chaque groupe
+        @type  poids: tableau NumPy
+        @param poids: poids en kg du plus léger passager de chaque groupe
+        @return: n° de l'ascenseur désigné à chaque groupe, 0 si aucune
+                 cabine ne peut le prendre
+        @rtype: tableau NumPy
+        """
+        evaluateur = self.evaluateur
+        positions, cibles, sens, _charges, libres, arrets = evaluateur.etat_ascenseurs(automate)
+        sens_groupes = np.sign(destinations - origines).astype(np.int8)
+        bornes = evaluateur.bornes_look(positions, cibles, sens, arrets)
+        approche = evaluateur.temps_directionnels(positions, sens, bornes, origines.astype(float), sens_groupes) \
+            + evaluateur.arrets_intermediaires(arrets, positions, origines) * evaluateur.temps_arret
+        prevus, charges = self.arrets_prevus(automate, arrets)
+        # une cabine qui ne peut prendre dès maintenant aucun passager du
+        # groupe est écartée
+        nb_asc = len(automate.ascenseurs)
+        places = np.fromiter((NB_PLACES - asc.nb_passagers for asc in automate.ascenseurs),
+                             dtype = int, count = nb_asc)
+        restes = np.fromiter((CHARGE_MAX - asc.charge for asc in automate.ascenseurs),
+                             dtype = float, count = nb_asc)
+        inadaptees = (places[:, None] < 1) | (restes[:, None] < poids[None, :])
+        approche[inadaptees] = np.inf
+        couts = approche + self.supplements(prevus, charges, origines, destinations, nombres)
+        choix = np.zeros(len(origines), dtype = int)
+        for _ in range(len(origines)):
+            idx_asc, idx = np.unravel_index(np.argmin(couts), couts.shape)
+            if not np.isfinite(couts[idx_asc, idx]):
+                break
+            choix[idx] = idx_asc + 1
+            couts[:, idx] = np.inf
+            # l'ascenseur retenu prévoit désormais ces arrêts et ces passagers
+            prevus[idx_asc, [origines[idx], destinations[idx]]] = True
+            charges[idx_asc] += nombres[idx]
+            restants = np.isfinite(couts[idx_asc])
+            couts[idx_asc, restants] = approche[idx_asc, restants] \
+                + self.supplements(prevus[idx_asc:idx_asc + 1], charges[idx_asc:idx_asc + 1],
+                                   origines[restants], destinations[restants], nombres[restants])[0]
+        return choix
+
+
+# politiques disponibles, par nom
+POLITIQUES = {
+    "collective": PolitiqueCollective,
+    "proche": PolitiquePlusProche,
+    "scan": PolitiqueScan,
+    "look": PolitiqueLook,
+    "temps": PolitiqueTempsEstime,
+}
+
+
+def creer_politique(params):
+    """
+    @type  params: objet Params
+    @param params: options communes, dont le nom de la politique
+    @rtype: objet dérivé de IPolitique
+    """
+    return POLITIQUES[params.politique](params)
@@ -0,0 +1,297 @@
+#!/usr/bin/python
+# -*- Encoding: utf-8 -*-
+
+# ===================================================================
+#
+# Module regroupant le registre des appels en attente de l'automate.
+#
+# ===================================================================
+
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+from itertools import count
+
+
+class VueAppels:
+    """
+    Appels en attente d'un même ascenseur (ou externes si n° 0), rangés
+    par étage: les étages sont triés pour les recherches au-dessus ou
+    en-dessous d'un étage, et les appels d'un étage restent dans leur
+    ordre d'arrivée. Le plus ancien appel de la vue, et ceux qui portent
+    leurs passagers, sont aussi tenus à jour.
+    """
+
+    # étages ayant au moins un appel, triés
+    etages = None
+    # par étage, appels indexés par leur clé dans l'ordre d'arrivée
+    appels = None
+    # tous les appels de la vue par clé, dans l'ordre d'arrivée: le premier
+    # est le plus ancien
+    par_arrivee = None
+    # appels portant leurs passagers (désignations au palier) par clé
+    avec_passagers = None
+
+    def __init__(self):
+        self.etages = []
+        self.appels = {}
+        self.par_arrivee = OrderedDict()
+        self.avec_passagers = {}
+
+    def ajouter(self, cle, appel):
+        """ Enregistre un appel à son étage. """
+        _appels = self.appels.get(appel.etage)
+        if _appels is None:
+            _appels = self.appels[appel.etage] = {}
+            insort(self.etages, appel.etage)
+        _appels[cle] = appel
+        self.par_arrivee[cle] = appel
+        if appel.people is not None:
+            self.avec_passagers[cle] = appel
+
+    def retirer(self, cle, appel):
+        """ Retire un appel; l'étage est oublié s'il n'a plus d'appel. """
+        _appels = self.appels[appel.etage]
+        del _appels[cle]
+        if not _appels:
+            del self.appels[appel.etage]
+            del self.etages[bisect_left(self.etages, appel.etage)]
+        del self.par_arrivee[cle]
+        self.avec_passagers.pop(cle, None)
+
+    def plus_ancien(self):
+        """ Clé du plus ancien appel de la vue, None si elle est vide. """
+        return next(iter(self.par_arrivee), None)
+
+    def etage_au_dessus(self, etage):
+        """ Plus petit étage ayant un appel, supérieur ou égal à <etage>. """
+        idx = bisect_left(self.etages, etage)
+        if idx < len(self.etages):
+            return self.etages[idx]
+        return None
+
+    def etage_en_dessous(self, etage):
+        """ Plus grand étage ayant un appel, inférieur ou égal à <etage>. """
+        idx = bisect_right(self.etages, etage)
+        if idx > 0:
+            return self.etages[idx - 1]
+        return None
+
+
+class RegistreAppels:
+    """
+    Appels en attente, indexés par (étage, sens, n° d'ascenseur).
+    Les appels externes (n° 0) et les appels internes de chaque ascenseur
+    ont chacun leur vue triée par étage, ce qui rend les recherches de
+    doublons et du prochain appel au-dessus ou en-dessous d'un étage
+    logarithmiques au pire, au lieu d'un parcours de toute la liste; le
+    plus ancien appel est cherché parmi le premier de chaque vue.
+    """
+
+    # appels par clé, dans l'ordre d'arrivée
+    _appels = None
+    # n° d'ordre d'arrivée par clé, pour départager deux vues
+    _ordre = None
+    _compteur = None
+    # vues triées par n° d'ascenseur (0 pour les appels externes)
+    _vues = None
+    # nombre d'appels en attente par étage, toutes vues confondues
+    _nb_par_etage = None
+
+    def __init__(self):
+        self._appels = {}
+        self._ordre = {}
+        self._compteur = count()
+        self._vues = {}
+        self._nb_par_etage = {}
+
+    @staticmethod
+    def cle(appel):
+        """ Clé d'indexation d'un appel """
+        return (appel.etage, appel.sens, appel.num_asc)
+
+    def __len__(self):
+        return len(self._appels)
+
+    def __iter__(self):
+        """
+        Parcours des appels dans leur ordre d'arrivée, sans copie: le
+        registre ne doit pas être modifié pendant le parcours.
+        """
+        return iter(self._appels.values())
+
+    def __contains__(self, appel):
+        return self.cle(appel) in self._appels
+
+    def __repr__(self):
+        return repr(list(self._appels.values()))
+
+    def _vue(self, num_asc):
+        """ Vue des appels d'un ascenseur, créée à la demande. """
+        vue = self._vues.get(num_asc)
+        if vue is None:
+            vue = self._vues[num_asc] = VueAppels()
+        return vue
+
+    def ajouter(self, appel):
+        """
+        Mémorise un appel s'il n'est pas déjà en attente.
+        @type  appel: objet Appel
+        @param appel: appel à mémoriser
+        @return: True si l'appel a été ajouté
+        @rtype: Boolean
+        """
+        cle = self.cle(appel)
+        if cle in self._appels:
+            return False
+        self._appels[cle] = appel
+        self._ordre[cle] = next(self._compteur)
+        self._vue(appel.num_asc).ajouter(cle, appel)
+        self._nb_par_etage[appel.etage] = self._nb_par_etage.get(appel.etage, 0) + 1
+        return True
+
+    def retirer(self, appel):
+        """
+        Retire un appel en attente.
+        @type  appel: objet Appel
+        @param appel: appel à retirer
+        @return: True si l'appel était en attente
+        @rtype: Boolean
+        """
+        cle = self.cle(appel)
+        appel = self._appels.pop(cle, None)
+        if appel is None:
+            return False
+        del self._ordre[cle]
+        self._vues[appel.num_asc].retirer(cle, appel)
+        nb = self._nb_par_etage[appel.etage] - 1
+        if nb:
+            self._nb_par_etage[appel.etage] = nb
+        else:
+            del self._nb_par_etage[appel.etage]
+        return True
+
+    def contient_etage(self, etage, num_asc = None):
+        """
+        Indique si un appel est en attente pour un étage.
+        @type  etage: nombre entier
+        @param etage: étage recherché
+        @type  num_asc: nombre entier
+        @param num_asc: restreint la recherche à un ascenseur (0 pour les
+                        appels externes), None pour tous les appels
+        @rtype: Boolean
+        """
+        if num_asc is None:
+            return etage in self._nb_par_etage
+        vue = self._vues.get(num_asc)
+        return vue is not None and etage in vue.appels
+
+    def etages_asc(self, num_asc):
+        """
+        Etages triés ayant un appel pour un ascenseur (0 pour les externes).
+        La liste retournée ne doit pas être modifiée.
+        @type  num_asc: nombre entier
+        @param num_asc: n° de l'ascenseur
+        @rtype: liste de nombres entiers
+        """
+        vue = self._vues.get(num_asc)
+        return vue.etages if vue is not None else []
+
+    def plus_ancien(self, num_asc = None, externes = True):
+        """
+        Appel en attente depuis le plus longtemps, None s'il n'y en a pas.
+        @type  num_asc: nombre entier
+        @param num_asc: restreint la recherche aux appels internes de cet
+                        ascenseur et aux appels externes, None pour tous les appels
+        @type  externes: Boolean
+        @param externes: False pour ignorer les appels externes
+        """
+        if num_asc is None:
+            vues = self._vues.values()
+        else:
+            vues = self._vues_asc(num_asc, externes)
+        # le plus ancien des premiers appels de chaque vue
+        choix = None
+        for vue in vues:
+            cle = vue.plus_ancien()
+            if cle is not None and (choix is None or self._ordre[cle] < self._ordre[choix]):
+                choix = cle
+        return self._appels[choix] if choix is not None else None
+
+    def avec_passagers(self, num_asc):
+        """
+        Appels internes d'un ascenseur qui portent leurs passagers
+        (désignations au palier), sans parcourir les autres appels.
+        @type  num_asc: nombre entier
+        @param num_asc: n° de l'ascenseur
+        @rtype: liste d'objets Appel
+        """
+        vue = self._vues.get(num_asc)
+        return list(vue.avec_passagers.values()) if vue is not None else []
+
+    def _premier_a_l_etage(self, vues, etage):
+        """ Plus ancien appel d'un étage parmi les vues données. """
+        choix = None
+        for vue in vues:
+            _appels = vue.appels.get(etage)
+            if _appels:
+                cle = next(iter(_appels))
+                if choix is None or self._ordre[cle] < self._ordre[choix]:
+                    choix = cle
+        return self._appels[choix] if choix is not None else None
+
+    def _vues_asc(self, num_asc, externes = True):
+        """ Vues consultées par un ascenseur: ses appels internes et les externes. """
+        vues = (self._vues.get(num_asc), self._vues.get(0)) if externes else (self._vues.get(num_asc),)
+        return [vue for vue in vues if vue]
+
+    def prochain_au_dessus(self, num_asc, etage, externes = True):
+        """
+        Appel interne de l'ascenseur ou externe le plus proche au-dessus de
+        l'étage (étage compris); à étage égal le plus ancien est retenu.
+        @type  num_asc: nombre entier
+        @param num_asc: n° de l'ascenseur demandeur
+        @type  etage: nombre entier
+        @param etage: étage de référence
+        @type  externes: Boolean
+        @param externes: False pour ignorer les appels externes
+        @rtype: objet Appel
+        """
+        vues = self._vues_asc(num_asc, externes)
+        etages = [e for e in (vue.etage_au_dessus(etage) for vue in vues) if e is not None]
+        if not etages:
+            return None
+        return self._premier_a_l_etage(vues, min(etages))
+
+    def prochain_en_dessous(self, num_asc, etage, externes = True):
+        """
+        Appel interne de l'ascenseur ou externe le plus proche en-dessous de
+        l'étage (étage compris); à étage égal le plus ancien est retenu.
+        @type  num_asc: nombre entier
+        @param num_asc: n° de l'ascenseur demandeur
+        @type  etage: nombre entier
+        @param etage: étage de référence
+        @type  externes: Boolean
+        @param externes: False pour ignorer les appels externes
+        @rtype: objet Appel
+        """
+        vues = self._vues_asc(num_asc, externes)
+        etages = [e for e in (vue.etage_en_dessous(etage) for vue in vues) if e is not None]
+        if not etages:
+            return None
+        return self._premier_a_l_etage(vues, max(etages))
+
+    def retirer_externes_etage(self, etage):
+        """
+        Retire tous les appels externes d'un étage.
+        @type  etage: nombre entier
+        @param etage: étage concerné
+        @return: appels retirés
+        @rtype: liste d'objets Appel
+        """
+        vue = self._vues.get(0)
+        if vue is None or etage not in vue.appels:
+            return []
+        retires = list(vue.appels[etage].values())
+        for appel in retires:
+            self.retirer(appel)
+        return retires
@@ -7,30 +7,42 @@
 #
 # ===================================================================
 
-from threading import Thread
-from time import sleep
 from core.log import Log
-from gui.units import BatimentGui, AscenseurGui, \
-                      BoutonInterneSimpleGui, BoutonExterneSimpleGui, \
-                      BoutonInterneDoubleGui, BoutonExterneHautGui, BoutonExterneBasGui
-from core.etats import EtatArretFerme
-from core.activite import SENS, Appel, SimAppels
-
+from core.etats import EtatArretFerme, EtatArretOuvert, EtatDeplacement
+from core.activite import SENS, Appel, SimAppels, CHARGE_MAX, NB_PLACES
+from core.registre import RegistreAppels
+from core.politiques import creer_politique, AffectationDestination
+from core.mesures import Mesures
+from core.group import Population, People
+from core.cinematique import table_trajets
+from core.trafic import POIDS_BORNES
+import numpy as np
+
+# durées des actions d'un ascenseur, en secondes simulées: mouvement des
+# portes et arrêt portes ouvertes (les trajets suivent la cinématique)
+DELAI_PORTE = 1
+DELAI_ARRET = 4
+# période de l'affectation des appels par destination: les passagers
+# arrivés pendant une période sont répartis ensemble
+CYCLE_AFFECTATION = 0.5
 
 class Bouton(Log):
     """
     Bouton d'appel de l'ascenseur.
     L'objet <appel> contient les mêmes valeurs qu'un appel attendu sur ce bouton.
     """
-    batiment = None
-    # regroupe l'étage, l'ascenseur et le sens
-    appel = None
-    # False si le bouton est éteint
-    etat = None
-    # représentation graphique
-    bouton_gui = None
-    # etage actuel
-    etage = None
+    __slots__ = (
+        "batiment",
+        # regroupe l'étage, l'ascenseur et le sens
+        "appel",
+        # False si le bouton est éteint
+        "etat",
+        # représentation graphique
+        "bouton_gui",
+        # etage actuel
+        "etage",
+    )
+
     def __init__(self, batiment, etage, sens, num_asc = 0):
         """
         Constructeur.
@@ -47,13 +59,21 @@ class Bouton(Log):
         self.batiment = batiment
         # bouton éteint par défaut
         self.etat = False
+        self.bouton_gui = None
         # s'il s'agit d'un bouton interne, le sens est ignoré (logiquement,
         # il est à SENS.AUCUN)
-        self.appel = Appel(self.etage, SENS.AUCUN, [])
+        if num_asc != 0 and sens != SENS.AUCUN:
+            self.logger.warning("Le sens est ignoré pour un bouton d'appel interne (E=%d|A=%d)." % \
+                                (etage, num_asc))
+            sens = SENS.AUCUN
+        self.appel = Appel(self.etage, sens, None, num_asc)
+        # pas de représentation graphique en simulation sans affichage
+        if not self.batiment.batiment_gui:
+            return
+        from gui.units import BoutonInterneSimpleGui, BoutonExterneSimpleGui, \
+                              BoutonInterneDoubleGui, BoutonExterneHautGui, BoutonExterneBasGui
         if num_asc != 0:
-            if sens != SENS.AUCUN:
-                self.logger.warning("Le sens est ignoré pour un bouton d'appel interne (%s)." % self.appel)
-            if self.batiment.params.type_appel == 1:
+            if self.batiment.params.type_appel != 2:
                 self.bouton_gui = BoutonInterneSimpleGui(self)
             else:
                 self.bouton_gui = BoutonInterneDoubleGui(self)
@@ -71,9 +91,22 @@ class Bouton(Log):
     def __repr__(self):
         return "<A:%s E: %s>" % (self.appel, self.etat)
 
+    def allumer(self, flg_status):
+        """
+        Allume ou éteint le bouton; sa représentation graphique est prévenue
+        du changement.
+        @type  flg_status: Boolean
+        @param flg_status: True pour allumer, False pour éteindre
+        """
+        if self.etat == flg_status:
+            return
+        self.etat = flg_status
+        if self.bouton_gui:
+            self.bouton_gui.actualiser()
+
     def clicked(self, sens, people):
         self.appel = Appel(self.etage, sens, people)
-        self.etat = True
+        self.allumer(True)
 
 
 class Batiment(Log):
@@ -83,28 +116,41 @@ class Batiment(Log):
 
     params = None
     boutons = None
+    # boutons indexés par leur appel, soit (étage, sens, n° d'ascenseur)
+    index_boutons = None
     # gestionnaire du ou des ascenseurs
     automate = None
     # représentation graphique
     batiment_gui = None
     # simulation d'appels
     sim_appels = None
+    # ordonnanceur de toutes les actions temporisées
+    ordonnanceur = None
 
-    def __init__(self, area, params):
+    def __init__(self, area, params, ordonnanceur, generateur = None):
         """
-        @type  area: nombre entier
-        @param area: nombre d'étages du bâtiment
+        @type  area: DrawingArea
+        @param area: zone de dessin, None pour une simulation sans affichage
         @type  params: objet Params
         @param params: regroupe les options communes
+        @type  ordonnanceur: objet Ordonnanceur
+        @param ordonnanceur: horloge pilotant les actions temporisées
+                             (déplacements, portes, appels simulés)
+        @type  generateur: objet GenerateurTrafic
+        @param generateur: flux des arrivées de passagers, None pour le trafic par défaut
         """
         self.params = params
-        # actualisation des variables servant au dessin en général
-        self.batiment_gui = BatimentGui(area, params)
+        self.ordonnanceur = ordonnanceur
+        # actualisation des variables servant au dessin en général; sans zone
+        # de dessin, Gtk n'est pas requis
+        if area is not None:
+            from gui.units import BatimentGui
+            self.batiment_gui = BatimentGui(area, params)
         # lancement de l'automate
         self.automate = Automate(self, params.nb_asc)
         # création des boutons d'appel externe
-        if self.params.type_appel == 1:
-            # un bouton d'appel externe par étage
+        if self.params.type_appel != 2:
+            # un bouton d'appel externe (ou un clavier de destination) par étage
             self.boutons = [Bouton(self, etage, SENS.AUCUN) for etage in range(params.nb_etages)]
         else:
             # deux par étage, un haut et un bas, sauf pour le 1er et le dernier étage
@@ -113,39 +159,76 @@ class Batiment(Log):
         # création des boutons d'appel interne, un par ascenseur et part étage
         for asc in self.automate.ascenseurs:
             self.boutons.extend([Bouton(self, etage, SENS.AUCUN, asc.num_asc) for etage in range(params.nb_etages)])
+        self.index_boutons = {bouton.appel: bouton for bouton in self.boutons}
+        if self.batiment_gui:
+            self.batiment_gui.placer_boutons([bouton.bouton_gui for bouton in self.boutons])
         # self.logger.debug("Boutons créés: %s" % self.boutons)
         # lancement de la simulation d'appels
-        self.sim_appels = SimAppels(self)
+        self.sim_appels = SimAppels(self, generateur)
 
     def dessiner(self, area, context):
         """
+        Seuls les éléments touchant la zone à redessiner sont dessinés; les
+        boutons éteints font partie du fond, et seuls les boutons des étages
+        de la zone sont parcourus.
         @type  area: DrawingArea
         @param area: Composant lié à l'événement
         @type  context: cairo context
         @param context: Surface de dessin
         """
         self.batiment_gui.on_draw(area, context)
+        # zone à redessiner, en coordonnées du modèle
+        zone = context.clip_extents()
         for asc in self.automate.ascenseurs:
-            asc.ascenseur_gui.on_draw(area, context)
-        for bouton in self.boutons:
-            bouton.bouton_gui.on_draw(area, context)
+            if asc.ascenseur_gui.dans_zone(*zone):
+                asc.ascenseur_gui.on_draw(area, context)
+        for bouton_gui in self.batiment_gui.boutons_zone(*zone):
+            if bouton_gui.bouton.etat and bouton_gui.dans_zone(*zone):
+                bouton_gui.on_draw(area, context)
 
     def on_simu_stop(self):
-        """ Arrêt de la simulation """
-        for asc in self.automate.ascenseurs:
-            asc.on_simu_stop()
+        """ Arrêt de la simulation: les actions en attente sont annulées. """
+        self.ordonnanceur.arreter()
+        if self.batiment_gui:
+            for asc in self.automate.ascenseurs:
+                asc.ascenseur_gui.arreter_animation()
 
 
 class Automate(Log):
     """
     Donneur d'ordre d'un ascenseur.
-    Les appels sont pris dans l'ordre d'arrivée des demandes, sans
-    optimisation; une demande à mi-parcours sera ignorée.
+    Le choix de l'appel à traiter est délégué à une politique de répartition
+    (voir core.politiques); une demande à mi-parcours sera ignorée.
+
+    L'automate n'est pas protégé par un verrou: il n'est modifié que par le
+    thread de l'ordonnanceur. Un appel venant d'un autre thread passe par
+    soumettre_appel().
     """
 
     batiment = None
     ascenseurs = None
+    # appels en attente, objet RegistreAppels
     appels = None
+    # répartition des appels, objet dérivé de IPolitique
+    politique = None
+    # désignation d'un ascenseur aux passagers saisissant leur destination
+    # au palier, objet AffectationDestination (type d'appel 3 seulement)
+    affectation = None
+    # n° des passagers en attente de désignation, et True si leur
+    # affectation est planifiée
+    _a_affecter = None
+    _affectation_planifiee = False
+    # durées en secondes entre l'enregistrement et le service des appels
+    # externes et des désignations au palier (attente), et des appels
+    # internes (trajet)
+    attentes = None
+    trajets = None
+    # si renseigné, objet EnregistreurTrace mémorisant chaque arrivée de passager
+    enregistreur = None
+    # passagers de la simulation, objet Population
+    population = None
+    # horodatage des passagers, objet Mesures
+    mesures = None
 
     def __init__(self, batiment, nb_asc):
         """
@@ -157,11 +240,19 @@ class Automate(Log):
         """
         self.batiment = batiment
         self.ascenseurs = []
-        self.appels = []
+        self.appels = RegistreAppels()
+        self.politique = creer_politique(batiment.params)
+        if batiment.params.type_appel == 3:
+            self.affectation = AffectationDestination(batiment.params)
+            self._a_affecter = []
+        self.attentes = []
+        self.trajets = []
+        self.population = Population()
+        self.mesures = Mesures()
         for idx_asc in range(nb_asc):
             # création des ascenseurs avec leur état par défaut
             asc = Ascenseur(self, idx_asc + 1)
-            asc.etat = EtatArretFerme(asc)
+            asc.etat = asc.etats[EtatArretFerme]
             self.ascenseurs.append(asc)
 
     def allumage_bouton(self, appel, flg_status):
@@ -172,26 +263,12 @@ class Automate(Log):
         @type  flg_status: Boolean
         @param flg_status: True s'il faut allumer, False sinon
         """
-        bouton = None
-        # si c'est un appel interne
-#         if appel.num_asc != 0:
-#             for _btn in self.batiment.boutons:
-#                 if _btn.appel.etage == appel.etage \
-#                 and _btn.appel.num_asc == appel.num_asc:
-#                     bouton = _btn
-#                     break
-        # si c'est un appel externe, l'appel correspond aux données du bouton
-        # elif appel.num_asc == 0:
-        for _btn in self.batiment.boutons:
-            if _btn.appel == appel:
-                bouton = _btn
-                break
+        # l'appel correspond aux données du bouton (étage, sens, n° d'ascenseur)
+        bouton = self.batiment.index_boutons.get(appel)
         if not bouton:
-            self.logger.warning("Impossible de trouver le bouton d'appel :")
-            self.logger.warning(" * Appel: %s" % appel)
-            self.logger.warning(" * Boutons: %s" % [bouton.appel for bouton in self.batiment.boutons])
+            self.logger.warning("Impossible de trouver le bouton d'appel: %s", appel)
         else:
-            bouton.etat = flg_status
+            bouton.allumer(flg_status)
             # TODO: éteindre aussi le bouton d'appel interne
 
     def alarme_declenchee(self):
@@ -210,6 +287,64 @@ class Automate(Log):
         else:
             self._appel_interne(appel)
 
+    def appel_destination(self, idx):
+        """
+        Un passager a saisi sa destination au palier: un ascenseur lui sera
+        désigné au prochain cycle d'affectation, avec les autres passagers
+        arrivés entre-temps.
+        @type  idx: nombre entier
+        @param idx: n° du passager dans la population
+        """
+        self.population.affectation[idx] = 0
+        self._a_affecter.append(idx)
+        self.allumage_bouton(Appel(int(self.population.origine[idx]), SENS.AUCUN), True)
+        if not self._affectation_planifiee:
+            self._affectation_planifiee = True
+            self.decompte(CYCLE_AFFECTATION, self._affecter)
+
+    def _affecter(self):
+        """
+        Cycle d'affectation: les passagers en attente de désignation sont
+        regroupés par (origine, destination), chaque groupe reçoit un
+        ascenseur qui est appelé à l'étage d'origine. L'appel de désignation
+        porte les passagers du groupe (voir _mesurer()).
+        """
+        self._affectation_planifiee = False
+        ids = np.array(self._a_affecter, dtype = np.intp)
+        self._a_affecter = []
+        population = self.population
+        trajets = population.origine[ids] * self.batiment.params.nb_etages + population.destination[ids]
+        trajets, groupes, nombres = np.unique(trajets, return_inverse = True, return_counts = True)
+        origines = trajets // self.batiment.params.nb_etages
+        destinations = trajets % self.batiment.params.nb_etages
+        poids = np.full(len(trajets), np.inf)
+        np.minimum.at(poids, groupes, population.poids[ids])
+        choix = self.affectation.affecter(self, origines, destinations, nombres, poids)
+        population.affectation[ids] = choix[groupes]
+        # aucune cabine ne peut prendre ces passagers: ils attendent le cycle
+        # suivant, où la place disponible sera réévaluée
+        reportes = ids[choix[groupes] == 0]
+        if len(reportes):
+            self._a_affecter.extend(reportes.tolist())
+            self._affectation_planifiee = True
+            self.decompte(CYCLE_AFFECTATION, self._affecter)
+        for idx_groupe, (origine, num_asc) in enumerate(zip(origines.tolist(), choix.tolist())):
+            if not num_asc:
+                continue
+            if __debug__:
+                self.logger.debug("Ascenseur <%d> désigné à l'étage <%d>.", num_asc, origine)
+            groupe = People(population, ids[groupes == idx_groupe])
+            self.appel(Appel(origine, SENS.AUCUN, groupe, num_asc))
+
+    def soumettre_appel(self, appel):
+        """
+        Réception d'un appel depuis n'importe quel thread: il est transmis à
+        l'ordonnanceur, qui le traitera entre deux événements.
+        @type  appel: objet Appel
+        @param appel: données sur l'appel
+        """
+        self.batiment.ordonnanceur.soumettre(self.appel, appel)
+
     def _appel_interne(self, appel):
         """
         Un appel interne ne concerne que l'ascenseur recevant la demande.
@@ -218,17 +353,13 @@ class Automate(Log):
         @type  appel: nombre entier
         @param appel: numéro de l'étage
         """
-        flg_appel = False
-        for memo_appel in self.appels:
-            # s'il y a un appel pour cet étage depuis cet ascenseur
-            if memo_appel.num_asc == appel.num_asc \
-               and memo_appel.etage == appel.etage:
-                flg_appel = True
-        # si l'appel n'est pas déjà mémorisé...
-        if not flg_appel:
-            self.appels.append(appel)
+        # si l'appel n'est pas déjà mémorisé pour cet étage depuis cet ascenseur...
+        if not self.appels.contient_etage(appel.etage, appel.num_asc):
+            appel.date = self.batiment.ordonnanceur.maintenant
+            self.appels.ajouter(appel)
             self.allumage_bouton(appel, True)
-            self.logger.debug("Appel interne reçu: %s" % appel)
+            if __debug__:
+                self.logger.debug("Appel interne reçu: %s", appel)
             self.ascenseurs[appel.num_asc - 1].etat.appel(self)
 
     def _appel_externe(self, appel):
@@ -237,70 +368,38 @@ class Automate(Log):
         @type  appel: nombre entier
         @param appel: numéro de l'étage
         """
-        flg_appel = False
-        for memo_appel in self.appels:
-            if memo_appel.etage == appel.etage:
-                flg_appel = True
-
-        if not flg_appel:
+        # un appel externe est déjà en attente à cet étage
+        if not self.appels.contient_etage(appel.etage, 0):
             # c'est un nouvel appel, il est enregistré
-            self.appels.append(appel)
+            appel.date = self.batiment.ordonnanceur.maintenant
+            self.appels.ajouter(appel)
             self.allumage_bouton(appel, True)
-            self.logger.debug("Appel externe reçu: %s" % appel)
+            if __debug__:
+                self.logger.debug("Appel externe reçu: %s", appel)
             # Si un ascenseur est dispo il prendra l'appel
             for asc in self.ascenseurs:
                 asc.etat.appel(self)
 
     def prochaine_destination(self, ascenseur):
         """
-        Algorithme optimisé: l'ascenseur essaie de prendre les appels en montant
-        puis en descendant. En cours de montée, il ignore les appel pour descendre,
-        et inversement. S'il y a plusieurs ascenseurs, ils se partagent les appels;
-        ils ne se réservent pas une liste d'appels saus leurs appels internes.
-        Retourne un appel en attente à traiter.
+        Retourne un appel en attente à traiter, choisi par la politique de
+        répartition, et le retire de la liste d'attente.
         @type  ascenseur: Ascenseur
         @param ascenseur: objet Ascenseur demandant une destination
         """
-        _appels = None
         # self.logger.debug("Ascenseur <%d>: appels en attente: %s" % \
         #                  (ascenseur.num_asc, self.appels))
-        # si l'ascenseur n'était pas en train de descendre et qu'il peut monter,
-        # on liste les appels internes à l'ascenseur et les appels externes
-        # qui concernent les étages supérieurs
-        if ascenseur.sens != SENS.BAS and \
-           ascenseur.etage_courant < self.batiment.params.nb_etages - 1:
-            _appels = [appel for appel in self.appels \
-                       if (appel.num_asc == ascenseur.num_asc or appel.num_asc == 0) \
-                           and appel.etage >= ascenseur.etage_courant]
-            _appels.sort(key = lambda appel: appel.etage)
-            # self.logger.debug("Ascenseur <%d> à l'étage <%d>: appels retenus en montée: %s" % \
-            #                  (ascenseur.num_asc, ascenseur.etage_courant, _appels))
-        # sinon si l'ascenseur était en train de descendre et qu'il peut encore le faire,
-        # on liste les appels internes à l'ascenseur et les appels externes
-        # qui concernent les étages inférieurs
-        elif ascenseur.sens != SENS.HAUT and ascenseur.etage_courant > 0:
-            _appels = [appel for appel in self.appels \
-                       if (appel.num_asc == ascenseur.num_asc or appel.num_asc == 0) \
-                           and appel.etage <= ascenseur.etage_courant]
-            _appels.sort(key = lambda appel: appel.etage, reverse = True)
-            # self.logger.debug("Ascenseur <%d> à l'étage <%d>: appels retenus en descente: %s" % \
-            #                  (ascenseur.num_asc, ascenseur.etage_courant, _appels))
-        else:
-            self.logger.warning("Ascenseur <%d>: aucun choix valide !" % ascenseur.num_asc)
-        # si on est dans aucun cas à optimiser et qu'il y a un appel, on le prend
-        if not _appels and len(self.appels) > 0:
-            _appels = (self.appels[0],)
+        traitement_appel = self.politique.choisir(self, ascenseur)
         # on finalise...
-        traitement_appel = None
-        if _appels:
-            traitement_appel = _appels[0]
+        if traitement_appel:
             # retrait de la liste d'attente
-            self.appels.remove(traitement_appel)
-            self.logger.debug("Ascenseur <%d>: appel <%s> pris en compte." % \
-                              (ascenseur.num_asc, traitement_appel))
-        else:
-            self.logger.debug("Ascenseur <%d>: aucun appel choisi parmi: %s" % \
-                                (ascenseur.num_asc, self.appels))
+            self.appels.retirer(traitement_appel)
+            if __debug__:
+                self.logger.debug("Ascenseur <%d>: appel <%s> pris en compte.",
+                                  ascenseur.num_asc, traitement_appel)
+        elif __debug__:
+            self.logger.debug("Ascenseur <%d>: aucun appel choisi parmi: %s",
+                              ascenseur.num_asc, self.appels)
         return traitement_appel
 
     def retirer_appels_etage(self, ascenseur, appel):
@@ -310,18 +409,74 @@ class Automate(Log):
         @type  appel: objet Appel
         @param appel: données sur l'appel concerné
         """
-        self.logger.debug("Ascenseur <%d>: arrivée à l'étage <%d>." % (ascenseur.num_asc, appel.etage))
-        # on indique au simulateur d'appel qu'un appel externe a reçu l'ascenseur,
-        # afin qu'il puisse générer un appel interne.
-        if appel.num_asc == 0:
-            self.batiment.sim_appels.generer_appel_interne(ascenseur, appel)
+        if __debug__:
+            self.logger.debug("Ascenseur <%d>: arrivée à l'étage <%d>.", ascenseur.num_asc, appel.etage)
+        self._mesurer(appel)
+        flg_externe = appel.num_asc == 0
+        # destination saisie au palier: à chaque arrêt, l'ascenseur prend les
+        # passagers à qui il a été désigné; un autre appel de cet ascenseur
+        # pour cet étage est devenu inutile
+        if self.batiment.params.type_appel == 3:
+            self.appels.retirer(Appel(appel.etage, SENS.AUCUN, num_asc = ascenseur.num_asc))
+            flg_externe = True
         # extinction des boutons d'appels doubles
         if self.batiment.params.type_appel == 2:
-            for _appel in self.appels:
-                if appel.etage == _appel.etage and _appel.num_asc == 0:
-                    self.logger.debug("Appel <%s> retiré, car c'est l'étage courant." % appel)
-                    self.allumage_bouton(_appel, False)
-                    self.appels.remove(_appel)
+            for _appel in self.appels.retirer_externes_etage(appel.etage):
+                if __debug__:
+                    self.logger.debug("Appel <%s> retiré, car c'est l'étage courant.", _appel)
+                self.allumage_bouton(_appel, False)
+                self._mesurer(_appel)
+                flg_externe = True
+        # on indique au simulateur d'appel qu'un appel externe a reçu l'ascenseur,
+        # afin qu'il puisse générer les appels internes.
+        if flg_externe:
+            self.batiment.sim_appels.generer_appel_interne(ascenseur, appel)
+        # un ascenseur complet ne pourra pas prendre les passagers qui lui
+        # ont été désignés: ils sont affectés à nouveau
+        if self.batiment.params.type_appel == 3 and ascenseur.complet:
+            self._liberer_designations(ascenseur)
+
+    def _liberer_designations(self, ascenseur):
+        """
+        Retire les désignations d'un ascenseur et remet ses passagers en
+        attente d'affectation. Un étage où des passagers à bord doivent
+        descendre reste desservi.
+        @type  ascenseur: Ascenseur
+        @param ascenseur: objet Ascenseur complet
+        """
+        population = self.population
+        for _appel in self.appels.avec_passagers(ascenseur.num_asc):
+            self.appels.retirer(_appel)
+            self.allumage_bouton(_appel, False)
+            if len(population.a_descendre(ascenseur.num_asc, _appel.etage)):
+                self.appel(Appel(_appel.etage, SENS.AUCUN, num_asc = ascenseur.num_asc))
+        for idx in population.affectes(ascenseur.num_asc).ids.tolist():
+            self.appel_destination(idx)
+
+    def _mesurer(self, appel):
+        """
+        Mémorise la durée écoulée depuis l'enregistrement d'un appel servi.
+        @type  appel: objet Appel
+        @param appel: appel servi
+        """
+        if appel.date is None:
+            return
+        duree = self.batiment.ordonnanceur.maintenant - appel.date
+        # une désignation au palier (appel interne portant ses passagers)
+        # est l'attente d'un appel externe, pas un trajet
+        if appel.num_asc == 0 or appel.people is not None:
+            self.attentes.append(duree)
+        else:
+            self.trajets.append(duree)
+
+    def relancer(self, ascenseur):
+        """
+        Redonne la main à un ascenseur pour qu'il choisisse un appel s'il est
+        disponible (la politique l'a jugé mieux placé qu'un autre).
+        @type  ascenseur: Ascenseur
+        @param ascenseur: objet Ascenseur concerné
+        """
+        ascenseur.etat.appel(self)
 
     def changer_etat(self, etat):
         """
@@ -334,21 +489,14 @@ class Automate(Log):
 
     def decompte(self, delai, fn_retour):
         """
-        Durée d'ouverture de la porte simulée par un thread.
+        Durée d'ouverture de la porte planifiée sur l'ordonnanceur.
         @type  delai: nombre entier
         @param delai: temps d'attente en seconde(s)
         @type  fn_retour: fonction de retour
         @param fn_retour: fonction appelée à la fin du décompte
         """
         # self.logger.debug("Décompte enclenché...")
-        t = Thread(target = self.__decompte, args = (delai, fn_retour))
-        t.start()
-
-    def __decompte(self, delai, fn_retour):
-        """ Temps d'attente géré par un thread. """
-        sleep(delai)
-        # self.logger.debug("Décompte terminé.")
-        fn_retour()
+        self.batiment.ordonnanceur.planifier(delai, fn_retour)
 
     def porte_ouverte(self, ascenseur):
         """
@@ -357,7 +505,7 @@ class Automate(Log):
         @param ascenseur: objet Ascenseur concerné
         """
         # self.logger.debug("Porte ouverte.")
-        self.decompte(4, ascenseur.fermer_porte)
+        self.decompte(DELAI_ARRET, ascenseur.fermer_porte)
 
     def porte_fermee(self, ascenseur):
         """
@@ -365,7 +513,7 @@ class Automate(Log):
         @type  ascenseur: Ascenseur
         @param ascenseur: objet Ascenseur concerné
         """
-        self.changer_etat(EtatArretFerme(ascenseur))
+        self.changer_etat(ascenseur.etats[EtatArretFerme])
         ascenseur.etat.appel(self)
 
 
@@ -377,14 +525,36 @@ class Ascenseur(Log):
     automate = None
     # objet dérivé de la classe IEtat
     etat = None
+    # états de l'ascenseur, un objet par classe dérivée de IEtat
+    etats = None
     num_asc = None
+    # étage de l'arrêt en cours ou du dernier départ; en déplacement, voir
+    # etage_atteint()
     etage_courant = None
     # sens du dernier mouvement (haut ou bas ou aucun)
     sens = None
     # Null si aucun appel en cours de traitement, sinon n° d'étage
     appel = None
+    # nombre de passagers à bord et leur poids total en kg
+    nb_passagers = 0
+    charge = 0.0
+    # passagers qui n'ont pu monter à l'étage courant, faute de place ou de
+    # charge; ils rappellent l'ascenseur à son départ
+    laisses = None
+    # mouvement de la cabine: étage (fractionnaire) à une date de référence,
+    # vitesse en étages par seconde et cette date; étage visé
+    mouvement = None
+    etage_vise = None
+    # mouvement des portes: ouverture (0 fermées, 1 ouvertes) à une date de
+    # référence, vitesse en fraction par seconde et cette date
+    mouvement_porte = None
+    # durées des trajets d'étage à étage (voir Cinematique.matrice)
+    temps_trajet = None
     # représentation graphique
     ascenseur_gui = None
+    # exécutant des actions temporisées (déplacement et portes), soit la
+    # représentation graphique, soit un pilote simulé
+    pilote = None
 
     def __init__(self, automate, num_asc):
         """
@@ -399,19 +569,105 @@ class Ascenseur(Log):
         self.etage_courant = 0
         self.sens = SENS.AUCUN
         self.appel = None
-        self.ascenseur_gui = AscenseurGui(self)
-
-    def on_simu_stop(self):
-        """ Arrêt de la simulation """
-        self.ascenseur_gui.flg_simu_stop = True
+        self.etats = {classe: classe(self) for classe in (EtatArretFerme, EtatArretOuvert, EtatDeplacement)}
+        self.mouvement = (0.0, 0.0, 0.0)
+        self.etage_vise = 0
+        self.mouvement_porte = (0.0, 0.0, 0.0)
+        self.temps_trajet = table_trajets(automate.batiment.params)
+        if automate.batiment.batiment_gui:
+            from gui.units import AscenseurGui
+            self.ascenseur_gui = AscenseurGui(self)
+            self.pilote = self.ascenseur_gui
+
+    def situation(self, date):
+        """
+        Position de la cabine interpolée à partir de son mouvement.
+        @type  date: nombre
+        @param date: date simulée
+        @return: étage fractionnaire, borné par l'étage visé
+        @rtype: nombre
+        """
+        position, vitesse, depart = self.mouvement
+        if not vitesse:
+            return position
+        position += vitesse * max(0.0, date - depart)
+        return min(position, self.etage_vise) if vitesse > 0 else max(position, self.etage_vise)
+
+    def ouverture(self, date):
+        """
+        Ouverture des portes interpolée à partir de leur mouvement.
+        @type  date: nombre
+        @param date: date simulée
+        @return: 0 pour des portes fermées, 1 pour des portes ouvertes
+        @rtype: nombre
+        """
+        ouverture, vitesse, depart = self.mouvement_porte
+        return min(1.0, max(0.0, ouverture + vitesse * max(0.0, date - depart)))
+
+    def en_mouvement(self, date):
+        """ True si la cabine ou ses portes bougent à la date simulée. """
+        return self.situation(date) != self.etage_vise or 0.0 < self.ouverture(date) < 1.0
 
     def ouvrir_porte(self):
-        """ Ouverture durant 1 seconde """
-        self.ascenseur_gui.ouvrir_porte(1, self.automate.porte_ouverte)
+        """ Ouverture durant DELAI_PORTE secondes """
+        self.mouvement_porte = (0.0, 1.0 / DELAI_PORTE, self.automate.batiment.ordonnanceur.maintenant)
+        self.pilote.ouvrir_porte(DELAI_PORTE, self.automate.porte_ouverte)
 
     def fermer_porte(self):
-        """ Fermeture durant 1 seconde """
-        self.ascenseur_gui.fermer_porte(1, self.automate.porte_fermee)
+        """ Fermeture durant DELAI_PORTE secondes """
+        self.mouvement_porte = (1.0, -1.0 / DELAI_PORTE, self.automate.batiment.ordonnanceur.maintenant)
+        self.pilote.fermer_porte(DELAI_PORTE, self.automate.porte_fermee)
+
+    @property
+    def complet(self):
+        """
+        True si la cabine ne peut plus prendre aucun passager: plus de place,
+        ou une charge restante inférieure au poids du plus léger passager.
+        """
+        return self.nb_passagers >= NB_PLACES or CHARGE_MAX - self.charge < POIDS_BORNES[0]
+
+    def embarquer(self, groupe):
+        """
+        Montée d'un groupe de passagers, par ordre d'arrivée, tant que la
+        charge et le nombre de places le permettent; un passager trop lourd
+        pour la charge restante laisse monter les suivants plus légers.
+        Les passagers restés à l'étage rappelleront l'ascenseur à son départ.
+        @type  groupe: objet People
+        @param groupe: passagers en attente à l'étage courant
+        @return: passagers montés
+        @rtype: objet People
+        """
+        population = self.automate.population
+        places = NB_PLACES - self.nb_passagers
+        reste = CHARGE_MAX - self.charge
+        admis = []
+        for idx, poids in zip(groupe.ids.tolist(), population.poids[groupe.ids].tolist()):
+            if len(admis) == places or reste < POIDS_BORNES[0]:
+                break
+            if poids <= reste:
+                admis.append(idx)
+                reste -= poids
+        montes = People(population, admis)
+        if admis:
+            population.embarquer(montes, self.num_asc)
+            self.automate.mesures.montee(montes.ids, self.automate.batiment.ordonnanceur.maintenant)
+            self.nb_passagers += len(admis)
+            self.charge = CHARGE_MAX - reste
+        if len(admis) < len(groupe):
+            laisses = People(population, groupe.ids)
+            laisses.remove_sub_group(montes)
+            self.laisses = laisses
+        return montes
+
+    def debarquer(self):
+        """ Descente des passagers arrivés à l'étage courant. """
+        population = self.automate.population
+        groupe = population.a_descendre(self.num_asc, self.etage_courant)
+        if len(groupe):
+            population.debarquer(groupe)
+            self.automate.mesures.descente(groupe.ids, self.automate.batiment.ordonnanceur.maintenant)
+            self.nb_passagers -= len(groupe)
+            self.charge = self.charge - groupe.weight if self.nb_passagers else 0.0
 
     def acceder_etage(self, appel):
         """
@@ -420,39 +676,54 @@ class Ascenseur(Log):
         @param appel: étage demandé
         """
         self.appel = appel
+        # l'ascenseur quitte l'étage: les passagers laissés le rappellent
+        if self.laisses is not None and appel.etage != self.etage_courant:
+            laisses, self.laisses = self.laisses, None
+            self.automate.batiment.sim_appels.rappeler(laisses, self.etage_courant)
         # self.logger.debug("Déplacement de l'ascenseur de l'étage <%d> au <%d>..." % (self.etage_courant, etage_courant))
         nb_etages = abs(self.etage_courant - appel.etage)
+        # un appel à l'étage courant ne change pas le sens du déplacement
         if appel.etage > self.etage_courant:
             self.sens = SENS.HAUT
-        else:
+        elif appel.etage < self.etage_courant:
             self.sens = SENS.BAS
         # self.logger.debug("Ascenseur <%d>: %s" % (self.num_asc, self.sens))
-        self.ascenseur_gui.deplacement(2, nb_etages, self.sens, self._etat_deplacement)
-
-    def _etat_deplacement(self, sens):
-        """
-        Appel à chaque passage d'étage.
-        @type  sens: Enum SENS
-        @param sens: sens croissant, décroissant, ou aucun (fin du déplacement)
-        """
-        if sens == SENS.AUCUN:
-            # fin du déplacement
-            # self.logger.debug("Déplacement de l'ascenseur OK.")
-            self.etat.etage_demande_atteint(self.automate, self.appel)
-            # éteindre le bouton d'appel
-            self.automate.allumage_bouton(self.appel, False)
-            self.appel = None
-            # si on est au dernier ou au premier étage, on modifie le sens
-            # du prochain déplacement
-            if self.etage_courant == self.automate.batiment.params.nb_etages - 1:
-                self.sens = SENS.BAS
-            elif self.etage_courant == 0:
-                self.sens = SENS.HAUT
-        else:
-            # on s'est déplacé d'un étage
-            if sens == SENS.HAUT:
-                self.etage_courant += 1
-            else:
-                self.etage_courant -= 1
-            # self.logger.debug("Déplacement d'un étage, étage actuel <%d>." % self.etage_courant)
+        self.etage_vise = appel.etage
+        # la durée du trajet est lue dans la table de la cinématique: seule
+        # l'arrivée est planifiée, la position intermédiaire se déduit du
+        # mouvement
+        duree = float(self.temps_trajet[self.etage_courant, appel.etage])
+        vitesse = nb_etages / duree if duree else 0.0
+        if self.sens == SENS.BAS:
+            vitesse = -vitesse
+        self.mouvement = (float(self.etage_courant), vitesse, self.automate.batiment.ordonnanceur.maintenant)
+        self.pilote.deplacement(duree, self._arrivee)
+
+    def etage_atteint(self, date):
+        """
+        @type  date: nombre
+        @param date: date simulée
+        @return: dernier étage atteint ou passé dans le sens du déplacement
+        @rtype: nombre entier
+        """
+        position = self.situation(date)
+        if self.mouvement[1] < 0:
+            return int(np.ceil(position - 1e-9))
+        return int(np.floor(position + 1e-9))
+
+    def _arrivee(self):
+        """ Fin du déplacement, à l'étage visé. """
+        self.etage_courant = self.etage_vise
+        self.mouvement = (float(self.etage_courant), 0.0, self.automate.batiment.ordonnanceur.maintenant)
+        # self.logger.debug("Déplacement de l'ascenseur OK.")
+        self.etat.etage_demande_atteint(self.automate, self.appel)
+        # éteindre le bouton d'appel
+        self.automate.allumage_bouton(self.appel, False)
+        self.appel = None
+        # si on est au dernier ou au premier étage, on modifie le sens
+        # du prochain déplacement
+        if self.etage_courant == self.automate.batiment.params.nb_etages - 1:
+            self.sens = SENS.BAS
+        elif self.etage_courant == 0:
+            self.sens = SENS.HAUT
 
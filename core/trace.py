@@ -0,0 +1,129 @@
+#!/usr/bin/python
+# -*- Encoding: utf-8 -*-
+
+# ===================================================================
+#
+# Module regroupant l'enregistrement de la demande de transport (une
+# arrivée de passager par ligne) dans une trace compacte (tableau NumPy
+# structuré), et son rejeu devant n'importe quelle configuration.
+#
+# ===================================================================
+
+import numpy as np
+
+# une ligne de trace par arrivée de passager
+TYPE_TRACE = np.dtype([("date", np.float64),
+                       ("origine", np.int32),
+                       ("destination", np.int32),
+                       ("poids", np.float32),
+                       ("age", np.int16)])
+
+
+class EnregistreurTrace:
+    """
+    Mémorise chaque arrivée de passager avec sa date, dans un tableau
+    préalloué dont la taille double lorsqu'il est plein. La trace décrit la
+    demande et non les appels qu'elle a provoqués: rejouée, elle passe par
+    le répartiteur de la configuration simulée, quels que soient son nombre
+    d'ascenseurs, son type d'appel et sa politique.
+    """
+
+    # tableau structuré de type TYPE_TRACE, en partie rempli
+    _lignes = None
+    # nombre de lignes utilisées
+    nb = None
+
+    def __init__(self, capacite = 4096):
+        self._lignes = np.empty(capacite, dtype = TYPE_TRACE)
+        self.nb = 0
+
+    def __len__(self):
+        return self.nb
+
+    def enregistrer(self, date, origine, destination, poids, age):
+        """
+        @type  date: nombre
+        @param date: date d'arrivée du passager
+        @type  origine: nombre entier
+        @param origine: étage où le passager appelle l'ascenseur
+        @type  destination: nombre entier
+        @param destination: étage où se rend le passager
+        @type  poids: nombre
+        @param poids: poids en kg
+        @type  age: nombre entier
+        @param age: âge en années
+        """
+        if self.nb == len(self._lignes):
+            self._lignes = np.resize(self._lignes, 2 * len(self._lignes))
+        self._lignes[self.nb] = (date, origine, destination, poids, age)
+        self.nb += 1
+
+    @property
+    def trace(self):
+        """ Lignes enregistrées (vue sur le tableau, sans copie) """
+        return self._lignes[:self.nb]
+
+    def sauver(self, chemin):
+        """
+        Ecrit la trace au format .npy de NumPy.
+        @type  chemin: chaîne
+        @param chemin: fichier de destination
+        """
+        np.save(chemin, self.trace)
+
+
+def charger_trace(chemin):
+    """
+    Lit une trace écrite par EnregistreurTrace.sauver(); le fichier est
+    projeté en mémoire plutôt que lu en entier.
+    @type  chemin: chaîne
+    @param chemin: fichier .npy
+    @rtype: tableau NumPy de type TYPE_TRACE
+    """
+    trace = np.load(chemin, mmap_mode = "r")
+    if trace.dtype != TYPE_TRACE:
+        raise ValueError("%s n'est pas une trace d'arrivées de passagers." % chemin)
+    return trace
+
+
+def verifier_trace(trace, nb_etages):
+    """
+    Vérifie qu'une trace peut être rejouée dans un bâtiment.
+    @type  trace: tableau NumPy de type TYPE_TRACE
+    @param trace: arrivées à rejouer
+    @type  nb_etages: nombre entier
+    @param nb_etages: nombre d'étages du bâtiment
+    @raise ValueError: un étage de la trace n'existe pas dans le bâtiment
+    """
+    if not len(trace):
+        return
+    etage_max = int(max(trace["origine"].max(), trace["destination"].max()))
+    if etage_max >= nb_etages or min(trace["origine"].min(), trace["destination"].min()) < 0:
+        raise ValueError("La trace dessert l'étage %d, absent d'un bâtiment de %d étages."
+                         % (etage_max, nb_etages))
+
+
+class RejeuTrace:
+    """
+    Flux d'arrivées lu dans une trace, au même format qu'un GenerateurTrafic:
+    les passagers sont réinjectés un à un par SimAppels.arrivee(), à leur
+    date d'origine. Sans affichage, l'horloge simulée saute d'une arrivée à
+    la suivante: le rejeu va aussi vite que le processeur le permet.
+    """
+
+    trace = None
+
+    def __init__(self, trace):
+        """
+        @type  trace: tableau NumPy de type TYPE_TRACE
+        @param trace: arrivées à rejouer, par dates croissantes
+        """
+        self.trace = trace
+
+    def __iter__(self):
+        """ Quintuplets (date, origine, destination, poids, âge) """
+        colonnes = ("date", "origine", "destination", "poids", "age")
+        # lecture par blocs, pour ne pas charger une longue trace en entier
+        for debut in range(0, len(self.trace), 65536):
+            bloc = self.trace[debut:debut + 65536]
+            yield from zip(*(bloc[nom].tolist() for nom in colonnes))
@@ -0,0 +1,180 @@
+#!/usr/bin/python
+# -*- Encoding: utf-8 -*-
+
+# ===================================================================
+#
+# Module regroupant la génération du trafic de passagers: profils
+# d'arrivées variant dans la journée et tirages aléatoires reproductibles.
+#
+# ===================================================================
+
+import numpy as np
+
+# durée d'une journée en secondes
+JOURNEE = 86400.0
+# poids des passagers en kg: moyenne, écart-type et bornes
+POIDS_MOYEN = 75.0
+POIDS_ECART = 15.0
+POIDS_BORNES = (20.0, 150.0)
+# âges des passagers en années, bornes incluses
+AGES_BORNES = (6, 80)
+
+
+def od_interetages(nb_etages):
+    """ Déplacements uniformes entre deux étages distincts quelconques. """
+    od = np.ones((nb_etages, nb_etages))
+    np.fill_diagonal(od, 0.0)
+    return od / od.sum()
+
+
+def od_montee(nb_etages):
+    """ Déplacements du rez-de-chaussée vers les étages (arrivée au travail). """
+    od = np.zeros((nb_etages, nb_etages))
+    od[0, 1:] = 1.0
+    return od / od.sum()
+
+
+def od_descente(nb_etages):
+    """ Déplacements des étages vers le rez-de-chaussée (départ du travail). """
+    od = np.zeros((nb_etages, nb_etages))
+    od[1:, 0] = 1.0
+    return od / od.sum()
+
+
+def melange(*composantes):
+    """
+    Matrice origine/destination pondérée.
+    @type  composantes: couples (poids, matrice)
+    @param composantes: matrices normalisées et leur part du trafic
+    """
+    od = sum(poids * matrice for poids, matrice in composantes)
+    return od / od.sum()
+
+
+class Periode:
+    """
+    Intervalle de temps à taux d'arrivée constant (processus de Poisson)
+    et à répartition origine/destination fixe.
+    """
+
+    # bornes en secondes depuis le début du cycle
+    debut = None
+    fin = None
+    # arrivées par seconde
+    taux = None
+    # probabilités (origine x destination), diagonale nulle
+    od = None
+
+    def __init__(self, debut, fin, taux, od):
+        self.debut = debut
+        self.fin = fin
+        self.taux = taux
+        self.od = od
+
+    def __repr__(self):
+        return "<%d-%d s|%.4f/s>" % (self.debut, self.fin, self.taux)
+
+
+class ProfilTrafic:
+    """
+    Suite de périodes couvrant un cycle (une journée par défaut), répété
+    indéfiniment.
+    """
+
+    nb_etages = None
+    periodes = None
+    # durée du cycle en secondes
+    cycle = None
+
+    def __init__(self, nb_etages, periodes, cycle = JOURNEE):
+        self.nb_etages = nb_etages
+        self.periodes = periodes
+        self.cycle = cycle
+
+    @classmethod
+    def constant(cls, nb_etages, taux):
+        """
+        Trafic uniforme entre étages à taux constant.
+        @type  taux: nombre
+        @param taux: arrivées par seconde
+        """
+        return cls(nb_etages, [Periode(0.0, JOURNEE, taux, od_interetages(nb_etages))])
+
+    @classmethod
+    def journee(cls, nb_etages, taux_pointe = 0.5, taux_creux = 0.02):
+        """
+        Journée de bureau: pointe montante le matin, déjeuner, pointe
+        descendante le soir, et trafic entre étages le reste du temps.
+        @type  taux_pointe: nombre
+        @param taux_pointe: arrivées par seconde aux heures de pointe
+        @type  taux_creux: nombre
+        @param taux_creux: arrivées par seconde la nuit
+        """
+        heure = 3600.0
+        inter = od_interetages(nb_etages)
+        montee = od_montee(nb_etages)
+        descente = od_descente(nb_etages)
+        taux_jour = taux_pointe / 4
+        periodes = [
+            Periode(0 * heure, 7 * heure, taux_creux, inter),
+            Periode(7 * heure, 9.5 * heure, taux_pointe,
+                    melange((0.85, montee), (0.10, inter), (0.05, descente))),
+            Periode(9.5 * heure, 12 * heure, taux_jour, inter),
+            Periode(12 * heure, 14 * heure, taux_pointe * 0.6,
+                    melange((0.45, descente), (0.45, montee), (0.10, inter))),
+            Periode(14 * heure, 17 * heure, taux_jour, inter),
+            Periode(17 * heure, 19 * heure, taux_pointe,
+                    melange((0.85, descente), (0.10, inter), (0.05, montee))),
+            Periode(19 * heure, 24 * heure, taux_creux, inter),
+        ]
+        return cls(nb_etages, periodes)
+
+
+class GenerateurTrafic:
+    """
+    Arrivées de passagers tirées par lots NumPy à partir d'un profil et
+    d'une graine: une même graine rejoue exactement le même trafic.
+    Le générateur s'itère paresseusement en quintuplets (date, étage
+    d'origine, étage de destination, poids, âge), par dates croissantes.
+    """
+
+    profil = None
+    graine = None
+    # durée maximale couverte par un lot de tirages, en secondes
+    duree_lot = None
+
+    def __init__(self, profil, graine = None, duree_lot = 3600.0):
+        self.profil = profil
+        self.graine = graine
+        self.duree_lot = duree_lot
+
+    def lots(self):
+        """
+        Lots successifs d'arrivées, sous forme de tableaux triés par date.
+        @return: itérateur de quintuplets (dates, origines, destinations, poids, ages)
+        """
+        alea = np.random.default_rng(self.graine)
+        nb_etages = self.profil.nb_etages
+        # sans aucune arrivée possible, le flux est vide
+        if not any(periode.taux > 0 for periode in self.profil.periodes):
+            return
+        debut_cycle = 0.0
+        while True:
+            for periode in self.profil.periodes:
+                probas = periode.od.ravel()
+                debut = periode.debut
+                while debut < periode.fin:
+                    fin = min(debut + self.duree_lot, periode.fin)
+                    nb = alea.poisson(periode.taux * (fin - debut))
+                    if nb:
+                        dates = debut_cycle + debut + np.sort(alea.uniform(0.0, fin - debut, nb))
+                        trajets = alea.choice(len(probas), size = nb, p = probas)
+                        poids = np.clip(alea.normal(POIDS_MOYEN, POIDS_ECART, nb), *POIDS_BORNES)
+                        ages = alea.integers(AGES_BORNES[0], AGES_BORNES[1] + 1, nb)
+                        yield dates, trajets // nb_etages, trajets % nb_etages, poids, ages
+                    debut = fin
+            debut_cycle += self.profil.cycle
+
+    def __iter__(self):
+        for lot in self.lots():
+            yield from zip(*(colonne.tolist() for colonne in lot))
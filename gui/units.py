@@ -8,11 +8,10 @@
 # ===================================================================
 
 from gi.repository import Gdk
+import cairo
 from abc import ABC, abstractmethod
-from threading import Thread
-from time import sleep
 # from core.log import Log
-from core.activite import SENS
+from core.moteur import PiloteSimule
 
 # constantes
 HAUTEUR_ETAGE = 60
@@ -21,24 +20,36 @@ LRG_BAT_ASC = 50
 MARGE_ASC = 5
 MARGE_PORTE = 2
 
-# leurs valeurs seront actualisées en fonction des options
-HAUTEUR_SOL = 350
-LONG_SOL = 400
-ORG_BAT_X = 100
+# marges autour du bâtiment, et début du sol
+MARGE_BAT_X = 100
+MARGE_BAT_Y = 80
+MARGE_SOL_X = 50
+
+# débord du trait autour d'une forme, inclus dans les zones à redessiner
+MARGE_TRAIT = 2
 
 # couleurs utilisables
 COULEUR_ORANGE = "#F05D00"
 COULEUR_VERTE = "#04b90e"
 
 
+def union(zone1, zone2):
+    """
+    Plus petit rectangle contenant deux zones (x, y, largeur, hauteur).
+    @rtype: tuple de 4 nombres entiers
+    """
+    x = min(zone1[0], zone2[0])
+    y = min(zone1[1], zone2[1])
+    return (x, y,
+            max(zone1[0] + zone1[2], zone2[0] + zone2[2]) - x,
+            max(zone1[1] + zone1[3], zone2[1] + zone2[3]) - y)
+
+
 class Region:
     """
     Zone de dessin sensible au clic.
     """
-    x_min = None
-    x_max = None
-    y_min = None
-    y_max = None
+    __slots__ = ("x_min", "x_max", "y_min", "y_max")
 
     def __init__(self, x_min = 0, x_max = 0, y_min = 0, y_max = 0):
         """
@@ -53,6 +64,18 @@ class Region:
         self.y_min = y_min
         self.y_max = y_max
 
+    def zone(self):
+        """
+        Rectangle entier à redessiner pour cette région, trait compris.
+        @return: (x, y, largeur, hauteur)
+        @rtype: tuple de 4 nombres entiers
+        """
+        x = int(self.x_min) - MARGE_TRAIT
+        y = int(self.y_min) - MARGE_TRAIT
+        return (x, y,
+                int(self.x_max + 1) + MARGE_TRAIT - x,
+                int(self.y_max + 1) + MARGE_TRAIT - y)
+
     def is_inside(self, x, y):
         """
         Retourne True si le point est dans la zone.
@@ -70,206 +93,458 @@ class Region:
             return False
 
 
+class IndexRegions:
+    """
+    Index spatial des régions sensibles au clic: une grille de cases
+    carrées, chaque case listant les régions qui la recouvrent. Un clic ne
+    parcourt que la liste de sa case, quel que soit le nombre de régions.
+    """
+
+    # côté d'une case en pixels
+    taille_case = None
+    # couples (région, objet) par case (colonne, ligne)
+    _cases = None
+
+    def __init__(self, taille_case = HAUTEUR_ETAGE / 4):
+        self.taille_case = taille_case
+        self._cases = {}
+
+    def _case(self, x, y):
+        return (int(x // self.taille_case), int(y // self.taille_case))
+
+    def ajouter(self, region, objet):
+        """
+        @type  region: objet Region
+        @param region: zone sensible au clic
+        @param objet: objet retourné pour un clic dans la zone
+        """
+        col_min, lig_min = self._case(region.x_min, region.y_min)
+        col_max, lig_max = self._case(region.x_max, region.y_max)
+        for col in range(col_min, col_max + 1):
+            for lig in range(lig_min, lig_max + 1):
+                self._cases.setdefault((col, lig), []).append((region, objet))
+
+    def chercher(self, x, y):
+        """
+        Retourne l'objet de la région contenant le point; si des régions se
+        chevauchent, seule la première ajoutée est retenue.
+        @return: objet associé, None si aucune région ne contient le point
+        """
+        for region, objet in self._cases.get(self._case(x, y), ()):
+            if region.is_inside(x, y):
+                return objet
+        return None
+
+
+class ElementGui(ABC):
+    """
+    Elément dessiné dans une zone rectangulaire: lorsque son modèle change,
+    seule cette zone est redessinée.
+    """
+
+    @abstractmethod
+    def zone(self):
+        """
+        @return: rectangle (x, y, largeur, hauteur) couvrant le dessin
+        @rtype: tuple de 4 nombres entiers
+        """
+        return
+
+    def dans_zone(self, x1, y1, x2, y2):
+        """
+        Indique si le dessin touche le rectangle à redessiner.
+        @return: True si l'élément doit être redessiné
+        @rtype: Boolean
+        """
+        x, y, largeur, hauteur = self.zone()
+        return x < x2 and x + largeur > x1 and y < y2 and y + hauteur > y1
+
+
+class Disposition:
+    """
+    Dimensions du dessin d'un bâtiment en coordonnées du modèle (zoom 1).
+    Elles ne dépendent que des options, pas de la taille de la fenêtre:
+    au-delà, la vue défile.
+    """
+
+    nb_etages = None
+    # abscisse du bâtiment
+    org_bat_x = None
+    # ordonnée et longueur du sol
+    hauteur_sol = None
+    long_sol = None
+    # largeur de la colonne des boutons d'appel, selon le nombre d'ascenseurs
+    lrg_boutons = None
+    # taille totale du dessin
+    largeur = None
+    hauteur = None
+
+    def __init__(self, params):
+        """
+        @type  params: objet Params
+        @param params: regroupe les options communes
+        """
+        self.nb_etages = params.nb_etages
+        self.org_bat_x = MARGE_BAT_X
+        self.lrg_boutons = max(LRG_BAT_ASC, LRG_BAT_ASC / 4 * (params.nb_asc + 1))
+        self.largeur = int(self.x_cage(params.nb_asc + 1) + LRG_BAT_1 + MARGE_BAT_X)
+        self.long_sol = self.largeur - 2 * MARGE_SOL_X
+        self.hauteur_sol = MARGE_BAT_Y + params.nb_etages * HAUTEUR_ETAGE
+        self.hauteur = self.hauteur_sol + MARGE_BAT_Y
+
+    def x_boutons(self):
+        """ Abscisse de la colonne des boutons d'appel """
+        return self.org_bat_x + LRG_BAT_1
+
+    def x_cage(self, num_asc):
+        """ Abscisse de la cage d'un ascenseur (n° à partir de 1) """
+        return self.x_boutons() + self.lrg_boutons + (num_asc - 1) * LRG_BAT_ASC
+
+    def y_etage(self, etage):
+        """ Ordonnée du plancher d'un étage """
+        return self.hauteur_sol - etage * HAUTEUR_ETAGE
+
+    def etages_visibles(self, y1, y2):
+        """
+        @return: étages coupant la bande d'ordonnées [y1, y2]
+        @rtype: range
+        """
+        bas = int((self.hauteur_sol - y2) // HAUTEUR_ETAGE)
+        haut = int((self.hauteur_sol - y1) // HAUTEUR_ETAGE)
+        return range(max(0, bas), min(self.nb_etages, haut + 1))
+
+
 class BatimentGui:
     """
     Représentation du bâtiment composé de 3 parties:
      - une colonne symbolisant les étages
      - une colonne regroupant les boutons d'appel
      - une ou deux colonnes servant de cage(s) d'ascenseur
+
+    Cette partie fixe et les boutons éteints des étages visibles sont
+    dessinés une seule fois dans une image en mémoire, recopiée à chaque
+    dessin: seuls les ascenseurs et les boutons allumés sont redessinés.
+    L'image est reconstruite lorsque la partie visible en sort (défilement,
+    agrandissement) ou que le zoom change.
     """
 
     # options générales
     params = None
-
-    def __init__(self, area, params):
+    # zone de dessin, invalidée par morceaux
+    area = None
+    # dimensions du dessin, objet Disposition
+    disposition = None
+    # facteur d'agrandissement du dessin
+    zoom = None
+    # représentations des boutons, dessinés éteints dans le fond
+    boutons_gui = None
+    # mêmes boutons, par étage
+    _boutons_etage = None
+    # boutons indexés par leur région sensible au clic
+    index_boutons = None
+    # fond mis en cache, objet cairo.ImageSurface (None à reconstruire),
+    # et rectangle de la zone de dessin qu'il couvre
+    _fond = None
+    _rect_fond = None
+    # fonction donnant la date simulée à afficher, et date de l'image en
+    # cours: les ascenseurs y sont dessinés à leur position interpolée
+    horloge = None
+    date = None
+
+    def __init__(self, area, params, zoom = 1.0):
         """
         Représentation graphique du bâtiment.
         @type  area: DrawingArea
         @param area: Composant Gtk contenant les dessins
         @type  params: objet Params
         @param params: regroupe les options communes
+        @type  zoom: nombre
+        @param zoom: facteur d'agrandissement
         """
         self.params = params
-        # actualisation des valeurs de référence du dessin
+        self.area = area
+        self.disposition = Disposition(params)
+        self.zoom = zoom
+        self.boutons_gui = []
+        self._boutons_etage = {}
+        self.index_boutons = IndexRegions()
+        self.date = 0.0
+
+    def dater(self):
+        """ Date de l'image suivante, lue sur l'horloge de l'affichage. """
+        if self.horloge:
+            self.date = self.horloge()
+
+    def changer_zoom(self, zoom):
+        """ Nouveau facteur d'agrandissement; le fond est à reconstruire. """
+        self.zoom = zoom
+        self._fond = None
+
+    def invalider(self, zone):
+        """
+        Demande à Gtk de redessiner une partie de la zone de dessin.
+        @type  zone: tuple de 4 nombres entiers
+        @param zone: rectangle (x, y, largeur, hauteur) modifié, en
+                     coordonnées du modèle
+        """
+        x, y, largeur, hauteur = zone
+        self.area.queue_draw_area(int(x * self.zoom), int(y * self.zoom),
+                                  int(largeur * self.zoom) + 2, int(hauteur * self.zoom) + 2)
+
+    def placer_boutons(self, boutons_gui):
+        """
+        Enregistre les boutons une fois placés, et indexe leurs régions.
+        @type  boutons_gui: liste d'objets BoutonGui
+        @param boutons_gui: représentations de tous les boutons du bâtiment
+        """
+        self.boutons_gui = boutons_gui
+        self._boutons_etage = {}
+        self.index_boutons = IndexRegions()
+        for bouton_gui in boutons_gui:
+            self._boutons_etage.setdefault(bouton_gui.bouton.appel.etage, []).append(bouton_gui)
+            self.index_boutons.ajouter(bouton_gui.region, bouton_gui.bouton)
+        self._fond = None
+
+    def boutons_zone(self, x1, y1, x2, y2):
+        """
+        @return: boutons des étages coupant un rectangle en coordonnées du
+                 modèle, sans parcourir ceux des autres étages
+        @rtype: itérateur d'objets BoutonGui
+        """
+        for etage in self.disposition.etages_visibles(y1, y2):
+            yield from self._boutons_etage.get(etage, ())
+
+    def bouton_en(self, x, y):
+        """
+        @type  x: nombre
+        @param x: abscisse dans la zone de dessin
+        @type  y: nombre
+        @param y: ordonnée dans la zone de dessin
+        @return: bouton sous le point cliqué, None si aucun
+        @rtype: objet Bouton
+        """
+        return self.index_boutons.chercher(x / self.zoom, y / self.zoom)
+
+    @staticmethod
+    def _couleur(context):
+        """ Couleur de tous les traits. """
+        color = Gdk.RGBA()
+        Gdk.RGBA.parse(color, COULEUR_ORANGE)
+        # FIXME: context.set_source_rgba(color)
+        context.set_source_rgb(color.red, color.green, color.blue)
+
+    @staticmethod
+    def _rect_visible(area):
+        """
+        Partie de la zone de dessin visible dans la fenêtre à défilement qui
+        la contient, ou toute la zone.
+        @return: (x, y, largeur, hauteur) en pixels
+        @rtype: tuple de 4 nombres entiers
+        """
         largeur = area.get_allocated_width()
         hauteur = area.get_allocated_height()
-        # 87 % de la hauteur
-        global HAUTEUR_SOL
-        HAUTEUR_SOL = int(hauteur * 0.87)
-        # 20 % de la largeur
-        global ORG_BAT_X
-        ORG_BAT_X = int(largeur * 0.2)
-        # 80 % de la largeur
-        global LONG_SOL
-        LONG_SOL = int(largeur * 0.8)
+        parent = area.get_parent()
+        if not hasattr(parent, "get_hadjustment"):
+            return (0, 0, largeur, hauteur)
+        hadj = parent.get_hadjustment()
+        vadj = parent.get_vadjustment()
+        x = int(hadj.get_value())
+        y = int(vadj.get_value())
+        return (x, y,
+                max(1, min(largeur - x, int(hadj.get_page_size()) + 1)),
+                max(1, min(hauteur - y, int(vadj.get_page_size()) + 1)))
+
+    def _construire_fond(self, area):
+        """
+        Dessine la partie fixe du bâtiment et les boutons éteints des étages
+        visibles dans une image de la taille de la partie visible.
+        """
+        x, y, largeur, hauteur = self._rect_fond = self._rect_visible(area)
+        self._fond = cairo.ImageSurface(cairo.FORMAT_ARGB32, largeur, hauteur)
+        context = cairo.Context(self._fond)
+        context.translate(-x, -y)
+        context.scale(self.zoom, self.zoom)
+        self._couleur(context)
+        etages = self.disposition.etages_visibles(y / self.zoom, (y + hauteur) / self.zoom)
+        self._dessiner_structure(context, etages)
+        for etage in etages:
+            for bouton_gui in self._boutons_etage.get(etage, ()):
+                bouton_gui.dessiner(context, False)
+                bouton_gui.dessiner_etiquette(context)
+
+    def _fond_couvre(self, x1, y1, x2, y2):
+        """ Indique si le fond en cache couvre le rectangle à redessiner. """
+        x, y, largeur, hauteur = self._rect_fond
+        return x <= x1 and y <= y1 and x2 <= x + largeur and y2 <= y + hauteur
 
     def on_draw(self, area, context):
         """
-        Dessin de tout les objets.
+        Recopie du fond, puis passage du contexte en coordonnées du modèle
+        et choix de la couleur des autres objets.
         @type  area: DrawingArea
         @param area: Composant lié à l'événement
         @type  context: cairo context
         @param context: Surface de dessin
         """
-        color = Gdk.RGBA()
-        Gdk.RGBA.parse(color, COULEUR_ORANGE)
-        # FIXME: context.set_source_rgba(color)
-        context.set_source_rgb(color.red, color.green, color.blue)
+        if self._fond is None or not self._fond_couvre(*context.clip_extents()):
+            self._construire_fond(area)
+        context.set_source_surface(self._fond, self._rect_fond[0], self._rect_fond[1])
+        context.paint()
+        context.scale(self.zoom, self.zoom)
+        self._couleur(context)
+
+    def _dessiner_structure(self, context, etages):
+        """
+        Dessin du sol, des étages donnés et des cages d'ascenseur.
+        @type  context: cairo context
+        @param context: Surface de dessin
+        @type  etages: range
+        @param etages: étages à dessiner
+        """
+        disposition = self.disposition
+        x_boutons = disposition.x_boutons()
+        x_droite = disposition.x_cage(self.params.nb_asc + 1)
         # sol
-        context.rectangle(50, HAUTEUR_SOL, LONG_SOL, 20)
+        context.rectangle(MARGE_SOL_X, disposition.hauteur_sol, disposition.long_sol, 20)
         context.fill()
-        for etage in range(self.params.nb_etages):
-            offset = etage * HAUTEUR_ETAGE
+        for etage in etages:
+            y = disposition.y_etage(etage)
             # partie gauche du bâtiment (attente des personnes)
-            context.rectangle(ORG_BAT_X,
-                              HAUTEUR_SOL - offset,
-                              LRG_BAT_1,
-                              -HAUTEUR_ETAGE)
+            context.rectangle(disposition.org_bat_x, y, LRG_BAT_1, -HAUTEUR_ETAGE)
             context.stroke()
             # partie centrale contenant les boutons d'appel
-            context.rectangle(ORG_BAT_X + LRG_BAT_1,
-                              HAUTEUR_SOL - offset,
-                              LRG_BAT_ASC,
-                              -HAUTEUR_ETAGE)
+            context.rectangle(x_boutons, y, disposition.lrg_boutons, -HAUTEUR_ETAGE)
             context.stroke()
             # partie droite du bâtiment (attente des personnes)
-            bonus_x = self.params.nb_asc * LRG_BAT_ASC
-            context.rectangle(ORG_BAT_X + LRG_BAT_1 + LRG_BAT_ASC + bonus_x,
-                              HAUTEUR_SOL - offset,
-                              LRG_BAT_1,
-                              -HAUTEUR_ETAGE)
+            context.rectangle(x_droite, y, LRG_BAT_1, -HAUTEUR_ETAGE)
             context.stroke()
         # partie droite contenant les cages d'ascenseur
-        for idx_asc in range(self.params.nb_asc):
-            # pour avoir 1-2 et non 0-1
-            idx_asc += 1
-            context.rectangle(ORG_BAT_X + LRG_BAT_1 + (idx_asc * LRG_BAT_ASC),
-                              HAUTEUR_SOL,
+        for num_asc in range(1, self.params.nb_asc + 1):
+            context.rectangle(disposition.x_cage(num_asc),
+                              disposition.hauteur_sol,
                               LRG_BAT_ASC,
                               -self.params.nb_etages * HAUTEUR_ETAGE)
         context.stroke()
 
 
-class AscenseurGui:
+class AscenseurGui(PiloteSimule, ElementGui):
     """
     Dessin d'un ascenseur.
+    Les actions temporisées sont celles du pilote simulé: seules les fins
+    de mouvement sont planifiées. La cabine et ses portes
+    sont dessinées à la position interpolée depuis le mouvement tenu par le
+    modèle (voir Ascenseur.situation), à chaque image affichée tant que
+    l'ascenseur ou ses portes bougent.
     """
-    # position de l'ascenseur
+    # abscisses de l'ascenseur
     POS_X_GAUCHE = None
     POS_X_DROITE = None
-    pos_y = None
-    # valeur de l'écartement d'un battant, laissant 1 de côté lorsqu'il est
-    # ouvert en grand. Un battant fait 20 de large.
-    largeur_battant = None
+    # largeur d'un battant fermé, et sa course: il laisse 2 de côté
+    # lorsqu'il est ouvert en grand
     LRG_BATTANT_MAX = 20.0
-    OUV_INCREMENT = 3
-    OUVRIR_PORTE = 1
-    FERMER_PORTE = 2
-
-    ascenseur = None
-    # demande d'arrêt d'un thread si actif
-    flg_simu_stop = None
-
-    def __init__(self, ascenseur, etage = 0):
+    COURSE_BATTANT = 18.0
+
+    # bâtiment dont la zone de dessin est invalidée
+    batiment_gui = None
+    disposition = None
+    # n° du rappel appelé à chaque image, None sans animation en cours
+    _rappel_image = None
+    # zone et date simulée de l'image précédente
+    _zone_affichee = None
+    _date_affichee = None
+
+    def __init__(self, ascenseur):
         """ Constructeur
         @type  ascenseur: objet Ascenseur
         @param ascenseur: ascenseur à représenter
-        @type  etage: nombre entier
-        @param etage: étage de départ de l'ascenseur
-        """
-        self.ascenseur = ascenseur
-        # portes fermées par défaut
-        self.largeur_battant = self.LRG_BATTANT_MAX
-        # positions de départ
-        self.POS_X_GAUCHE = ORG_BAT_X + LRG_BAT_1 + MARGE_ASC + (ascenseur.num_asc * LRG_BAT_ASC)
+        """
+        PiloteSimule.__init__(self, ascenseur, ascenseur.automate.batiment.ordonnanceur)
+        self.batiment_gui = ascenseur.automate.batiment.batiment_gui
+        self.disposition = self.batiment_gui.disposition
+        self._rappel_image = None
+        self._zone_affichee = None
+        self._date_affichee = None
+        self.POS_X_GAUCHE = self.disposition.x_cage(ascenseur.num_asc) + MARGE_ASC
         self.POS_X_DROITE = self.POS_X_GAUCHE + LRG_BAT_ASC - (2 * MARGE_ASC)
-        self.pos_y = self._conv_pos_depuis_etage(etage)
+
+    @property
+    def pos_y(self):
+        """ Ordonnée du plancher de la cabine à la date de l'image """
+        return self._conv_pos_depuis_etage(self.ascenseur.situation(self.batiment_gui.date))
+
+    @property
+    def largeur_battant(self):
+        """ Largeur d'un battant à la date de l'image """
+        return self.LRG_BATTANT_MAX - self.COURSE_BATTANT * self.ascenseur.ouverture(self.batiment_gui.date)
+
+    def zone(self):
+        """ Cabine et portes, trait compris. """
+        hauteur_asc = HAUTEUR_ETAGE - (2 * MARGE_ASC)
+        x = int(self.POS_X_GAUCHE) - MARGE_TRAIT
+        y = int(self.pos_y - hauteur_asc) - MARGE_TRAIT
+        return (x, y,
+                LRG_BAT_ASC - (2 * MARGE_ASC) + (2 * MARGE_TRAIT) + 1,
+                hauteur_asc + (2 * MARGE_TRAIT) + 1)
 
     def _conv_pos_depuis_etage(self, etage):
-        """ Conversion du numéro d'étage en ordonnée. """
-        return HAUTEUR_SOL - MARGE_ASC - (etage * HAUTEUR_ETAGE)
+        """ Conversion du numéro d'étage (fractionnaire) en ordonnée. """
+        return self.disposition.y_etage(etage) - MARGE_ASC
 
     def ouvrir_porte(self, delai, fn_retour):
+        """ Ouverture de la porte dans le délai en seconde(s), animée. """
+        PiloteSimule.ouvrir_porte(self, delai, fn_retour)
+        self.animer()
+
+    def fermer_porte(self, delai, fn_retour):
+        """ Fermeture de la porte dans le délai en seconde(s), animée. """
+        PiloteSimule.fermer_porte(self, delai, fn_retour)
+        self.animer()
+
+    def deplacement(self, duree, fn_arrivee):
         """
-        Ouverture progressive de la porte dans le délai en seconde(s).
+        Planifie l'arrivée à destination, et anime la cabine jusque-là.
+        @type  duree: nombre
+        @param duree: durée du trajet en seconde(s)
+        @type  fn_arrivee: fonction
+        @param fn_arrivee: fonction appelée en fin de tâche
         """
-        t = Thread(target = self.__actionner_porte, \
-                                    args = (delai, self.OUVRIR_PORTE, fn_retour))
-        t.start()
+        PiloteSimule.deplacement(self, duree, fn_arrivee)
+        self.animer()
 
-    def fermer_porte(self, delai, fn_retour):
+    def animer(self):
+        """ Redessine l'ascenseur à chaque image, s'il ne l'est pas déjà. """
+        if self._rappel_image is None:
+            self._rappel_image = self.batiment_gui.area.add_tick_callback(self.__image)
+
+    def __image(self, area, horloge_image):
         """
-        Ouverture progressive de la porte dans le délai en seconde(s).
-        """
-        t = Thread(target = self.__actionner_porte, \
-                                    args = (delai, self.FERMER_PORTE, fn_retour))
-        t.start()
-
-    def __actionner_porte(self, delai, action, fn_retour = None):
-        """
-        Ouverture progressive de la porte dans le délai en seconde(s) par
-        pas de 6 étapes.
-        """
-        # if self.OUVRIR_PORTE:
-            # self.logger.debug("Ascenseur <%d>: ouverture de la porte..." % self.ascenseur.idx_asc)
-        # else:
-            # self.logger.debug("Ascenseur <%d>: fermeture de la porte..." % self.ascenseur.idx_asc)
-        for i in range(6):
-            if action == self.OUVRIR_PORTE:
-                self.largeur_battant -= self.OUV_INCREMENT
-            elif action == self.FERMER_PORTE:
-                self.largeur_battant += self.OUV_INCREMENT
-            else:
-                pass
-            sleep(float(delai / 6))
-            # si arrêt de la simulation
-            if self.flg_simu_stop:
-                break
-        fn_retour(self.ascenseur)
-        # self.logger.debug("Ascenseur <%d>: action de la porte OK." % self.ascenseur.idx_asc)
-
-    def deplacement(self, delai_etage, nb_etages, sens, fn_situation):
-        """
-        Déplacement avec un délai sous-traité.
-        Les batiments avec moins de 15 étages ont des ascenseurs mettant 3s / étage;
-        entre 15 et 30 étages c'est 1s / étage, et les grandes tours peuvent avoir
-        des asccenseurs mettant 0.5s / étage.
-        @type  delai_etage: nombre entier
-        @param delai_etage: temps de transition entre deux étage en seconde(s)
-        @type  nb_etages: nombre entier
-        @param nb_etages: nombre d'étages à passer
-        @type  sens: Enum SENS
-        @param sens: sens croissant, décroissant, ou aucunn
-        """
-        t = Thread(target = self.__deplacement, \
-                                    args = (delai_etage, nb_etages, sens, fn_situation))
-        t.start()
-
-    def __deplacement(self, delai_etage, nb_etages, sens, fn_situation):
-        """
-        Déplacement progressif géré par un thread.
-        @type  fn_situation: fonction
-        @param fn_situation: fonction appelée en fin de tâche
-        """
-        NB_ETAPES = 10
-        for etage in range(nb_etages):
-            # si demandé, arrêt
-            if self.flg_simu_stop:
-                break
-            # incrémentation en 6 étapes pour aller vers l'étage adjacent
-            for inc in range(NB_ETAPES):
-                # si demandé, arrêt
-                if self.flg_simu_stop:
-                    break
-                sleep(float(delai_etage / NB_ETAPES))
-                if sens == SENS.HAUT:
-                    self.pos_y -= HAUTEUR_ETAGE / NB_ETAPES
-                else:
-                    self.pos_y += HAUTEUR_ETAGE / NB_ETAPES
-            # on s'est déplacé d'un étage, information partagée
-            fn_situation(sens)
-        # on est arrivé à destination, information partagée
-        fn_situation(SENS.AUCUN)
+        Rappel de Gtk avant chaque image: la cabine est invalidée à sa
+        position précédente et à sa nouvelle position.
+        @return: True tant que l'ascenseur ou ses portes bougent, et que
+                 l'horloge n'est pas suspendue
+        """
+        self.batiment_gui.dater()
+        if self.batiment_gui.date == self._date_affichee:
+            # horloge suspendue: l'image affichée est à jour
+            self._rappel_image = None
+            return False
+        self._date_affichee = self.batiment_gui.date
+        zone = self.zone()
+        if self._zone_affichee:
+            self.batiment_gui.invalider(union(self._zone_affichee, zone))
+        else:
+            self.batiment_gui.invalider(zone)
+        self._zone_affichee = zone
+        if self.ascenseur.en_mouvement(self.batiment_gui.date):
+            return True
+        self._rappel_image = None
+        return False
+
+    def arreter_animation(self):
+        """ Fin des rappels à chaque image, à l'arrêt de la simulation. """
+        if self._rappel_image is not None:
+            self.batiment_gui.area.remove_tick_callback(self._rappel_image)
+            self._rappel_image = None
 
     def on_draw(self, area, context):
         """
@@ -281,27 +556,29 @@ class AscenseurGui:
         """
         hauteur_asc = -(HAUTEUR_ETAGE - (2 * MARGE_ASC))
         largeur_asc = LRG_BAT_ASC - (2 * MARGE_ASC)
+        pos_y = self.pos_y
+        largeur_battant = self.largeur_battant
         # contour
         context.rectangle(self.POS_X_GAUCHE,
-                          self.pos_y,
+                          pos_y,
                           largeur_asc,
                           hauteur_asc)
         context.stroke()
         # battant gauche de la porte
         context.rectangle(self.POS_X_GAUCHE,
-                          self.pos_y,
-                          self.largeur_battant,
+                          pos_y,
+                          largeur_battant,
                           hauteur_asc)
         context.stroke()
         # battant droit de la porte
         context.rectangle(self.POS_X_DROITE,
-                          self.pos_y,
-                          -self.largeur_battant,
+                          pos_y,
+                          -largeur_battant,
                           hauteur_asc)
         context.stroke()
 
 
-class BoutonGui(ABC):
+class BoutonGui(ElementGui):
     """ Interface """
 
     # zone graphique sensible au clic
@@ -309,10 +586,40 @@ class BoutonGui(ABC):
     # objet Bouton rattaché
     bouton = None
 
+    def zone(self):
+        """ Forme du bouton, trait compris. """
+        return self.region.zone()
+
+    def actualiser(self):
+        """ Le bouton a été allumé ou éteint: seule sa forme est redessinée. """
+        self.bouton.batiment.batiment_gui.invalider(self.zone())
+
     @abstractmethod
-    def on_draw(self, area, context):
+    def dessiner(self, context, allume):
+        """
+        Dessin de la forme du bouton.
+        @type  context: cairo context
+        @param context: Surface de dessin
+        @type  allume: Boolean
+        @param allume: True pour un bouton plein, False pour son contour
+        """
         return
 
+    def dessiner_etiquette(self, context):
+        """ Texte fixe accompagnant le bouton, aucun par défaut. """
+        pass
+
+    def on_draw(self, area, context):
+        """
+        Dessin du bouton allumé; éteint, il fait partie du fond mis en cache.
+        @type  area: DrawingArea
+        @param area: Composant lié à l'événement
+        @type  context: cairo context
+        @param context: Surface de dessin
+        """
+        if self.bouton.etat:
+            self.dessiner(context, True)
+
 
 class BoutonExterneSimpleGui(BoutonGui):
     """
@@ -329,25 +636,26 @@ class BoutonExterneSimpleGui(BoutonGui):
         @param bouton: bouton d'appel
         """
         self.bouton = bouton
+        disposition = bouton.batiment.batiment_gui.disposition
         pas_v = HAUTEUR_ETAGE / 8
-        self.centre_x = ORG_BAT_X + LRG_BAT_1 + (LRG_BAT_ASC / 2)
-        self.centre_y = HAUTEUR_SOL - (HAUTEUR_ETAGE / 2) \
-                        -(self.bouton.appel.etage * HAUTEUR_ETAGE) \
+        self.centre_x = disposition.x_boutons() + (disposition.lrg_boutons / 2)
+        self.centre_y = disposition.y_etage(self.bouton.appel.etage) \
+                        - (HAUTEUR_ETAGE / 2) \
                         -pas_v
         self.region = Region(self.centre_x - self.RAYON,
                              self.centre_x + self.RAYON,
                              self.centre_y - self.RAYON,
                              self.centre_y + self.RAYON)
 
-    def on_draw(self, area, context):
+    def dessiner(self, context, allume):
         """
         Dessin du bouton
-        @type  area: DrawingArea
-        @param area: Composant lié à l'événement
         @type  context: cairo context
         @param context: Surface de dessin
+        @type  allume: Boolean
+        @param allume: True pour un bouton plein, False pour son contour
         """
-        if self.bouton.etat == True:
+        if allume:
             context.arc(self.centre_x, self.centre_y, self.RAYON, 0, 200)
             context.fill()
         else:
@@ -370,33 +678,41 @@ class BoutonInterneSimpleGui(BoutonGui):
         @param bouton: bouton d'appel
         """
         self.bouton = bouton
+        disposition = bouton.batiment.batiment_gui.disposition
         pas_h = LRG_BAT_ASC / 4
         pas_v = HAUTEUR_ETAGE / 4
 
-        self.centre_x = ORG_BAT_X + LRG_BAT_1 + (pas_h * bouton.appel.num_asc)
-        self.centre_y = HAUTEUR_SOL - (HAUTEUR_ETAGE / 2) \
-                        -(self.bouton.appel.etage * HAUTEUR_ETAGE) \
+        self.centre_x = disposition.x_boutons() + (pas_h * bouton.appel.num_asc)
+        self.centre_y = disposition.y_etage(self.bouton.appel.etage) \
+                        - (HAUTEUR_ETAGE / 2) \
                         +pas_v
         self.region = Region(self.centre_x - self.RAYON,
                              self.centre_x + self.RAYON,
                              self.centre_y - self.RAYON,
                              self.centre_y + self.RAYON)
 
-    def on_draw(self, area, context):
+    def zone(self):
+        """ Forme du bouton et n° d'ascenseur en-dessous. """
+        return union(self.region.zone(),
+                     (int(self.centre_x) - 4, int(self.centre_y) + 2, 12, 12))
+
+    def dessiner(self, context, allume):
         """
         Dessin du bouton
-        @type  area: DrawingArea
-        @param area: Composant lié à l'événement
         @type  context: cairo context
         @param context: Surface de dessin
+        @type  allume: Boolean
+        @param allume: True pour un bouton plein, False pour son contour
         """
-        if self.bouton.etat == True:
+        if allume:
             context.arc(self.centre_x, self.centre_y, self.RAYON, 0, 200)
             context.fill()
         else:
             context.arc(self.centre_x, self.centre_y, self.RAYON, 0, 200)
             context.stroke()
-        # n° ascenseur en-dessous
+
+    def dessiner_etiquette(self, context):
+        """ N° d'ascenseur en-dessous """
         context.set_font_size(8)
         context.move_to(self.centre_x - 2, self.centre_y + 12)
         context.show_text("%d" % self.bouton.appel.num_asc)
@@ -418,30 +734,38 @@ class BoutonInterneDoubleGui(BoutonGui):
         @param bouton: bouton d'appel
         """
         self.bouton = bouton
+        disposition = bouton.batiment.batiment_gui.disposition
         pas_h = LRG_BAT_ASC / 4
-        self.centre_x = ORG_BAT_X + LRG_BAT_1 + (pas_h * bouton.appel.num_asc)
-        self.centre_y = HAUTEUR_SOL - (HAUTEUR_ETAGE / 2) \
-                        -(self.bouton.appel.etage * HAUTEUR_ETAGE)
+        self.centre_x = disposition.x_boutons() + (pas_h * bouton.appel.num_asc)
+        self.centre_y = disposition.y_etage(self.bouton.appel.etage) \
+                        - (HAUTEUR_ETAGE / 2)
         self.region = Region(self.centre_x - self.RAYON,
                              self.centre_x + self.RAYON,
                              self.centre_y - self.RAYON,
                              self.centre_y + self.RAYON)
 
-    def on_draw(self, area, context):
+    def zone(self):
+        """ Forme du bouton et n° d'ascenseur à droite. """
+        return union(self.region.zone(),
+                     (int(self.centre_x) + 2, int(self.centre_y) - 8, 12, 12))
+
+    def dessiner(self, context, allume):
         """
         Dessin du bouton
-        @type  area: DrawingArea
-        @param area: Composant lié à l'événement
         @type  context: cairo context
         @param context: Surface de dessin
+        @type  allume: Boolean
+        @param allume: True pour un bouton plein, False pour son contour
         """
-        if self.bouton.etat == True:
+        if allume:
             context.arc(self.centre_x, self.centre_y, self.RAYON, 0, 200)
             context.fill()
         else:
             context.arc(self.centre_x, self.centre_y, self.RAYON, 0, 200)
             context.stroke()
-        # n° ascenseur en-dessous
+
+    def dessiner_etiquette(self, context):
+        """ N° d'ascenseur à droite """
         context.set_font_size(8)
         context.move_to(self.centre_x + 4, self.centre_y + 2)
         context.show_text("%d" % self.bouton.appel.num_asc)
@@ -471,9 +795,10 @@ class BoutonExterneHautGui(BoutonGui):
         self.bouton = bouton
         pas_v = HAUTEUR_ETAGE / 4
         pas_h = LRG_BAT_ASC / 4
-        # coordonnées du point à gauche en bas de la case
-        pos_x = ORG_BAT_X + LRG_BAT_1
-        pos_y = HAUTEUR_SOL - (self.bouton.appel.etage * HAUTEUR_ETAGE)
+        # coordonnées du point à gauche en bas de la case, centrée dans la colonne
+        disposition = bouton.batiment.batiment_gui.disposition
+        pos_x = disposition.x_boutons() + (disposition.lrg_boutons - LRG_BAT_ASC) / 2
+        pos_y = disposition.y_etage(self.bouton.appel.etage)
         self.pt1_x = float(pos_x + pas_h)
         self.pt1_y = float(pos_y - (pas_v * 2.5))
         self.pt2_x = float(pos_x + (pas_h * 3))
@@ -483,19 +808,19 @@ class BoutonExterneHautGui(BoutonGui):
         # région sensible au clic (forme en carré simplifiée)
         self.region = Region(self.pt1_x, self.pt2_x, self.pt3_y, self.pt1_y)
 
-    def on_draw(self, area, context):
+    def dessiner(self, context, allume):
         """
         Dessin du bouton
-        @type  area: DrawingArea
-        @param area: Composant lié à l'événement
         @type  context: cairo context
         @param context: Surface de dessin
+        @type  allume: Boolean
+        @param allume: True pour un bouton plein, False pour son contour
         """
         context.move_to(self.pt1_x, self.pt1_y)
         context.line_to(self.pt2_x, self.pt2_y)
         context.line_to(self.pt3_x, self.pt3_y)
         context.line_to(self.pt1_x, self.pt1_y)
-        if self.bouton.etat == True:
+        if allume:
             context.fill()
         else:
             context.stroke()
@@ -524,9 +849,10 @@ class BoutonExterneBasGui(BoutonGui):
         self.bouton = bouton
         pas_v = HAUTEUR_ETAGE / 4
         pas_h = LRG_BAT_ASC / 4
-        # coordonnées du point à gauche en bas de la case
-        pos_x = ORG_BAT_X + LRG_BAT_1
-        pos_y = HAUTEUR_SOL - (self.bouton.appel.etage * HAUTEUR_ETAGE)
+        # coordonnées du point à gauche en bas de la case, centrée dans la colonne
+        disposition = bouton.batiment.batiment_gui.disposition
+        pos_x = disposition.x_boutons() + (disposition.lrg_boutons - LRG_BAT_ASC) / 2
+        pos_y = disposition.y_etage(self.bouton.appel.etage)
         self.pt1_x = float(pos_x + pas_h)
         self.pt1_y = float(pos_y - (pas_v * 1.5))
         self.pt2_x = float(pos_x + (pas_h * 3))
@@ -536,19 +862,19 @@ class BoutonExterneBasGui(BoutonGui):
         # région sensible au clic (forme en carré simplifiée)
         self.region = Region(self.pt1_x, self.pt2_x, self.pt1_y, self.pt3_y)
 
-    def on_draw(self, area, context):
+    def dessiner(self, context, allume):
         """
         Dessin du bouton
-        @type  area: DrawingArea
-        @param area: Composant lié à l'événement
         @type  context: cairo context
         @param context: Surface de dessin
+        @type  allume: Boolean
+        @param allume: True pour un bouton plein, False pour son contour
         """
         context.move_to(self.pt1_x, self.pt1_y)
         context.line_to(self.pt2_x, self.pt2_y)
         context.line_to(self.pt3_x, self.pt3_y)
         context.line_to(self.pt1_x, self.pt1_y)
-        if self.bouton.etat == True:
+        if allume:
             context.fill()
         else:
             context.stroke()
@@ -11,28 +11,27 @@ import gi
 gi.require_version('Gtk', '3.0')
 from gi.repository import Gtk, Gdk, Gio, GObject
 from core.log import Log
+from core.params import Params
 from core.structures import Batiment
+from core.moteur import Ordonnanceur, HorlogeSimulee
+from core.politiques import POLITIQUES
+from gui.units import Disposition
 
 ICON_WINDOW = "./ressources/ascenseur-icon.png"
 
-
-class Params:
-    """
-    Options communes échangées entre objets.
-    """
-
-    nb_etages = None
-    nb_asc = None
-    type_appel = None
-
-    def __init__(self, nb_etages, nb_asc, type_appel):
-        self.nb_etages = nb_etages
-        self.nb_asc = nb_asc
-        self.type_appel = type_appel
-
-    def __repr__(self):
-        return "Etages: %d - Asc.: %d - appels: %d" % \
-            (self.nb_etages, self.nb_asc, self.type_appel)
+# délais minimal et maximal en ms entre deux avancements de l'ordonnanceur;
+# le maximum borne l'attente des commandes soumises par d'autres threads
+PERIODE_MIN = 20
+PERIODE_MAX = 1000
+# bornes et pas du zoom
+ZOOM_MIN = 0.25
+ZOOM_MAX = 4.0
+ZOOM_PAS = 1.25
+# taille maximale de la fenêtre à l'ouverture; au-delà, la vue défile
+LARGEUR_FENETRE_MAX = 1200
+HAUTEUR_FENETRE_MAX = 900
+# facteurs d'accélération proposés pour l'horloge simulée
+VITESSES = (0.5, 1, 2, 5, 10, 100)
 
 
 class AppWindow(Gtk.Application, Log):
@@ -42,17 +41,32 @@ class AppWindow(Gtk.Application, Log):
     Gtk.ApplicationWindow est une classe dérivée de Gtk.Window qui offre des
     fonctionnalités d'intégration.
 
-    Un timer force le rafraîchissement du dessin périodiquement lorsqu'une
-    simulation est lancée.
+    Un timer fait avancer l'ordonnanceur, seul responsable des actions
+    temporisées de tous les ascenseurs; il est réarmé pour la prochaine
+    échéance: passages d'étage, fins de mouvement de porte, appels. Le dessin
+    n'est pas rafraîchi périodiquement: chaque élément modifié invalide sa
+    seule zone, et les ascenseurs en mouvement sont redessinés à chaque image
+    à la position interpolée pour la date simulée (voir AscenseurGui).
+
+    Ordonnanceur et dessin lisent la même horloge simulée, accélérée ou
+    ralentie depuis l'en-tête, suspendue, ou avancée d'une échéance à la
+    suivante en pas à pas.
     """
 
     # composants graphiques
     widgets = None
     batiment = None
-    # rafraichissement régulier du dessin
-    _timer = None
+    # actions temporisées de la simulation (déplacements, portes, appels)
+    ordonnanceur = None
+    # prochain avancement de l'ordonnanceur
+    _timer_ordonnanceur = None
+    # date simulée, objet HorlogeSimulee, et son facteur d'accélération
+    horloge = None
+    vitesse = 1.0
     # options modifiables
     params = None
+    # facteur d'agrandissement du dessin
+    zoom = 1.0
 
     def __init__(self):
         """ Constructeur """
@@ -74,7 +88,6 @@ class AppWindow(Gtk.Application, Log):
         self.widgets["btn_stop"].set_sensitive(False)
         # dimensionnement de la fenêtre et de la zone de dessin
         self._redimensionner()
-        window.set_resizable(False)
         window.show_all()
 
     def do_startup(self):
@@ -99,40 +112,89 @@ class AppWindow(Gtk.Application, Log):
         self.widgets["btn_start"].set_sensitive(False)
         self.widgets["btn_stop"].set_sensitive(True)
         # initialisation
-        self.batiment = Batiment(self.widgets["area"], self.params)
-        # on démarre le rafraîchissement régulier du dessin,
-        # mais on peut l'optimiser en ne l'activant que durant une animation
-        self._timer = GObject.timeout_add(200, self.__area_refresh_timeout)
-        self.logger.debug("Démarrage de la simulation (%s)." % self.params)
+        self.ordonnanceur = Ordonnanceur()
+        self.batiment = Batiment(self.widgets["area"], self.params, self.ordonnanceur)
+        self.batiment.batiment_gui.changer_zoom(self.zoom)
+        # l'ordonnanceur et l'affichage suivent la même horloge simulée
+        self.horloge = HorlogeSimulee(self.vitesse)
+        if self.widgets["btn_pause"].get_active():
+            self.horloge.suspendre()
+        self.batiment.batiment_gui.horloge = self.horloge.maintenant
+        self.__armer_ordonnanceur()
+        self.widgets["area"].queue_draw()
+        self.logger.debug("Démarrage de la simulation (%s).", self.params)
 
     def _redimensionner(self):
         """
-        Détermine la dimension de la fenêtre et de la zone de dessin.
+        Détermine la dimension de la zone de dessin, selon les options et le
+        zoom, et celle de la fenêtre qui la fait défiler.
         """
-        # suppression de la zone de dessin si elle existe pour la créer
-        # avec les dimensions voulues
         window = self.widgets["window"]
-        try:
-            area = self.widgets["area"]
-            window.remove(area)
-        except:
-            # self.logger.debug("Pas de zone de dessin à remplacer.")
-            pass
-        # construction du nouveau composant graphique
-        area = Gtk.DrawingArea()
-        self.widgets["area"] = area
-        window.add(area)
+        area = self.widgets.get("area")
+        if area is None:
+            # construction de la zone de dessin dans une vue à défilement
+            defilement = Gtk.ScrolledWindow()
+            area = Gtk.DrawingArea()
+            self.widgets["area"] = area
+            self.widgets["defilement"] = defilement
+            # arrière-plan, repeint par Gtk sous chaque zone invalidée
+            color = Gdk.RGBA()
+            color.parse("#000")
+            area.override_background_color(0, color)
+            # autres options:
+            # Gdk.EventMask.POINTER_MOTION_MASK | Gdk.EventMask.EXPOSURE_MASK | Gdk.EventMask.BUTTON_RELEASE_MASK
+            area.add_events(Gdk.EventMask.BUTTON_PRESS_MASK | Gdk.EventMask.SCROLL_MASK)
+            area.connect("draw", self.on_draw)
+            area.connect("button-press-event", self.on_draw_press_event)
+            area.connect("scroll-event", self.on_draw_scroll_event)
+            defilement.add(area)
+            window.add(defilement)
+            defilement.show_all()
         # définition des dimensions requises
-        larg = 400 + (100 * self.params.nb_asc)
-        ht = 160 + (60 * self.params.nb_etages)
-        window.set_default_size(larg, ht)
-        # autres options:
-        # Gdk.EventMask.POINTER_MOTION_MASK | Gdk.EventMask.EXPOSURE_MASK | Gdk.EventMask.BUTTON_RELEASE_MASK
-        area.add_events(Gdk.EventMask.BUTTON_PRESS_MASK)
-        area.connect("draw", self.on_draw)
-        area.connect("button-press-event", self.on_draw_press_event)
+        disposition = Disposition(self.params)
+        larg = int(disposition.largeur * self.zoom)
+        ht = int(disposition.hauteur * self.zoom)
         area.set_size_request(larg, ht)
-        area.show()
+        window.resize(min(larg, LARGEUR_FENETRE_MAX), min(ht, HAUTEUR_FENETRE_MAX))
+        # le fond mis en cache ne correspond plus à la zone de dessin
+        if self.batiment:
+            self.batiment.batiment_gui.changer_zoom(self.zoom)
+        area.queue_draw()
+
+    def changer_zoom(self, facteur):
+        """
+        Agrandit ou réduit le dessin, dans les bornes du zoom.
+        @type  facteur: nombre
+        @param facteur: rapport entre le nouveau et l'ancien zoom
+        """
+        zoom = min(ZOOM_MAX, max(ZOOM_MIN, self.zoom * facteur))
+        if zoom != self.zoom:
+            self.zoom = zoom
+            self._redimensionner()
+
+    def on_zoom_plus(self, gtk_widget):
+        """ Bouton d'agrandissement """
+        self.changer_zoom(ZOOM_PAS)
+
+    def on_zoom_moins(self, gtk_widget):
+        """ Bouton de réduction """
+        self.changer_zoom(1 / ZOOM_PAS)
+
+    def on_draw_scroll_event(self, area, event):
+        """
+        Molette dans la zone de dessin: avec Ctrl elle zoome, sinon la vue défile.
+        @type  area: DrawingArea
+        @param area: Composant lié à l'événement
+        @type  event: EventScroll
+        @param event: Composant lié à l'événement
+        """
+        if not event.state & Gdk.ModifierType.CONTROL_MASK:
+            return False
+        if event.direction == Gdk.ScrollDirection.UP:
+            self.changer_zoom(ZOOM_PAS)
+        elif event.direction == Gdk.ScrollDirection.DOWN:
+            self.changer_zoom(1 / ZOOM_PAS)
+        return True
 
     def on_sim_stop(self, gtk_widget):
         """
@@ -140,19 +202,19 @@ class AppWindow(Gtk.Application, Log):
         @type  gtk_widget: Gtk.Button
         @param gtk_widget: Composant lié à l'événement
         """
-        # arrêt des ascenseurs et du simulateur d'appels
+        # arrêt des ascenseurs et du simulateur d'appels: les actions
+        # planifiées sont abandonnées
         if self.batiment:
-            for asc in self.batiment.automate.ascenseurs:
-                asc.on_simu_stop()
-                self.batiment.sim_appels.flg_stop = True
+            self.batiment.on_simu_stop()
             self.batiment = None
+        if self._timer_ordonnanceur:
+            GObject.source_remove(self._timer_ordonnanceur)
+            self._timer_ordonnanceur = None
         if gtk_widget:
             # s'il ne s'agit pas d'un arrêt forcé suite à la modification
-            # des options sans avoir lancé de simulation
-            GObject.source_remove(self._timer)
-            self._timer = None
-            # on s'assure d'un dernier rafraichissement pour effacer le dessin
-            self.__area_refresh_timeout()
+            # des options sans avoir lancé de simulation, un dernier
+            # rafraichissement efface le dessin
+            self.widgets["area"].queue_draw()
         # déactivation du bouton stop et sactivation du bouton start
         self.widgets["btn_stop"].set_sensitive(False)
         self.widgets["btn_start"].set_sensitive(True)
@@ -185,10 +247,6 @@ class AppWindow(Gtk.Application, Log):
         @type  context: cairo context
         @param context: Surface de dessin
         """
-        # arrière-plan
-        color = Gdk.RGBA()
-        color.parse("#000")
-        area.override_background_color(0, color)
         # dessin du bâtiment (qui dessinera le reste)
         if self.batiment:
             self.batiment.dessiner(area, context)
@@ -202,20 +260,94 @@ class AppWindow(Gtk.Application, Log):
         @param event: Composant lié à l'événement
         """
         if event.type == Gdk.EventType.BUTTON_PRESS and event.button == 1:
-            # cherchons si un bouton d'appel est concerné
+            if not self.batiment:
+                return
+            # cherchons si un bouton d'appel est concerné, un seul au plus
             self.logger.debug("Traitement d'un clic...")
-            for bouton in self.batiment.boutons:
-                if bouton.bouton_gui.region.is_inside(event.x, event.y):
-                    self.batiment.automate.appel(bouton.appel)
-                    self.logger.debug("Traitement d'un clic pour appel OK.")
+            bouton = self.batiment.batiment_gui.bouton_en(event.x, event.y)
+            if bouton:
+                self.batiment.automate.soumettre_appel(bouton.appel)
+                self.logger.debug("Traitement d'un clic pour appel OK.")
+                # l'appel soumis est traité sans attendre la prochaine échéance
+                self.__armer_ordonnanceur(0)
 
-    def __area_refresh_timeout(self):
+    def on_pause_toggled(self, gtk_widget):
         """
-        Demande un refraîchissement du dessin.
+        Suspend ou reprend la simulation.
+        @type  gtk_widget: Gtk.ToggleButton
+        @param gtk_widget: Composant lié à l'événement
         """
-        self.widgets["area"].queue_draw()
-        # réactive le timer
-        return True
+        if not self.batiment:
+            return
+        if gtk_widget.get_active():
+            self.horloge.suspendre()
+        else:
+            self.horloge.reprendre()
+            self.__animer_ascenseurs()
+        self.__armer_ordonnanceur()
+
+    def on_pas(self, gtk_widget):
+        """
+        Pas à pas: la simulation est suspendue puis avancée jusqu'à la
+        prochaine échéance de l'ordonnanceur.
+        @type  gtk_widget: Gtk.Button
+        @param gtk_widget: Composant lié à l'événement
+        """
+        if not self.batiment:
+            return
+        if not self.widgets["btn_pause"].get_active():
+            # suspend l'horloge via on_pause_toggled
+            self.widgets["btn_pause"].set_active(True)
+        echeance = self.ordonnanceur.prochaine_echeance()
+        if echeance is not None:
+            self.horloge.avancer(echeance)
+            self.ordonnanceur.executer_jusqua(echeance)
+            self.__animer_ascenseurs()
+
+    def on_vitesse_changed(self, gtk_widget):
+        """
+        Nouveau facteur d'accélération de l'horloge simulée.
+        @type  gtk_widget: Gtk.ComboBoxText
+        @param gtk_widget: Composant lié à l'événement
+        """
+        self.vitesse = float(gtk_widget.get_active_id())
+        if self.batiment:
+            self.horloge.changer_vitesse(self.vitesse)
+            self.__armer_ordonnanceur()
+
+    def __animer_ascenseurs(self):
+        """ Les ascenseurs sont redessinés à la nouvelle date simulée. """
+        for asc in self.batiment.automate.ascenseurs:
+            asc.ascenseur_gui.animer()
+
+    def __armer_ordonnanceur(self, delai = None):
+        """
+        Programme le prochain avancement de l'ordonnanceur.
+        @type  delai: nombre
+        @param delai: délai en secondes, par défaut jusqu'à la prochaine échéance
+        """
+        if self._timer_ordonnanceur:
+            GObject.source_remove(self._timer_ordonnanceur)
+        if delai is None:
+            if self.horloge.en_pause:
+                # en pause, l'ordonnanceur n'avance qu'au pas à pas
+                self._timer_ordonnanceur = None
+                return
+            echeance = self.ordonnanceur.prochaine_echeance()
+            delai = PERIODE_MAX / 1000 if echeance is None else self.horloge.delai_reel(echeance)
+        periode = min(PERIODE_MAX, max(PERIODE_MIN, int(delai * 1000)))
+        self._timer_ordonnanceur = GObject.timeout_add(periode, self.__ordonnanceur_timeout)
+
+    def __ordonnanceur_timeout(self):
+        """
+        Exécute les actions temporisées échues depuis le dernier passage,
+        puis réarme le timer pour l'échéance suivante.
+        """
+        self._timer_ordonnanceur = None
+        self.ordonnanceur.executer_jusqua(self.horloge.maintenant())
+        self.__armer_ordonnanceur()
+        # le timer est remplacé, pas réactivé
+        return False
 
     def make_headerbar(self):
         """
@@ -231,6 +363,17 @@ class AppWindow(Gtk.Application, Log):
         btn_about.add(image)
         btn_about.connect("clicked", self.on_help_about)
         hb.pack_end(btn_about)
+        # boutons de zoom, à droite
+        box_zoom = Gtk.Box(orientation = Gtk.Orientation.HORIZONTAL)
+        Gtk.StyleContext.add_class(box_zoom.get_style_context(), "linked")
+        for nom_icone, fn in (("zoom-out", self.on_zoom_moins), ("zoom-in", self.on_zoom_plus)):
+            btn_zoom = Gtk.Button()
+            icon = Gio.ThemedIcon(name = nom_icone)
+            image = Gtk.Image.new_from_gicon(icon, Gtk.IconSize.BUTTON)
+            btn_zoom.add(image)
+            btn_zoom.connect("clicked", fn)
+            box_zoom.add(btn_zoom)
+        hb.pack_end(box_zoom)
         # bouton démarrer
         btn_start = Gtk.Button()
         icon = Gio.ThemedIcon(name = "media-playback-start")
@@ -259,6 +402,29 @@ class AppWindow(Gtk.Application, Log):
         box.add(btn_stop)
         box.add(btn_options)
         hb.pack_start(box)
+        # pause, pas à pas et vitesse de l'horloge simulée
+        btn_pause = Gtk.ToggleButton()
+        icon = Gio.ThemedIcon(name = "media-playback-pause")
+        image = Gtk.Image.new_from_gicon(icon, Gtk.IconSize.BUTTON)
+        btn_pause.add(image)
+        btn_pause.connect("toggled", self.on_pause_toggled)
+        self.widgets["btn_pause"] = btn_pause
+        btn_pas = Gtk.Button()
+        icon = Gio.ThemedIcon(name = "media-skip-forward")
+        image = Gtk.Image.new_from_gicon(icon, Gtk.IconSize.BUTTON)
+        btn_pas.add(image)
+        btn_pas.connect("clicked", self.on_pas)
+        combo_vitesse = Gtk.ComboBoxText()
+        for vitesse in VITESSES:
+            combo_vitesse.append("%g" % vitesse, "x%g" % vitesse)
+        combo_vitesse.set_active_id("%g" % self.vitesse)
+        combo_vitesse.connect("changed", self.on_vitesse_changed)
+        box_horloge = Gtk.Box(orientation = Gtk.Orientation.HORIZONTAL)
+        Gtk.StyleContext.add_class(box_horloge.get_style_context(), "linked")
+        box_horloge.add(btn_pause)
+        box_horloge.add(btn_pas)
+        box_horloge.add(combo_vitesse)
+        hb.pack_start(box_horloge)
         return hb
 
     def configuration(self, gtk_widget):
@@ -270,10 +436,14 @@ class AppWindow(Gtk.Application, Log):
         cfg = ConfigDialog(self.widgets["window"])
         # valeurs actuelles
         cfg.spin_etages.set_value(self.params.nb_etages)
+        cfg.spin_asc.set_value(self.params.nb_asc)
         if self.params.type_appel == 1:
             cfg.rb_appel.set_active(True)
+        elif self.params.type_appel == 3:
+            cfg.rb_destination.set_active(True)
         else:
             cfg.rb_appel.set_active(False)
+        cfg.combo_politique.set_active_id(self.params.politique)
         # affichage
         reponse = cfg.run()
         if reponse == Gtk.ResponseType.OK:
@@ -281,9 +451,12 @@ class AppWindow(Gtk.Application, Log):
             self.on_sim_stop(None)
             self.params = Params(nb_etages = int(cfg.spin_etages.get_value()),
                                 nb_asc = int(cfg.spin_asc.get_value()),
-                                type_appel = 1)
-            # 1 = un bouton d'appel, 2 = deux boutons (haut et bas)
-            if not cfg.rb_appel.get_active(): self.params.type_appel = 2
+                                type_appel = 1,
+                                politique = cfg.combo_politique.get_active_id())
+            # 1 = un bouton d'appel, 2 = deux boutons (haut et bas),
+            # 3 = destination saisie au palier
+            if cfg.rb_destination.get_active(): self.params.type_appel = 3
+            elif not cfg.rb_appel.get_active(): self.params.type_appel = 2
             # adaptation de la taille nécessaire au dessin
             self._redimensionner()
         cfg.destroy()
@@ -292,15 +465,16 @@ class AppWindow(Gtk.Application, Log):
 class ConfigDialog(Gtk.Dialog):
     """
     Boite de dialogue pour configurer les options de simulation.
-    Pour des raisons graphiques uniquement:
-     - le nombre d'ascenseurs est limité à 3
-     - le nombre d'étages est limité à 10
+    La vue défile et zoome: seuls les étages visibles sont dessinés, ce qui
+    autorise de grands bâtiments (jusqu'à 200 étages et 16 ascenseurs).
     """
 
     spin_etages = None
     spin_asc = None
     rb_algo = None
     rb_appel = None
+    rb_destination = None
+    combo_politique = None
 
     def __init__(self, parent = None):
         Gtk.Dialog.__init__(self, "Configuration", parent, 0,
@@ -311,8 +485,8 @@ class ConfigDialog(Gtk.Dialog):
                                spacing = 10)
         # 1ere ligne d'option: nombre d'étages
         hbox_etages = Gtk.Box(orientation = Gtk.Orientation.HORIZONTAL)
-        adj = Gtk.Adjustment(value = 4, lower = 2, upper = 10,
-                                    step_increment = 1, page_increment = 2,
+        adj = Gtk.Adjustment(value = 4, lower = 2, upper = 200,
+                                    step_increment = 1, page_increment = 10,
                                     page_size = 0)
         spin_etages = Gtk.SpinButton()
         spin_etages.set_adjustment(adj)
@@ -325,8 +499,8 @@ class ConfigDialog(Gtk.Dialog):
         vertical_box.add(hbox_etages)
         # 2e ligne d'option: nombre d'ascenseurs
         hbox_asc = Gtk.Box(orientation = Gtk.Orientation.HORIZONTAL)
-        adj = Gtk.Adjustment(value = 1, lower = 1, upper = 3,
-                                    step_increment = 1, page_increment = 1,
+        adj = Gtk.Adjustment(value = 1, lower = 1, upper = 16,
+                                    step_increment = 1, page_increment = 4,
                                     page_size = 0)
         spin_asc = Gtk.SpinButton()
         spin_asc.set_adjustment(adj)
@@ -342,8 +516,23 @@ class ConfigDialog(Gtk.Dialog):
         rb_4 = Gtk.RadioButton.new_from_widget(rb_3)
         self.rb_appel = rb_3
         rb_4.set_label("deux boutons d'appel (haut et bas) par étage")
+        rb_5 = Gtk.RadioButton.new_from_widget(rb_3)
+        self.rb_destination = rb_5
+        rb_5.set_label("saisie de la destination au palier")
         vertical_box.add(rb_3)
         vertical_box.add(rb_4)
+        vertical_box.add(rb_5)
+        # 4e ligne d'option: politique de répartition des appels
+        hbox_politique = Gtk.Box(orientation = Gtk.Orientation.HORIZONTAL)
+        combo_politique = Gtk.ComboBoxText()
+        for nom in POLITIQUES:
+            combo_politique.append(nom, nom)
+        combo_politique.set_active_id("collective")
+        self.combo_politique = combo_politique
+        lbl = Gtk.Label("Répartition des appels : ")
+        hbox_politique.add(lbl)
+        hbox_politique.add(combo_politique)
+        vertical_box.add(hbox_politique)
         # on insère le tout
         gen_box = self.get_content_area()
         gen_box.add(vertical_box)
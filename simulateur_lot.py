@@ -0,0 +1,249 @@
+#! /usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+
+Simulations par lot
+===================
+
+ Lance en parallèle de nombreuses simulations sans affichage sur une grille
+ d'options (étages, ascenseurs, type d'appel, politique) et de graines, puis
+ écrit les statistiques agrégées des temps d'attente et de trajet, par appel
+ et par passager, une ligne par configuration. Avec la destination saisie au
+ palier (type 3), l'attente par appel court de la désignation d'un ascenseur
+ à son arrivée à l'étage.
+
+ Exemples:
+   python simulateur_lot.py --etages 10 20 --asc 2 4 --graines 200 --sortie lot.csv
+   python simulateur_lot.py --asc 2 3 --politiques collective temps --enregistrer jour.npy
+   python simulateur_lot.py --asc 4 --appels 3 --trace jour.npy
+
+ Avec --enregistrer, les arrivées de passagers d'une simulation (plus petit
+ nombre d'étages, graine 0) sont écrites dans un fichier .npy, puis toute la
+ grille les rejoue. Une trace rejouée donne la même demande à chaque
+ configuration: une seule simulation est lancée par configuration.
+
+ Avec "python -O", les messages de débogage des chemins critiques sont
+ retirés du code compilé (mode rapide, voir core.log).
+
+"""
+
+import sys
+import csv
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from logging import StreamHandler, Formatter, getLogger, INFO
+import numpy as np
+from core.params import Params
+from core.moteur import MoteurSimulation
+from core.politiques import POLITIQUES
+from core.trafic import ProfilTrafic
+from core.trace import charger_trace, verifier_trace
+from core.mesures import HistogrammeDurees
+
+# journalisation des erreurs
+logger = getLogger()
+
+# colonnes du fichier de résultats
+COLONNES = ("nb_etages", "nb_asc", "type_appel", "politique", "nb_simulations",
+            "nb_attentes", "attente_moy", "attente_ic95", "attente_p95", "attente_max",
+            "nb_trajets", "trajet_moy", "trajet_ic95", "trajet_p95", "trajet_max",
+            "nb_passagers", "passager_attente_p50", "passager_attente_p95",
+            "passager_attente_p99", "passager_voyage_p50", "passager_voyage_p95",
+            "passager_voyage_p99")
+
+
+def creer_profil(nb_etages, profil, taux):
+    """
+    @type  profil: chaîne
+    @param profil: "constant" ou "journee" (voir ProfilTrafic)
+    @type  taux: nombre
+    @param taux: arrivées par heure (aux heures de pointe pour "journee")
+    @rtype: objet ProfilTrafic
+    """
+    if profil == "journee":
+        return ProfilTrafic.journee(nb_etages, taux_pointe = taux / 3600)
+    return ProfilTrafic.constant(nb_etages, taux / 3600)
+
+
+def enregistrer(chemin, configuration, duree, profil, taux):
+    """
+    Simule une configuration (graine 0) et écrit les arrivées de ses
+    passagers, à rejouer par simuler().
+    @type  chemin: chaîne
+    @param chemin: fichier .npy de destination
+    @type  configuration: tuple
+    @param configuration: (nb_etages, nb_asc, type_appel, politique)
+    @return: nombre d'arrivées enregistrées
+    @rtype: nombre entier
+    """
+    moteur = MoteurSimulation(Params(*configuration), 0, creer_profil(configuration[0], profil, taux))
+    enregistreur = moteur.enregistrer_trace()
+    moteur.lancer(duree)
+    enregistreur.sauver(chemin)
+    return len(enregistreur.trace)
+
+
+def simuler(nb_etages, nb_asc, type_appel, politique, graine, duree, profil, taux, trace = None):
+    """
+    Exécute une simulation sans affichage; appelée dans un processus du lot.
+    @type  profil: chaîne
+    @param profil: "constant" ou "journee" (voir ProfilTrafic)
+    @type  taux: nombre
+    @param taux: arrivées par heure (aux heures de pointe pour "journee")
+    @type  trace: chaîne
+    @param trace: fichier .npy d'arrivées à rejouer au lieu du trafic généré
+    @return: durées d'attente et de trajet des appels, histogrammes
+             d'attente et de voyage des passagers
+    @rtype: tuple (tableau NumPy, tableau NumPy, HistogrammeDurees, HistogrammeDurees)
+    """
+    moteur = MoteurSimulation(Params(nb_etages, nb_asc, type_appel, politique),
+                              graine, creer_profil(nb_etages, profil, taux),
+                              charger_trace(trace) if trace else None)
+    moteur.lancer(duree)
+    automate = moteur.batiment.automate
+    return (np.array(automate.attentes), np.array(automate.trajets),
+            automate.mesures.attente, automate.mesures.voyage)
+
+
+def resumer(series):
+    """
+    Statistiques d'une durée sur un ensemble de simulations: moyenne des
+    moyennes par simulation et son intervalle de confiance à 95 %, 95e
+    centile et maximum de toutes les valeurs.
+    @type  series: liste de tableaux NumPy
+    @param series: durées observées, un tableau par simulation
+    @return: nombre de valeurs, moyenne, demi-largeur de l'IC 95 % (None
+             pour une seule simulation), p95, max
+    @rtype: tuple
+    """
+    moyennes = np.array([serie.mean() for serie in series if len(serie)])
+    valeurs = np.concatenate(series) if series else np.empty(0)
+    if not len(valeurs):
+        return 0, None, None, None, None
+    ic95 = None
+    if len(moyennes) > 1:
+        ic95 = 1.96 * moyennes.std(ddof = 1) / np.sqrt(len(moyennes))
+    return len(valeurs), moyennes.mean(), ic95, np.percentile(valeurs, 95), valeurs.max()
+
+
+def lancer_lot(configurations, graines, duree, profil = "constant", taux = 3600 / 8.5,
+               nb_processus = None, trace = None):
+    """
+    Répartit toutes les simulations (configuration x graine) sur un groupe
+    de processus et agrège leurs résultats par configuration.
+    @type  configurations: liste de tuples
+    @param configurations: (nb_etages, nb_asc, type_appel, politique)
+    @type  graines: liste de nombres entiers
+    @param graines: graines aléatoires, une simulation par graine
+    @type  duree: nombre
+    @param duree: durée simulée de chaque simulation, en secondes
+    @type  profil: chaîne
+    @param profil: profil de trafic, "constant" ou "journee"
+    @type  taux: nombre
+    @param taux: arrivées par heure
+    @type  nb_processus: nombre entier
+    @param nb_processus: taille du groupe de processus, None pour le nombre de processeurs
+    @type  trace: chaîne
+    @param trace: fichier .npy d'arrivées rejoué par chaque configuration
+    @return: une ligne de statistiques par configuration
+    @rtype: liste de tuples
+    """
+    taches = [cfg + (graine, duree, profil, taux, trace) for cfg in configurations for graine in graines]
+    taille_paquet = max(1, len(taches) // (8 * (nb_processus or 8)))
+    resultats = {cfg: ([], [], HistogrammeDurees(), HistogrammeDurees()) for cfg in configurations}
+    with ProcessPoolExecutor(max_workers = nb_processus) as executeur:
+        for tache, resultat in zip(taches, executeur.map(simuler, *zip(*taches),
+                                                          chunksize = taille_paquet)):
+            attentes, trajets, attente_passagers, voyage_passagers = resultat
+            cfg = tache[:4]
+            resultats[cfg][0].append(attentes)
+            resultats[cfg][1].append(trajets)
+            resultats[cfg][2].fusionner(attente_passagers)
+            resultats[cfg][3].fusionner(voyage_passagers)
+    lignes = []
+    for cfg in configurations:
+        attentes, trajets, attente_passagers, voyage_passagers = resultats[cfg]
+        lignes.append(cfg + (len(graines),) + resumer(attentes) + resumer(trajets)
+                      + (attente_passagers.nb,)
+                      + tuple(attente_passagers.centile(q) for q in (50, 95, 99))
+                      + tuple(voyage_passagers.centile(q) for q in (50, 95, 99)))
+    return lignes
+
+
+def lire_arguments(argv):
+    """ Analyse de la ligne de commande """
+    parser = ArgumentParser(description = "Simulations d'ascenseurs par lot, sans affichage.")
+    parser.add_argument("--etages", type = int, nargs = "+", default = [10],
+                        help = "nombres d'étages à simuler")
+    parser.add_argument("--asc", type = int, nargs = "+", default = [2],
+                        help = "nombres d'ascenseurs à simuler")
+    parser.add_argument("--appels", type = int, nargs = "+", default = [1, 2], choices = (1, 2, 3),
+                        help = "types d'appel: 1 = un bouton, 2 = haut et bas, 3 = destination au palier")
+    parser.add_argument("--politiques", nargs = "+", default = ["collective"],
+                        choices = sorted(POLITIQUES), help = "politiques de répartition")
+    parser.add_argument("--graines", type = int, default = 100,
+                        help = "nombre de simulations (graines 0 à N-1) par configuration, "
+                               "une seule avec --trace ou --enregistrer")
+    parser.add_argument("--duree", type = float, default = 86400,
+                        help = "durée simulée en secondes")
+    parser.add_argument("--profil", default = "constant", choices = ("constant", "journee"),
+                        help = "profil de trafic: constant, ou journée de bureau avec pointes")
+    parser.add_argument("--taux", type = float, default = 3600 / 8.5,
+                        help = "arrivées par heure (aux heures de pointe pour journee)")
+    parser.add_argument("--trace", default = None,
+                        help = "fichier .npy d'arrivées enregistrées à rejouer")
+    parser.add_argument("--enregistrer", default = None, metavar = "TRACE",
+                        help = "fichier .npy où enregistrer les arrivées d'une simulation, "
+                               "rejouées ensuite par toute la grille")
+    parser.add_argument("--processus", type = int, default = None,
+                        help = "nombre de processus, par défaut un par processeur")
+    parser.add_argument("--sortie", default = None,
+                        help = "fichier CSV des résultats, sinon la sortie standard")
+    return parser.parse_args(argv)
+
+
+# -------------------------------------------------------------------
+#
+# Point d'entrée
+#
+# -------------------------------------------------------------------
+
+if __name__ == '__main__':
+
+    # journalisation dans la console
+    logger.setLevel(INFO)
+    pattern = "[%(levelname)s:%(name)s] %(message)s"
+    sh = StreamHandler()
+    sh.setFormatter(Formatter(pattern))
+    logger.addHandler(sh)
+    args = lire_arguments(sys.argv[1:])
+    configurations = list(product(args.etages, args.asc, args.appels, args.politiques))
+    graines = range(args.graines)
+    if args.enregistrer:
+        # la trace du plus petit bâtiment est valable pour tous les autres
+        nb = enregistrer(args.enregistrer, min(configurations), args.duree, args.profil, args.taux)
+        logger.info("%d arrivées enregistrées dans %s.", nb, args.enregistrer)
+        args.trace = args.enregistrer
+    if args.trace:
+        # la trace fixe la demande: une graine de plus donnerait le même résultat
+        graines = range(1)
+        # une trace invalide est signalée avant de lancer la grille
+        try:
+            trace = charger_trace(args.trace)
+            for nb_etages in args.etages:
+                verifier_trace(trace, nb_etages)
+        except ValueError as exc:
+            logger.error("%s", exc)
+            sys.exit(2)
+    logger.info("%d configurations x %d graines...", len(configurations), len(graines))
+    lignes = lancer_lot(configurations, graines, args.duree,
+                        args.profil, args.taux, args.processus, args.trace)
+    sortie = open(args.sortie, "w", newline = "") if args.sortie else sys.stdout
+    ecrivain = csv.writer(sortie)
+    ecrivain.writerow(COLONNES)
+    ecrivain.writerows(lignes)
+    if args.sortie:
+        sortie.close()
+        logger.info("Résultats écrits dans %s.", args.sortie)